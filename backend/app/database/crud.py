@@ -1,18 +1,76 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
 from app.database import models
 from app.schemas import alumno, competencia
+from app.services import paginacion, perfil_alumnos
+
+# Columnas por las que se puede ordenar un listado de alumnos (todas con índice)
+ORDENES_ALUMNOS = {
+    "id": None,
+    "nombre": models.Alumno.Nombre,
+    "ci": models.Alumno.CI,
+    "promedio": models.Alumno.Promedio_Calificaciones,
+}
 
 # Funciones para Alumnos
-def get_alumno(db: Session, alumno_id: int):
-    return db.query(models.Alumno).filter(models.Alumno.Alumno_ID == alumno_id).first()
+def _query_alumnos(db: Session, con_inteligencias: bool):
+    query = db.query(models.Alumno)
+    if con_inteligencias:
+        # Una sola consulta extra (IN) para las inteligencias de todos los alumnos
+        query = query.options(selectinload(models.Alumno.inteligencias))
+    return query
+
+def get_alumno(db: Session, alumno_id: int, con_inteligencias: bool = False):
+    return _query_alumnos(db, con_inteligencias).filter(models.Alumno.Alumno_ID == alumno_id).first()
+
+def get_alumnos(db: Session, skip: int = 0, limit: int = 100, con_inteligencias: bool = False):
+    return _query_alumnos(db, con_inteligencias).offset(skip).limit(limit).all()
 
-def get_alumnos(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Alumno).offset(skip).limit(limit).all()
+def filtrar_alumnos(query, con_ci=False, ci_min=None, ci_max=None, promedio_min=None, promedio_max=None,
+                    cluster=None, curso_id=None, nombre=None):
+    """Aplica los filtros indicados (los None se ignoran). `nombre` es un prefijo y distingue mayúsculas."""
+    if con_ci:
+        query = query.filter(models.Alumno.CI.isnot(None))
+    if ci_min is not None:
+        query = query.filter(models.Alumno.CI >= ci_min)
+    if ci_max is not None:
+        query = query.filter(models.Alumno.CI <= ci_max)
+    if promedio_min is not None:
+        query = query.filter(models.Alumno.Promedio_Calificaciones >= promedio_min)
+    if promedio_max is not None:
+        query = query.filter(models.Alumno.Promedio_Calificaciones <= promedio_max)
+    if cluster is not None:
+        query = query.filter(models.Alumno.Cluster_KMeans == cluster)
+    if nombre:
+        # Rango en lugar de LIKE para que SQLite use el índice de Nombre
+        query = query.filter(models.Alumno.Nombre >= nombre, models.Alumno.Nombre < nombre + "\U0010ffff")
+    if curso_id is not None:
+        # Alumnos con alguna calificación en una competencia del curso
+        competencias_curso = select(models.CompetenciaPlantilla.CompetenciaPlantilla_ID).where(
+            models.CompetenciaPlantilla.Curso_ID == curso_id
+        )
+        query = query.filter(models.Alumno.calificaciones.any(
+            models.AlumnoCompetencia.CompetenciaPlantilla_ID.in_(competencias_curso)
+        ))
+    return query
+
+def buscar_alumnos(db: Session, limit: int = 100, cursor: str = None, orden: str = "id", descendente: bool = False,
+                   skip: int = 0, con_inteligencias: bool = False, **filtros):
+    """
+    Página de alumnos filtrada y ordenada (ver filtrar_alumnos y
+    ORDENES_ALUMNOS), paginada por cursor. Devuelve (alumnos, cursor de la
+    página siguiente o None). ValueError si el orden o el cursor no son válidos.
+    """
+    if orden not in ORDENES_ALUMNOS:
+        raise ValueError(f"Orden no válido: '{orden}'. Opciones: {', '.join(ORDENES_ALUMNOS)}")
+    query = filtrar_alumnos(_query_alumnos(db, con_inteligencias), **filtros)
+    return paginacion.paginar(query, models.Alumno.Alumno_ID, limit, cursor,
+                              columna=ORDENES_ALUMNOS[orden], orden=orden, descendente=descendente, saltar=skip)
 
 def create_alumno(db: Session, alumno_data: alumno.AlumnoCreate):
     db_alumno = models.Alumno(
         Nombre=f"{alumno_data.nombre} {alumno_data.apellido}",
-        Promedio_Calificaciones=0.0,
+        Promedio_Calificaciones=None,  # Sin calificaciones (ver services/resumenes.py)
         Cantidad_Competencias=0,
         CI=0,
         Cluster_KMeans=0,
@@ -20,6 +78,8 @@ def create_alumno(db: Session, alumno_data: alumno.AlumnoCreate):
         Recomendaciones_Basicas=""
     )
     db.add(db_alumno)
+    db.flush()
+    perfil_alumnos.materializar_perfiles(db, [db_alumno.Alumno_ID])
     db.commit()
     db.refresh(db_alumno)
     return db_alumno
@@ -29,6 +89,7 @@ def update_alumno(db: Session, alumno_id: int, alumno_data: alumno.AlumnoUpdate)
     if db_alumno:
         if alumno_data.nombre and alumno_data.apellido:
             db_alumno.Nombre = f"{alumno_data.nombre} {alumno_data.apellido}"
+        perfil_alumnos.materializar_perfiles(db, [alumno_id])
         db.commit()
         db.refresh(db_alumno)
     return db_alumno
@@ -36,11 +97,23 @@ def update_alumno(db: Session, alumno_id: int, alumno_data: alumno.AlumnoUpdate)
 def delete_alumno(db: Session, alumno_id: int):
     db_alumno = get_alumno(db, alumno_id)
     if db_alumno:
+        # Alumno_ID es NOT NULL en calificaciones e inteligencias: se borran con el alumno
+        for modelo in (models.AlumnoCompetencia, models.Inteligencia):
+            db.query(modelo).filter(modelo.Alumno_ID == alumno_id).delete(synchronize_session=False)
         db.delete(db_alumno)
+        perfil_alumnos.materializar_perfiles(db, [alumno_id])  # Borra su documento
         db.commit()
     return db_alumno
 
 # Funciones para Competencias (usando CompetenciaPlantilla)
+def _alumnos_con_competencias(db: Session, competencia_ids):
+    """IDs de los alumnos con alguna calificación en esas competencias (cuyos perfiles las muestran)"""
+    return db.execute(
+        select(models.AlumnoCompetencia.Alumno_ID)
+        .where(models.AlumnoCompetencia.CompetenciaPlantilla_ID.in_(competencia_ids))
+        .distinct()
+    ).scalars().all()
+
 def get_competencia(db: Session, competencia_id: int):
     return db.query(models.CompetenciaPlantilla).filter(models.CompetenciaPlantilla.CompetenciaPlantilla_ID == competencia_id).first()
 
@@ -65,6 +138,7 @@ def update_competencia(db: Session, competencia_id: int, competencia_data: compe
             db_competencia.Codigo_Competencia = competencia_data.nombre
         if competencia_data.descripcion:
             db_competencia.Descripcion = competencia_data.descripcion
+        perfil_alumnos.materializar_perfiles(db, _alumnos_con_competencias(db, [competencia_id]))
         db.commit()
         db.refresh(db_competencia)
     return db_competencia
@@ -72,11 +146,16 @@ def update_competencia(db: Session, competencia_id: int, competencia_data: compe
 def delete_competencia(db: Session, competencia_id: int):
     db_competencia = get_competencia(db, competencia_id)
     if db_competencia:
+        afectados = _alumnos_con_competencias(db, [competencia_id])
         db.delete(db_competencia)
+        perfil_alumnos.materializar_perfiles(db, afectados)
         db.commit()
     return db_competencia
 
 # Funciones para Cursos
+def _competencias_del_curso(curso_id: int):
+    return select(models.CompetenciaPlantilla.CompetenciaPlantilla_ID).where(models.CompetenciaPlantilla.Curso_ID == curso_id)
+
 def get_curso(db: Session, curso_id: int):
     return db.query(models.Curso).filter(models.Curso.Curso_ID == curso_id).first()
 
@@ -95,6 +174,7 @@ def update_curso(db: Session, curso_id: int, curso: dict):
     if db_curso:
         for key, value in curso.items():
             setattr(db_curso, key, value)
+        perfil_alumnos.materializar_perfiles(db, _alumnos_con_competencias(db, _competencias_del_curso(curso_id)))
         db.commit()
         db.refresh(db_curso)
     return db_curso
@@ -102,6 +182,8 @@ def update_curso(db: Session, curso_id: int, curso: dict):
 def delete_curso(db: Session, curso_id: int):
     db_curso = get_curso(db, curso_id)
     if db_curso:
+        afectados = _alumnos_con_competencias(db, _competencias_del_curso(curso_id))
         db.delete(db_curso)
+        perfil_alumnos.materializar_perfiles(db, afectados)
         db.commit()
     return db_curso
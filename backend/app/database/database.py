@@ -1,12 +1,40 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./bdalumnas.db"
 
+# Ajustes de SQLite que se aplican a cada conexión nueva:
+# - WAL: las lecturas no se bloquean mientras una ingesta escribe (y la
+#   escritura no espera a los lectores). Queda guardado en el archivo.
+# - synchronous NORMAL: con WAL no hay riesgo de corrupción; solo la última
+#   transacción podría perderse si se corta la luz, no si se cae el proceso.
+# - mmap_size, cache_size y temp_store: lecturas desde memoria compartida,
+#   64MB de caché por conexión (en KB si es negativo) y temporales en memoria.
+# - busy_timeout: espera hasta 30s al otro escritor en vez de fallar con
+#   "database is locked".
+PRAGMAS_SQLITE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64000,
+    "temp_store": "MEMORY",
+    "busy_timeout": 30000,
+}
+
+def configurar_conexion_sqlite(dbapi_connection, connection_record=None):
+    """Aplica PRAGMAS_SQLITE a una conexión sqlite3 (evento "connect" del engine)."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, valor in PRAGMAS_SQLITE.items():
+            cursor.execute(f"PRAGMA {pragma} = {valor}")
+    finally:
+        cursor.close()
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+event.listen(engine, "connect", configurar_conexion_sqlite)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
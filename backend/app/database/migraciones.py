@@ -0,0 +1,285 @@
+import logging
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.database import models
+from app.services import resumenes, perfil_alumnos
+
+logger = logging.getLogger(__name__)
+
+# Claves naturales que el upsert de la ingesta necesita como índice único
+INDICES_UNICOS = {
+    "AlumnoCompetencia": ("AlumnoCompetencia_ID", ("Alumno_ID", "CompetenciaPlantilla_ID")),
+    "Inteligencias": ("Inteligencia_ID", ("Alumno_ID", "Tipo_Inteligencia")),
+}
+
+# Índices de las columnas por las que se busca. Los filtros por Alumno_ID en
+# AlumnoCompetencia e Inteligencias ya usan los índices únicos (empiezan por
+# Alumno_ID). Los nombres coinciden con los que create_all crea a partir de
+# `index=True` en models.py, así que en una base nueva no se duplican.
+INDICES_CONSULTA = {
+    "ix_Alumnos_Nombre": ("Alumnos", ("Nombre",)),
+    "ix_Alumnos_CI": ("Alumnos", ("CI",)),
+    "ix_AlumnoCompetencia_CompetenciaPlantilla_ID": ("AlumnoCompetencia", ("CompetenciaPlantilla_ID",)),
+    "ix_CompetenciaPlantilla_Curso_ID": ("CompetenciaPlantilla", ("Curso_ID",)),
+}
+
+# Claves de orden y filtro de los listados paginados de alumnos (nombre y CI ya tienen índice)
+INDICES_LISTADOS = {
+    "ix_Alumnos_Promedio_Calificaciones": ("Alumnos", ("Promedio_Calificaciones",)),
+    "ix_Alumnos_Cluster_KMeans": ("Alumnos", ("Cluster_KMeans",)),
+}
+
+def _tiene_indice_unico(conn, tabla, columnas) -> bool:
+    """True si la tabla ya tiene un índice único exactamente sobre `columnas` (p. ej. el de un UniqueConstraint)."""
+    for indice in conn.execute(text(f'PRAGMA index_list("{tabla}")')).fetchall():
+        if indice[2] and tuple(fila[2] for fila in conn.execute(text(f'PRAGMA index_info("{indice[1]}")'))) == columnas:
+            return True
+    return False
+
+def _crear_indices_unicos(conn):
+    """
+    Índice único de cada clave natural en bases creadas antes de que
+    existiera. Si hay filas duplicadas se conserva la más reciente.
+    """
+    for tabla, (pk, columnas) in INDICES_UNICOS.items():
+        if _tiene_indice_unico(conn, tabla, columnas):
+            continue
+        lista = ", ".join(columnas)
+        conn.execute(text(
+            f'DELETE FROM "{tabla}" WHERE {pk} NOT IN (SELECT MAX({pk}) FROM "{tabla}" GROUP BY {lista})'
+        ))
+        conn.execute(text(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS "ux_{tabla}_{"_".join(columnas)}" ON "{tabla}" ({lista})'
+        ))
+
+def _crear_indices(conn, indices: dict):
+    for nombre, (tabla, columnas) in indices.items():
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS "{nombre}" ON "{tabla}" ({", ".join(columnas)})'))
+    conn.execute(text("ANALYZE"))
+
+def _crear_indices_consulta(conn):
+    """Índices por nombre (ingesta), CI (rangos de /ci) y competencia y curso (catálogo)."""
+    _crear_indices(conn, INDICES_CONSULTA)
+
+def _crear_indices_listados(conn):
+    """Índices por promedio y cluster para ordenar y filtrar los listados por cursor."""
+    _crear_indices(conn, INDICES_LISTADOS)
+
+# Columnas de resumen por alumno que no existían en las bases anteriores
+COLUMNAS_RESUMEN = ("Cant_A", "Cant_B", "Cant_C", "Cant_D")
+
+def _agregar_resumenes(conn):
+    """Conteos por letra en Alumnos (el cálculo inicial lo hace _recalcular_derivados)."""
+    existentes = {fila[1] for fila in conn.execute(text('PRAGMA table_info("Alumnos")'))}
+    for columna in COLUMNAS_RESUMEN:
+        if columna not in existentes:
+            conn.execute(text(f'ALTER TABLE "Alumnos" ADD COLUMN {columna} INTEGER DEFAULT 0'))
+
+# El SQL de las migraciones queda fijo tal como se publicó: no se genera desde
+# models.py, que describe siempre el esquema de la última versión
+_TABLA_PERFILES = """CREATE TABLE IF NOT EXISTS "PerfilesAlumno" (
+    "Alumno_ID" INTEGER NOT NULL,
+    "Documento" TEXT NOT NULL,
+    PRIMARY KEY ("Alumno_ID"),
+    FOREIGN KEY("Alumno_ID") REFERENCES "Alumnos" ("Alumno_ID")
+)"""
+
+def _materializar_perfiles(conn):
+    """Tabla PerfilesAlumno (si create_all no la creó; los documentos los genera _recalcular_derivados)."""
+    conn.execute(text(_TABLA_PERFILES))
+
+def _reconstruir_tabla(conn, tabla: str, crear, copiar: str) -> int:
+    """
+    SQLite no cambia el tipo de una columna: se renombra la tabla a
+    {tabla}_anterior, se ejecutan las sentencias `crear` (la tabla nueva y
+    sus índices), se copian las filas con `copiar` (un INSERT ... SELECT desde
+    {tabla}_anterior) y se borra la anterior. Devuelve las filas no copiadas.
+    """
+    # Los nombres de índice son globales: se liberan antes de crear los de la tabla nueva
+    for indice in conn.execute(text(f'PRAGMA index_list("{tabla}")')).fetchall():
+        if not indice[1].startswith("sqlite_autoindex"):
+            conn.execute(text(f'DROP INDEX "{indice[1]}"'))
+    conn.execute(text(f'ALTER TABLE "{tabla}" RENAME TO "{tabla}_anterior"'))
+    for sentencia in crear:
+        conn.execute(text(sentencia))
+    conn.execute(text(copiar))
+    descartadas = conn.execute(text(
+        f'SELECT (SELECT COUNT(*) FROM "{tabla}_anterior") - (SELECT COUNT(*) FROM "{tabla}")'
+    )).scalar()
+    conn.execute(text(f'DROP TABLE "{tabla}_anterior"'))
+    conn.execute(text("ANALYZE"))
+    return descartadas
+
+_TABLA_TIPOS_INTELIGENCIA = """CREATE TABLE IF NOT EXISTS "TiposInteligencia" (
+    "TipoInteligencia_ID" INTEGER NOT NULL,
+    "Nombre" VARCHAR NOT NULL,
+    PRIMARY KEY ("TipoInteligencia_ID"),
+    UNIQUE ("Nombre")
+)"""
+
+_TABLA_INTELIGENCIAS = (
+    """CREATE TABLE "Inteligencias" (
+    "Inteligencia_ID" INTEGER NOT NULL,
+    "Alumno_ID" INTEGER NOT NULL,
+    "TipoInteligencia_ID" INTEGER NOT NULL,
+    "Puntaje" FLOAT NOT NULL,
+    PRIMARY KEY ("Inteligencia_ID"),
+    UNIQUE ("Alumno_ID", "TipoInteligencia_ID"),
+    FOREIGN KEY("Alumno_ID") REFERENCES "Alumnos" ("Alumno_ID"),
+    FOREIGN KEY("TipoInteligencia_ID") REFERENCES "TiposInteligencia" ("TipoInteligencia_ID")
+)""",
+    'CREATE INDEX "ix_Inteligencias_TipoInteligencia_ID_Puntaje" ON "Inteligencias" ("TipoInteligencia_ID", "Puntaje")',
+)
+
+def _normalizar_inteligencias(conn):
+    """
+    Diccionario TiposInteligencia e Inteligencias con TipoInteligencia_ID en
+    lugar del nombre del tipo repetido en cada fila. La tabla se reconstruye
+    (_reconstruir_tabla) con el mismo Inteligencia_ID; las filas sin alumno,
+    tipo o puntaje, que la tabla anterior admitía, no se copian.
+    """
+    conn.execute(text(_TABLA_TIPOS_INTELIGENCIA))
+    conn.execute(text(
+        'INSERT OR IGNORE INTO "TiposInteligencia" (Nombre) SELECT DISTINCT Tipo_Inteligencia FROM "Inteligencias" '
+        'WHERE Alumno_ID IS NOT NULL AND Tipo_Inteligencia IS NOT NULL AND Puntaje IS NOT NULL ORDER BY 1'
+    ))
+    _reconstruir_tabla(conn, "Inteligencias", _TABLA_INTELIGENCIAS, """
+        INSERT INTO "Inteligencias" (Inteligencia_ID, Alumno_ID, TipoInteligencia_ID, Puntaje)
+        SELECT i.Inteligencia_ID, i.Alumno_ID, t.TipoInteligencia_ID, i.Puntaje
+        FROM "Inteligencias_anterior" i JOIN "TiposInteligencia" t ON t.Nombre = i.Tipo_Inteligencia
+        WHERE i.Alumno_ID IS NOT NULL AND i.Puntaje IS NOT NULL
+        ORDER BY i.Inteligencia_ID
+    """)
+
+# Vista con la letra de cada calificación, para leer la base con SQL (p. ej.
+# la exportación); se escribe siempre en AlumnoCompetencia.Valor_Calificacion
+# (models.VALOR_CALIFICACION)
+VISTA_CALIFICACIONES = "VistaCalificaciones"
+_VISTA_CALIFICACIONES_SQL = f"""CREATE VIEW IF NOT EXISTS "{VISTA_CALIFICACIONES}" AS
+SELECT AlumnoCompetencia_ID, Alumno_ID, CompetenciaPlantilla_ID, Valor_Calificacion,
+       CASE Valor_Calificacion WHEN 4 THEN 'A' WHEN 3 THEN 'B' WHEN 2 THEN 'C' WHEN 1 THEN 'D' END AS Calificacion,
+       Conclusion_descriptiva
+FROM AlumnoCompetencia"""
+
+def _crear_vista_calificaciones(conn):
+    conn.execute(text(_VISTA_CALIFICACIONES_SQL))
+
+_TABLA_CALIFICACIONES = (
+    """CREATE TABLE "AlumnoCompetencia" (
+    "AlumnoCompetencia_ID" INTEGER NOT NULL,
+    "Alumno_ID" INTEGER,
+    "CompetenciaPlantilla_ID" INTEGER,
+    "Valor_Calificacion" SMALLINT NOT NULL,
+    "Conclusion_descriptiva" TEXT,
+    PRIMARY KEY ("AlumnoCompetencia_ID"),
+    UNIQUE ("Alumno_ID", "CompetenciaPlantilla_ID"),
+    CONSTRAINT "ck_AlumnoCompetencia_Valor_Calificacion" CHECK (Valor_Calificacion BETWEEN 1 AND 4),
+    FOREIGN KEY("Alumno_ID") REFERENCES "Alumnos" ("Alumno_ID"),
+    FOREIGN KEY("CompetenciaPlantilla_ID") REFERENCES "CompetenciaPlantilla" ("CompetenciaPlantilla_ID")
+)""",
+    'CREATE INDEX "ix_AlumnoCompetencia_CompetenciaPlantilla_ID" ON "AlumnoCompetencia" ("CompetenciaPlantilla_ID")',
+    'CREATE INDEX "ix_AlumnoCompetencia_Alumno_ID_CompetenciaPlantilla_ID_Valor_Calificacion" '
+    'ON "AlumnoCompetencia" ("Alumno_ID", "CompetenciaPlantilla_ID", "Valor_Calificacion")',
+)
+
+# Valor de una calificación guardada como texto en las bases anteriores: la
+# letra (en mayúscula o minúscula) o un número 1-4 ('3', '4.0', 2), como hacía
+# la tarea de mantenimiento que corregía las numéricas; otro número queda en C
+# y lo que no es letra ni número queda NULL (la fila no se copia)
+_VALOR_ANTERIOR_SQL = """CASE
+    WHEN UPPER(TRIM(Calificacion)) IN ('A', 'B', 'C', 'D')
+        THEN CASE UPPER(TRIM(Calificacion)) WHEN 'A' THEN 4 WHEN 'B' THEN 3 WHEN 'C' THEN 2 WHEN 'D' THEN 1 END
+    WHEN typeof(Calificacion) IN ('integer', 'real')
+         OR (Calificacion GLOB '*[0-9]*' AND Calificacion NOT GLOB '*[^0-9.]*')
+        THEN CASE WHEN CAST(Calificacion AS REAL) IN (1, 2, 3, 4) THEN CAST(Calificacion AS INTEGER) ELSE 2 END
+END"""
+
+def _calificaciones_numericas(conn):
+    """
+    AlumnoCompetencia con Valor_Calificacion (A=4 ... D=1) en lugar de la
+    letra, el índice (Alumno_ID, CompetenciaPlantilla_ID, Valor_Calificacion)
+    que cubre las lecturas por alumno y la vista VistaCalificaciones con la
+    letra. La tabla se reconstruye (_reconstruir_tabla) conservando
+    AlumnoCompetencia_ID.
+    """
+    descartadas = _reconstruir_tabla(conn, "AlumnoCompetencia", _TABLA_CALIFICACIONES, f"""
+        INSERT INTO "AlumnoCompetencia"
+            (AlumnoCompetencia_ID, Alumno_ID, CompetenciaPlantilla_ID, Valor_Calificacion, Conclusion_descriptiva)
+        SELECT AlumnoCompetencia_ID, Alumno_ID, CompetenciaPlantilla_ID, Valor, Conclusion_descriptiva
+        FROM (SELECT *, {_VALOR_ANTERIOR_SQL} AS Valor FROM "AlumnoCompetencia_anterior")
+        WHERE Valor IS NOT NULL
+        ORDER BY AlumnoCompetencia_ID
+    """)
+    if descartadas:
+        logger.warning(f"{descartadas} calificaciones no válidas (ni letra A-D ni número) no se copiaron")
+    _crear_vista_calificaciones(conn)
+
+# Migraciones en orden: (versión, descripción, función). La versión aplicada se
+# guarda en PRAGMA user_version. Para cambiar el esquema se agrega una entrada
+# al final; nunca se modifica una ya publicada.
+MIGRACIONES = [
+    (1, "Índices únicos de las claves naturales para el upsert de la ingesta", _crear_indices_unicos),
+    (2, "Índices de búsqueda por nombre, CI, competencia y curso", _crear_indices_consulta),
+    (3, "Índices de los listados por promedio y cluster", _crear_indices_listados),
+    (4, "Resúmenes de calificaciones por alumno (promedio, cantidad y conteo por letra)", _agregar_resumenes),
+    (5, "Perfiles de alumnos precalculados (PerfilesAlumno)", _materializar_perfiles),
+    (6, "Diccionario de tipos de inteligencia (TiposInteligencia) e Inteligencias por TipoInteligencia_ID", _normalizar_inteligencias),
+    (7, "Calificaciones como valor entero (Valor_Calificacion), índice por alumno y vista VistaCalificaciones", _calificaciones_numericas),
+]
+
+# Migraciones que cambian datos de los que se derivan los resúmenes de
+# calificaciones o los perfiles (ver _recalcular_derivados)
+RECALCULAR_TRAS = {4, 5, 6, 7}
+
+def _recalcular_derivados(conn):
+    """
+    Resúmenes de calificaciones y perfiles de todos los alumnos. Usa
+    services/resumenes.py y services/perfil_alumnos.py, que leen el esquema
+    de models.py, así que se ejecuta una sola vez, con la base ya en la
+    última versión, en la transacción de la última migración pendiente.
+    """
+    resumenes.actualizar_resumenes(conn)
+    # Sesión sobre la misma conexión: los documentos se guardan en la transacción de la migración
+    with Session(bind=conn) as db:
+        perfil_alumnos.materializar_perfiles(db)
+        db.flush()
+
+@event.listens_for(models.Base.metadata, "after_create")
+def _base_nueva(metadata, conn, tables=(), **kw):
+    """
+    Si create_all acaba de crear Alumnos, la base es nueva y ya tiene el
+    esquema de models.py: se crean los objetos que create_all no conoce (la
+    vista de calificaciones) y la base queda en la última versión, ya que las
+    migraciones convierten bases anteriores y su SQL no vale para el esquema actual.
+    """
+    if models.Alumno.__table__ in tables:
+        _crear_vista_calificaciones(conn)
+        conn.execute(text(f"PRAGMA user_version = {MIGRACIONES[-1][0]}"))
+
+def version_actual(engine) -> int:
+    """Versión del esquema guardada en la base (0 si nunca se migró)."""
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar()
+
+def aplicar_migraciones(engine) -> int:
+    """
+    Aplica en orden las migraciones pendientes, cada una en su propia
+    transacción junto con el cambio de versión, de modo que una migración que
+    falla no queda a medias ni se da por aplicada. Si alguna está en
+    RECALCULAR_TRAS, la última recalcula además los resúmenes y perfiles.
+    Se llama al iniciar la aplicación, después de create_all (una base recién
+    creada ya está en la última versión). Devuelve la versión final.
+    """
+    version = version_actual(engine)
+    pendientes = [migracion for migracion in MIGRACIONES if migracion[0] > version]
+    recalcular = any(numero in RECALCULAR_TRAS for numero, _, _ in pendientes)
+    for numero, descripcion, migracion in pendientes:
+        logger.info(f"Aplicando migración {numero}: {descripcion}")
+        with engine.begin() as conn:
+            migracion(conn)
+            if recalcular and numero == pendientes[-1][0]:
+                logger.info("Recalculando resúmenes y perfiles de todos los alumnos")
+                _recalcular_derivados(conn)
+            conn.execute(text(f"PRAGMA user_version = {numero}"))
+        version = numero
+    return version
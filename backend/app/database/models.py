@@ -1,19 +1,32 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, BLOB
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, SmallInteger, String, Float, ForeignKey, Text, BLOB, Boolean, DateTime, UniqueConstraint, Index, CheckConstraint, select, case
+from sqlalchemy.orm import relationship, column_property
 from .database import Base
 
+# Escala de las calificaciones: se guarda el valor (A=4 ... D=1) y la letra se deriva de él
+VALOR_CALIFICACION = {"A": 4, "B": 3, "C": 2, "D": 1}
+
 class Alumno(Base):
     __tablename__ = "Alumnos"
     Alumno_ID = Column(Integer, primary_key=True, index=True)
-    Nombre = Column(String, nullable=False)
-    Promedio_Calificaciones = Column(Float)
+    Nombre = Column(String, nullable=False, index=True)
+    Promedio_Calificaciones = Column(Float, index=True)
     Cantidad_Competencias = Column(Integer)
-    CI = Column(Integer)
-    Cluster_KMeans = Column(Integer)
+    # Conteo de calificaciones por letra, mantenido junto con el promedio (services/resumenes.py)
+    Cant_A = Column(Integer, default=0)
+    Cant_B = Column(Integer, default=0)
+    Cant_C = Column(Integer, default=0)
+    Cant_D = Column(Integer, default=0)
+    CI = Column(Integer, index=True)
+    Cluster_KMeans = Column(Integer, index=True)
     Cluster_DBSCAN = Column(Integer)
     Recomendaciones_Basicas = Column(Text)
     calificaciones = relationship("AlumnoCompetencia", back_populates="alumno")
-    inteligencias = relationship("Inteligencia", back_populates="alumno")
+    inteligencias = relationship("Inteligencia", back_populates="alumno", order_by="Inteligencia.Tipo_Inteligencia")
+
+class PerfilAlumno(Base):
+    __tablename__ = "PerfilesAlumno"
+    Alumno_ID = Column(Integer, ForeignKey("Alumnos.Alumno_ID"), primary_key=True)
+    Documento = Column(Text, nullable=False)  # Perfil precalculado en JSON (services/perfil_alumnos.py)
 
 class Curso(Base):
     __tablename__ = "Cursos"
@@ -24,24 +37,60 @@ class Curso(Base):
 class CompetenciaPlantilla(Base):
     __tablename__ = "CompetenciaPlantilla"
     CompetenciaPlantilla_ID = Column(Integer, primary_key=True, index=True)
-    Curso_ID = Column(Integer, ForeignKey("Cursos.Curso_ID"))
+    Curso_ID = Column(Integer, ForeignKey("Cursos.Curso_ID"), index=True)
     Codigo_Competencia = Column(String, nullable=False)
     Descripcion = Column(Text)
     curso = relationship("Curso", back_populates="competencias")
 
 class AlumnoCompetencia(Base):
     __tablename__ = "AlumnoCompetencia"
-    AlumnoCompetencia_ID = Column(Integer, primary_key=True, index=True)
+    AlumnoCompetencia_ID = Column(Integer, primary_key=True)
     Alumno_ID = Column(Integer, ForeignKey("Alumnos.Alumno_ID"))
-    CompetenciaPlantilla_ID = Column(Integer, ForeignKey("CompetenciaPlantilla.CompetenciaPlantilla_ID"))
-    Calificacion = Column(String(1), nullable=False)
+    CompetenciaPlantilla_ID = Column(Integer, ForeignKey("CompetenciaPlantilla.CompetenciaPlantilla_ID"), index=True)
+    Valor_Calificacion = Column(SmallInteger, nullable=False)
     Conclusion_descriptiva = Column(Text)
+    # Letra A-D, solo lectura: para escribir se asigna Valor_Calificacion (VALOR_CALIFICACION)
+    Calificacion = column_property(case({valor: letra for letra, valor in VALOR_CALIFICACION.items()}, value=Valor_Calificacion))
     alumno = relationship("Alumno", back_populates="calificaciones")
+    __table_args__ = (
+        UniqueConstraint("Alumno_ID", "CompetenciaPlantilla_ID"),
+        # Calificaciones de un alumno (resúmenes, perfiles, exportación) sin leer la tabla
+        Index("ix_AlumnoCompetencia_Alumno_ID_CompetenciaPlantilla_ID_Valor_Calificacion",
+              "Alumno_ID", "CompetenciaPlantilla_ID", "Valor_Calificacion"),
+        CheckConstraint("Valor_Calificacion BETWEEN 1 AND 4", name="ck_AlumnoCompetencia_Valor_Calificacion"),
+    )
+
+class TipoInteligencia(Base):
+    __tablename__ = "TiposInteligencia"
+    TipoInteligencia_ID = Column(Integer, primary_key=True)
+    Nombre = Column(String, unique=True, nullable=False)
 
 class Inteligencia(Base):
     __tablename__ = "Inteligencias"
-    Inteligencia_ID = Column(Integer, primary_key=True, index=True)
-    Alumno_ID = Column(Integer, ForeignKey("Alumnos.Alumno_ID"))
-    Tipo_Inteligencia = Column(String, nullable=False)
+    Inteligencia_ID = Column(Integer, primary_key=True)
+    Alumno_ID = Column(Integer, ForeignKey("Alumnos.Alumno_ID"), nullable=False)
+    TipoInteligencia_ID = Column(Integer, ForeignKey("TiposInteligencia.TipoInteligencia_ID"), nullable=False)
     Puntaje = Column(Float, nullable=False)
-    alumno = relationship("Alumno", back_populates="inteligencias")
\ No newline at end of file
+    # Nombre del tipo, solo lectura: para escribir se asigna TipoInteligencia_ID (services/tipos_inteligencia.py)
+    Tipo_Inteligencia = column_property(
+        select(TipoInteligencia.Nombre)
+        .where(TipoInteligencia.TipoInteligencia_ID == TipoInteligencia_ID)
+        .correlate_except(TipoInteligencia)
+        .scalar_subquery()
+    )
+    alumno = relationship("Alumno", back_populates="inteligencias")
+    __table_args__ = (
+        UniqueConstraint("Alumno_ID", "TipoInteligencia_ID"),
+        # Consultas por tipo sobre todos los alumnos (puntaje incluido en el índice)
+        Index("ix_Inteligencias_TipoInteligencia_ID_Puntaje", "TipoInteligencia_ID", "Puntaje"),
+    )
+
+class ArchivoProcesado(Base):
+    __tablename__ = "ArchivosProcesados"
+    ArchivoProcesado_ID = Column(Integer, primary_key=True, index=True)
+    Hash_SHA256 = Column(String(64), nullable=False)
+    Modo_Actualizacion = Column(Boolean, nullable=False)
+    Nombre_Archivo = Column(String)
+    Resultado = Column(Text, nullable=False)  # Resumen del procesamiento en JSON
+    Fecha_Procesado = Column(DateTime)
+    __table_args__ = (UniqueConstraint("Hash_SHA256", "Modo_Actualizacion"),)
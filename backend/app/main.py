@@ -2,9 +2,10 @@ from fastapi import FastAPI, Depends
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from app.database import database, models
+from app.database import database, models, migraciones
 from app.database.database import get_db
-from app.routers import alumnos, cursos, competencias, upload, inteligencias, ci, ai_assistant
+from app.services import paginacion
+from app.routers import alumnos, cursos, competencias, upload, inteligencias, ci, ai_assistant, exportacion
 
 app = FastAPI()
 
@@ -15,13 +16,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[paginacion.CABECERA_CURSOR],
 )
 
 # Montar archivos estáticos
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Crear tablas al iniciar
+# Crear tablas y aplicar las migraciones pendientes al iniciar
 models.Base.metadata.create_all(bind=database.engine)
+migraciones.aplicar_migraciones(database.engine)
 
 # Incluir routers
 app.include_router(upload.router, prefix="/api")
@@ -31,6 +34,7 @@ app.include_router(competencias.router, prefix="/api")
 app.include_router(inteligencias.router, prefix="/api")
 app.include_router(ci.router, prefix="/api")
 app.include_router(ai_assistant.router, prefix="/api")
+app.include_router(exportacion.router, prefix="/api")
 
 @app.get("/")
 def read_root():
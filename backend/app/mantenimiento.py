@@ -0,0 +1,70 @@
+"""
+Tareas de mantenimiento de la base de datos (ver services/mantenimiento.py),
+con sentencias SQL por conjuntos y en lotes cortos. Se ejecuta desde backend/:
+
+    python -m app.mantenimiento                        # todas las tareas
+    python -m app.mantenimiento --dry-run              # solo contar lo que se corregiría
+    python -m app.mantenimiento huerfanos descripciones --lote 5000
+    python -m app.mantenimiento --listar
+"""
+
+import os
+import sys
+import logging
+import argparse
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Configurar logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+def _mostrar_progreso(etapa: str, hechos: int, total: int):
+    print(f"  {etapa}: lote {hechos}/{total}", flush=True)
+
+def main(argv=None) -> int:
+    from app.services import mantenimiento
+
+    parser = argparse.ArgumentParser(prog="python -m app.mantenimiento",
+                                     description="Correcciones de datos por lotes, con simulación previa")
+    parser.add_argument("tareas", nargs="*", help="Tareas a ejecutar, en el orden de --listar (por defecto, todas)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Solo contar lo que se corregiría, sin escribir (cada tarea cuenta sobre la base actual)")
+    parser.add_argument("--lote", type=int, default=mantenimiento.TAMANO_LOTE,
+                        help=f"Filas por transacción (por defecto {mantenimiento.TAMANO_LOTE})")
+    parser.add_argument("--listar", action="store_true", help="Mostrar las tareas disponibles")
+    args = parser.parse_args(argv)
+
+    if args.listar:
+        for nombre, descripcion, _ in mantenimiento.TAREAS:
+            print(f"{nombre:16} {descripcion}")
+        return 0
+    if args.lote < 1:
+        parser.error("--lote debe ser mayor que 0")
+
+    # La base de datos se resuelve relativa a backend/, como en la aplicación
+    os.chdir(BACKEND_DIR)
+    from app.database import database, models, migraciones
+
+    models.Base.metadata.create_all(bind=database.engine)
+    migraciones.aplicar_migraciones(database.engine)
+
+    try:
+        resultados = mantenimiento.ejecutar(database.engine, args.tareas or None, aplicar=not args.dry_run,
+                                            tamano_lote=args.lote, progreso=_mostrar_progreso)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print("=" * 60)
+    for r in resultados:
+        if r["aplicada"]:
+            print(f"{r['tarea']:16} {r['corregidos']} corregidos de {r['pendientes']} "
+                  f"({r['segundos']:.2f}s, escritura más larga {r['escritura_max_ms']:.1f} ms)")
+        else:
+            print(f"{r['tarea']:16} {r['pendientes']} por corregir")
+    print("=" * 60)
+    if args.dry_run:
+        print("Simulación: no se modificó la base de datos")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
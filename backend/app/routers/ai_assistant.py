@@ -1,66 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.database.database import get_db
 from app.database import models
+from app.services import perfil_alumnos
 from app.services.ai_assistant import ai_assistant
 
 router = APIRouter(prefix="/ai-assistant", tags=["Asistente Pedagógica IA"])
 
+def _calificaciones_con_competencia(perfil: dict) -> list:
+    """Calificaciones del perfil cuya competencia existe, sin el curso"""
+    return [
+        {
+            "competencia": cal["competencia"],
+            "calificacion": cal["calificacion"],
+            "descripcion": cal["descripcion"]
+        } for cal in perfil["calificaciones"] if cal["competencia"] is not None
+    ]
+
 @router.get("/students")
-def get_students_for_ai(db: Session = Depends(get_db)):
-    """Obtener lista de alumnos con información básica para la IA"""
+def get_students_for_ai(alumno_ids: Optional[List[int]] = Query(None), db: Session = Depends(get_db)):
+    """Obtener lista de alumnos con información básica para la IA (todos o solo `alumno_ids`)"""
     try:
-        alumnos = db.query(models.Alumno).all()
+        perfiles = perfil_alumnos.cargar_perfiles(db, alumno_ids)
         
         students_list = []
-        for alumno in alumnos:
-            # Obtener CI
-            ci_info = None
-            if alumno.CI:
-                ci_info = {
-                    "valor": alumno.CI,
-                    "categoria": _get_ci_category(alumno.CI)
-                }
-            
-            # Obtener inteligencias
-            inteligencias = db.query(models.Inteligencia).filter(
-                models.Inteligencia.Alumno_ID == alumno.Alumno_ID
-            ).all()
-            
-            inteligencias_list = [
-                {
-                    "tipo": intel.Tipo_Inteligencia,
-                    "puntaje": intel.Puntaje
-                } for intel in inteligencias
-            ]
-            
-            # Obtener calificaciones
-            calificaciones = db.query(models.AlumnoCompetencia).filter(
-                models.AlumnoCompetencia.Alumno_ID == alumno.Alumno_ID
-            ).all()
-            
-            calificaciones_list = []
-            for cal in calificaciones:
-                competencia = db.query(models.CompetenciaPlantilla).filter(
-                    models.CompetenciaPlantilla.CompetenciaPlantilla_ID == cal.CompetenciaPlantilla_ID
-                ).first()
-                
-                if competencia:
-                    calificaciones_list.append({
-                        "competencia": competencia.Codigo_Competencia,
-                        "calificacion": cal.Calificacion,
-                        "descripcion": competencia.Descripcion
-                    })
-            
+        for perfil in perfiles:
+            calificaciones_list = _calificaciones_con_competencia(perfil)
             students_list.append({
-                "alumno_id": alumno.Alumno_ID,
-                "nombre": alumno.Nombre,
-                "ci": ci_info,
-                "inteligencias": inteligencias_list,
+                "alumno_id": perfil["alumno_id"],
+                "nombre": perfil["nombre"],
+                "ci": perfil_alumnos.info_ci(perfil["ci"]),
+                "inteligencias": perfil["inteligencias"],
                 "calificaciones": calificaciones_list,
-                "promedio": alumno.Promedio_Calificaciones,
-                "recomendaciones_basicas": alumno.Recomendaciones_Basicas,
+                "promedio": perfil["promedio"],
+                "recomendaciones_basicas": perfil["recomendaciones_basicas"],
                 "cantidad_competencias": len(calificaciones_list)
             })
         
@@ -75,99 +49,13 @@ def get_students_for_ai(db: Session = Depends(get_db)):
 
 @router.get("/student/{alumno_id}")
 def get_student_profile(alumno_id: int, db: Session = Depends(get_db)):
-    """Obtener perfil completo de un alumno específico"""
+    """Obtener perfil completo de un alumno específico (precalculado en PerfilesAlumno)"""
     try:
-        # Obtener alumno
-        alumno = db.query(models.Alumno).filter(models.Alumno.Alumno_ID == alumno_id).first()
-        if not alumno:
+        documento = perfil_alumnos.leer_documento(db, alumno_id)
+        if documento is None:
             raise HTTPException(status_code=404, detail="Alumno no encontrado")
-        
-        # Obtener CI
-        ci_info = None
-        if alumno.CI:
-            ci_info = {
-                "valor": alumno.CI,
-                "categoria": _get_ci_category(alumno.CI)
-            }
-        
-        # Obtener inteligencias
-        inteligencias = db.query(models.Inteligencia).filter(
-            models.Inteligencia.Alumno_ID == alumno.Alumno_ID
-        ).order_by(models.Inteligencia.Puntaje.desc()).all()
-        
-        inteligencias_list = [
-            {
-                "tipo": intel.Tipo_Inteligencia,
-                "puntaje": intel.Puntaje
-            } for intel in inteligencias
-        ]
-        
-        # Obtener calificaciones agrupadas por curso
-        calificaciones = db.query(models.AlumnoCompetencia).filter(
-            models.AlumnoCompetencia.Alumno_ID == alumno.Alumno_ID
-        ).all()
-        
-        calificaciones_por_curso = {}
-        for cal in calificaciones:
-            competencia = db.query(models.CompetenciaPlantilla).filter(
-                models.CompetenciaPlantilla.CompetenciaPlantilla_ID == cal.CompetenciaPlantilla_ID
-            ).first()
-            
-            if competencia:
-                curso = db.query(models.Curso).filter(
-                    models.Curso.Curso_ID == competencia.Curso_ID
-                ).first()
-                
-                if curso:
-                    if curso.Nombre not in calificaciones_por_curso:
-                        calificaciones_por_curso[curso.Nombre] = []
-                    
-                    calificaciones_por_curso[curso.Nombre].append({
-                        "competencia": competencia.Codigo_Competencia,
-                        "calificacion": cal.Calificacion,
-                        "descripcion": competencia.Descripcion
-                    })
-        
-        # Calcular estadísticas
-        total_calificaciones = len(calificaciones)
-        calificaciones_a = len([c for c in calificaciones if c.Calificacion == 'A'])
-        calificaciones_b = len([c for c in calificaciones if c.Calificacion == 'B'])
-        calificaciones_c = len([c for c in calificaciones if c.Calificacion == 'C'])
-        calificaciones_d = len([c for c in calificaciones if c.Calificacion == 'D'])
-        
-        # Inteligencias predominantes
-        inteligencias_predominantes = []
-        if inteligencias_list:
-            max_puntaje = max(intel['puntaje'] for intel in inteligencias_list)
-            inteligencias_predominantes = [
-                intel for intel in inteligencias_list 
-                if intel['puntaje'] >= max_puntaje * 0.8  # 80% del máximo
-            ]
-        
-        return {
-            "success": True,
-            "alumno": {
-                "alumno_id": alumno.Alumno_ID,
-                "nombre": alumno.Nombre,
-                "ci": ci_info,
-                "inteligencias": inteligencias_list,
-                "inteligencias_predominantes": inteligencias_predominantes,
-                "calificaciones_por_curso": calificaciones_por_curso,
-                "promedio": alumno.Promedio_Calificaciones,
-                "recomendaciones_basicas": alumno.Recomendaciones_Basicas,
-                "estadisticas": {
-                    "total_calificaciones": total_calificaciones,
-                    "calificaciones_a": calificaciones_a,
-                    "calificaciones_b": calificaciones_b,
-                    "calificaciones_c": calificaciones_c,
-                    "calificaciones_d": calificaciones_d,
-                    "porcentaje_excelente": (calificaciones_a / total_calificaciones * 100) if total_calificaciones > 0 else 0,
-                    "porcentaje_bueno": (calificaciones_b / total_calificaciones * 100) if total_calificaciones > 0 else 0,
-                    "porcentaje_regular": (calificaciones_c / total_calificaciones * 100) if total_calificaciones > 0 else 0,
-                    "porcentaje_deficiente": (calificaciones_d / total_calificaciones * 100) if total_calificaciones > 0 else 0
-                }
-            }
-        }
+        # El documento ya es JSON: se devuelve tal cual, sin decodificarlo ni volver a serializarlo
+        return Response(content=f'{{"success":true,"alumno":{documento}}}', media_type="application/json")
         
     except HTTPException:
         raise
@@ -179,48 +67,18 @@ def generate_ai_recommendations(alumno_id: int, db: Session = Depends(get_db)):
     """Generar recomendaciones pedagógicas personalizadas usando IA"""
     try:
         # Obtener perfil del alumno
-        alumno = db.query(models.Alumno).filter(models.Alumno.Alumno_ID == alumno_id).first()
-        if not alumno:
+        perfil = perfil_alumnos.cargar_perfil(db, alumno_id)
+        if not perfil:
             raise HTTPException(status_code=404, detail="Alumno no encontrado")
         
-        # Obtener inteligencias
-        inteligencias = db.query(models.Inteligencia).filter(
-            models.Inteligencia.Alumno_ID == alumno.Alumno_ID
-        ).all()
-        
-        inteligencias_list = [
-            {
-                "tipo": intel.Tipo_Inteligencia,
-                "puntaje": intel.Puntaje
-            } for intel in inteligencias
-        ]
-        
-        # Obtener calificaciones
-        calificaciones = db.query(models.AlumnoCompetencia).filter(
-            models.AlumnoCompetencia.Alumno_ID == alumno.Alumno_ID
-        ).all()
-        
-        calificaciones_list = []
-        for cal in calificaciones:
-            competencia = db.query(models.CompetenciaPlantilla).filter(
-                models.CompetenciaPlantilla.CompetenciaPlantilla_ID == cal.CompetenciaPlantilla_ID
-            ).first()
-            
-            if competencia:
-                calificaciones_list.append({
-                    "competencia": competencia.Codigo_Competencia,
-                    "calificacion": cal.Calificacion,
-                    "descripcion": competencia.Descripcion
-                })
-        
         # Preparar datos para la IA
         student_data = {
-            "alumno_id": alumno.Alumno_ID,
-            "nombre": alumno.Nombre,
-            "ci": alumno.CI,
-            "inteligencias": inteligencias_list,
-            "calificaciones": calificaciones_list,
-            "recomendaciones_basicas": alumno.Recomendaciones_Basicas
+            "alumno_id": perfil["alumno_id"],
+            "nombre": perfil["nombre"],
+            "ci": perfil["ci"],
+            "inteligencias": perfil["inteligencias"],
+            "calificaciones": _calificaciones_con_competencia(perfil),
+            "recomendaciones_basicas": perfil["recomendaciones_basicas"]
         }
         
         # Generar recomendaciones con IA
@@ -228,7 +86,7 @@ def generate_ai_recommendations(alumno_id: int, db: Session = Depends(get_db)):
         
         return {
             "success": ai_result["success"],
-            "student_name": alumno.Nombre,
+            "student_name": perfil["nombre"],
             "recommendations": ai_result["recommendations"],
             "analysis_summary": ai_result.get("analysis_summary", {}),
             "error": ai_result.get("error")
@@ -315,20 +173,3 @@ def clear_conversation(alumno_id: int, db: Session = Depends(get_db)):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al limpiar conversación: {str(e)}")
-
-def _get_ci_category(ci_value: int) -> str:
-    """Determinar categoría de CI"""
-    if ci_value >= 130:
-        return "Muy Superior"
-    elif ci_value >= 120:
-        return "Superior"
-    elif ci_value >= 110:
-        return "Promedio Alto"
-    elif ci_value >= 90:
-        return "Promedio"
-    elif ci_value >= 80:
-        return "Promedio Bajo"
-    elif ci_value >= 70:
-        return "Bajo"
-    else:
-        return "Muy Bajo" 
\ No newline at end of file
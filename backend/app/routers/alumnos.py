@@ -1,84 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from typing import Optional
 from app.database.database import get_db
 from app.database import models, crud
-from app.schemas import alumno
+from app.schemas import alumno, lotes
+from app.services import paginacion, escritura_lotes
 
 router = APIRouter()
 
-@router.get("/alumnos/")
-def read_alumnos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    alumnos = crud.get_alumnos(db, skip=skip, limit=limit)
-    # Convertir a formato JSON compatible
-    result = []
-    for alum in alumnos:
-        # Obtener inteligencias del alumno
-        inteligencias = db.query(models.Inteligencia).filter(
-            models.Inteligencia.Alumno_ID == alum.Alumno_ID
-        ).all()
-        
-        inteligencias_data = []
-        for intel in inteligencias:
-            inteligencias_data.append({
-                "Inteligencia_ID": intel.Inteligencia_ID,
-                "Tipo_Inteligencia": intel.Tipo_Inteligencia,
-                "Puntaje": intel.Puntaje
-            })
-        
-        result.append({
-            "id": alum.Alumno_ID,
-            "nombre": alum.Nombre,
-            "apellido": "",  # El nombre completo está en Nombre
-            "email": "",  # No hay campo email en el modelo
-            "edad": None,  # No hay campo edad en el modelo
-            "Alumno_ID": alum.Alumno_ID,
-            "Nombre": alum.Nombre,
-            "Promedio_Calificaciones": alum.Promedio_Calificaciones,
-            "Cantidad_Competencias": alum.Cantidad_Competencias,
-            "CI": alum.CI,
-            "Cluster_KMeans": alum.Cluster_KMeans,
-            "Cluster_DBSCAN": alum.Cluster_DBSCAN,
-            "Recomendaciones_Basicas": alum.Recomendaciones_Basicas,
-            "inteligencias": inteligencias_data
-        })
-    return result
-
-@router.get("/alumnos/{alumno_id}")
-def read_alumno(alumno_id: int, db: Session = Depends(get_db)):
-    db_alumno = crud.get_alumno(db, alumno_id=alumno_id)
-    if db_alumno is None:
-        raise HTTPException(status_code=404, detail="Alumno no encontrado")
-    
-    # Obtener inteligencias del alumno
-    inteligencias = db.query(models.Inteligencia).filter(
-        models.Inteligencia.Alumno_ID == alumno_id
-    ).all()
-    
-    inteligencias_data = []
-    for intel in inteligencias:
-        inteligencias_data.append({
+def _alumno_a_dict(alum: models.Alumno) -> dict:
+    """Convierte un alumno (con sus inteligencias ya cargadas) a formato JSON compatible"""
+    inteligencias_data = [
+        {
             "Inteligencia_ID": intel.Inteligencia_ID,
             "Tipo_Inteligencia": intel.Tipo_Inteligencia,
             "Puntaje": intel.Puntaje
-        })
-    
+        }
+        for intel in alum.inteligencias
+    ]
     return {
-        "id": db_alumno.Alumno_ID,
-        "nombre": db_alumno.Nombre,
-        "apellido": "",
-        "email": "",
-        "edad": None,
-        "Alumno_ID": db_alumno.Alumno_ID,
-        "Nombre": db_alumno.Nombre,
-        "Promedio_Calificaciones": db_alumno.Promedio_Calificaciones,
-        "Cantidad_Competencias": db_alumno.Cantidad_Competencias,
-        "CI": db_alumno.CI,
-        "Cluster_KMeans": db_alumno.Cluster_KMeans,
-        "Cluster_DBSCAN": db_alumno.Cluster_DBSCAN,
-        "Recomendaciones_Basicas": db_alumno.Recomendaciones_Basicas,
+        "id": alum.Alumno_ID,
+        "nombre": alum.Nombre,
+        "apellido": "",  # El nombre completo está en Nombre
+        "email": "",  # No hay campo email en el modelo
+        "edad": None,  # No hay campo edad en el modelo
+        "Alumno_ID": alum.Alumno_ID,
+        "Nombre": alum.Nombre,
+        "Promedio_Calificaciones": alum.Promedio_Calificaciones,
+        "Cantidad_Competencias": alum.Cantidad_Competencias,
+        "Cant_A": alum.Cant_A,
+        "Cant_B": alum.Cant_B,
+        "Cant_C": alum.Cant_C,
+        "Cant_D": alum.Cant_D,
+        "CI": alum.CI,
+        "Cluster_KMeans": alum.Cluster_KMeans,
+        "Cluster_DBSCAN": alum.Cluster_DBSCAN,
+        "Recomendaciones_Basicas": alum.Recomendaciones_Basicas,
         "inteligencias": inteligencias_data
     }
 
+@router.get("/alumnos/")
+def read_alumnos(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=1000),
+                 cursor: Optional[str] = None, orden: str = "id", descendente: bool = False,
+                 ci_min: Optional[int] = None, ci_max: Optional[int] = None,
+                 promedio_min: Optional[float] = None, promedio_max: Optional[float] = None,
+                 cluster: Optional[int] = None, curso_id: Optional[int] = None, nombre: Optional[str] = None,
+                 db: Session = Depends(get_db)):
+    """
+    Lista de alumnos filtrada y ordenada por id, nombre, ci o promedio. Si hay
+    más resultados, la cabecera X-Siguiente-Cursor trae el `cursor` de la
+    página siguiente (cada página cuesta lo mismo, a diferencia de `skip`).
+    """
+    try:
+        # Dos consultas por página: los alumnos y las inteligencias de todos ellos
+        alumnos, siguiente = crud.buscar_alumnos(
+            db, limit=limit, cursor=cursor, orden=orden, descendente=descendente, skip=skip, con_inteligencias=True,
+            ci_min=ci_min, ci_max=ci_max, promedio_min=promedio_min, promedio_max=promedio_max,
+            cluster=cluster, curso_id=curso_id, nombre=nombre
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers[paginacion.CABECERA_CURSOR] = siguiente
+    return [_alumno_a_dict(alum) for alum in alumnos]
+
+# Operaciones en lote: validan toda la petición, aplican los elementos válidos
+# con sentencias masivas en una sola transacción y devuelven el resultado de
+# cada elemento. Se declaran antes de las rutas /alumnos/{alumno_id} para que
+# "batch" no se tome como un ID.
+@router.post("/alumnos/batch", response_model=lotes.ResultadoLote)
+def create_alumnos_batch(datos: alumno.AlumnosLoteCrear, db: Session = Depends(get_db)):
+    """Crear varios alumnos"""
+    try:
+        return escritura_lotes.crear_alumnos(db, datos.alumnos)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al crear alumnos en lote: {str(e)}")
+
+@router.patch("/alumnos/batch", response_model=lotes.ResultadoLote)
+def update_alumnos_batch(datos: alumno.AlumnosLoteActualizar, db: Session = Depends(get_db)):
+    """Actualizar varios alumnos (por `id`)"""
+    try:
+        return escritura_lotes.actualizar_alumnos(db, datos.alumnos)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al actualizar alumnos en lote: {str(e)}")
+
+@router.delete("/alumnos/batch", response_model=lotes.ResultadoLote)
+def delete_alumnos_batch(datos: lotes.IdsLote, db: Session = Depends(get_db)):
+    """Eliminar varios alumnos (`ids` en el cuerpo)"""
+    try:
+        return escritura_lotes.eliminar_alumnos(db, datos.ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al eliminar alumnos en lote: {str(e)}")
+
+@router.get("/alumnos/{alumno_id}")
+def read_alumno(alumno_id: int, db: Session = Depends(get_db)):
+    db_alumno = crud.get_alumno(db, alumno_id=alumno_id, con_inteligencias=True)
+    if db_alumno is None:
+        raise HTTPException(status_code=404, detail="Alumno no encontrado")
+    return _alumno_a_dict(db_alumno)
+
 @router.post("/alumnos/")
 def create_alumno(alumno_data: alumno.AlumnoCreate, db: Session = Depends(get_db)):
     return crud.create_alumno(db=db, alumno=alumno_data)
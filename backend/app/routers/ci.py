@@ -1,16 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database.database import get_db
-from app.database import models
-from app.schemas import ci as schemas
+from app.database import models, crud
+from app.schemas import ci as schemas, lotes
+from app.services import paginacion, perfil_alumnos, escritura_lotes
 
 router = APIRouter(prefix="/ci", tags=["Coeficiente Intelectual"])
 
 @router.get("/", response_model=List[schemas.CI])
-def get_cis(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Obtener todos los registros de CI con paginación"""
-    cis = db.query(models.Alumno).filter(models.Alumno.CI.isnot(None)).offset(skip).limit(limit).all()
+def get_cis(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None,
+            orden: str = "id", descendente: bool = False, ci_min: Optional[int] = None, ci_max: Optional[int] = None,
+            db: Session = Depends(get_db)):
+    """
+    Obtener los registros de CI con paginación por cursor (cabecera
+    X-Siguiente-Cursor), filtrados por rango y ordenados por id o ci
+    """
+    if orden not in ("id", "ci"):
+        raise HTTPException(status_code=400, detail="Orden no válido: use 'id' o 'ci'")
+    try:
+        cis, siguiente = crud.buscar_alumnos(
+            db, limit=limit, cursor=cursor, orden=orden, descendente=descendente, skip=skip,
+            con_ci=True, ci_min=ci_min, ci_max=ci_max
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers[paginacion.CABECERA_CURSOR] = siguiente
     return [
         schemas.CI(
             CI_ID=alumno.Alumno_ID,
@@ -52,6 +68,7 @@ def create_ci(ci_data: schemas.CICreate, db: Session = Depends(get_db)):
     
     # Actualizar el CI del alumno
     alumno.CI = ci_data.Valor_CI
+    perfil_alumnos.materializar_perfiles(db, [alumno.Alumno_ID])
     db.commit()
     db.refresh(alumno)
     
@@ -64,6 +81,24 @@ def create_ci(ci_data: schemas.CICreate, db: Session = Depends(get_db)):
         Observaciones=ci_data.Observaciones
     )
 
+# Operaciones en lote (ver routers/alumnos.py). Se declaran antes de las rutas
+# /{alumno_id} para que "batch" no se tome como un ID.
+@router.patch("/batch", response_model=lotes.ResultadoLote)
+def update_cis_batch(datos: schemas.CILoteActualizar, db: Session = Depends(get_db)):
+    """Asignar el CI de varios alumnos"""
+    try:
+        return escritura_lotes.actualizar_ci(db, datos.cis)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al actualizar CI en lote: {str(e)}")
+
+@router.delete("/batch", response_model=lotes.ResultadoLote)
+def delete_cis_batch(datos: lotes.IdsLote, db: Session = Depends(get_db)):
+    """Eliminar el CI de varios alumnos (`ids` de alumnos en el cuerpo)"""
+    try:
+        return escritura_lotes.eliminar_ci(db, datos.ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al eliminar CI en lote: {str(e)}")
+
 @router.put("/{alumno_id}", response_model=schemas.CI)
 def update_ci(alumno_id: int, ci_data: schemas.CIUpdate, db: Session = Depends(get_db)):
     """Actualizar el CI de un alumno existente"""
@@ -78,6 +113,7 @@ def update_ci(alumno_id: int, ci_data: schemas.CIUpdate, db: Session = Depends(g
             setattr(alumno, "CI", value)
         # Los otros campos se pueden agregar a una tabla separada si es necesario
     
+    perfil_alumnos.materializar_perfiles(db, [alumno_id])
     db.commit()
     db.refresh(alumno)
     
@@ -98,6 +134,7 @@ def delete_ci(alumno_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Alumno no encontrado")
     
     alumno.CI = None
+    perfil_alumnos.materializar_perfiles(db, [alumno_id])
     db.commit()
     return {"message": "CI eliminado exitosamente"}
 
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.services import exportacion
+
+router = APIRouter(prefix="/export", tags=["Exportación"])
+
+def _descarga(bloques, nombre_archivo: str, media_type: str) -> StreamingResponse:
+    return StreamingResponse(bloques, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{nombre_archivo}"'})
+
+@router.get("/csv/{hoja}")
+def export_csv(hoja: str):
+    """Exportar una hoja (notas, inteligencia o ci) en CSV, con las columnas que acepta /api/upload"""
+    if hoja not in exportacion.HOJAS_EXPORTACION:
+        raise HTTPException(status_code=404, detail=f"Hoja no válida: '{hoja}'. Opciones: {', '.join(exportacion.HOJAS_EXPORTACION)}")
+    return _descarga(exportacion.exportar_csv(hoja), f"{hoja}.csv", "text/csv; charset=utf-8")
+
+@router.get("/zip")
+def export_zip():
+    """Exportar todos los alumnos como ZIP con notas.csv, inteligencia.csv y ci.csv (exportación por defecto: se envía mientras se genera)"""
+    return _descarga(exportacion.exportar_zip(), "alumnos.zip", "application/zip")
+
+@router.get("/xlsx")
+def export_xlsx():
+    """
+    Exportar todos los alumnos como libro Excel con las hojas notas, inteligencia y ci.
+    Con buffer: el libro se escribe entero en un archivo temporal antes de enviar
+    el primer byte, así que en bases grandes conviene /export/zip.
+    """
+    return _descarga(exportacion.exportar_xlsx(), "alumnos.xlsx",
+                     "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
@@ -1,18 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database.database import get_db
 from app.database import models
-from app.schemas import inteligencias as schemas
+from app.schemas import inteligencias as schemas, lotes
+from app.services import paginacion, perfil_alumnos, escritura_lotes, tipos_inteligencia
 
 router = APIRouter(prefix="/inteligencias", tags=["Inteligencias"])
 
+TIPO_REPETIDO = "Ya existe una inteligencia de ese tipo para el alumno"
+
+def _verificar_tipo_libre(db: Session, alumno_id: int, tipo_id: int, inteligencia_id: int = None):
+    """409 si el alumno ya tiene otra inteligencia de ese tipo (clave única Alumno_ID, TipoInteligencia_ID)"""
+    consulta = db.query(models.Inteligencia.Inteligencia_ID).filter(
+        models.Inteligencia.Alumno_ID == alumno_id,
+        models.Inteligencia.TipoInteligencia_ID == tipo_id
+    )
+    if inteligencia_id is not None:
+        consulta = consulta.filter(models.Inteligencia.Inteligencia_ID != inteligencia_id)
+    if consulta.first() is not None:
+        raise HTTPException(status_code=409, detail=TIPO_REPETIDO)
+
 @router.get("/", response_model=List[schemas.Inteligencia])
-def get_inteligencias(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Obtener todas las inteligencias con paginación"""
-    inteligencias = db.query(models.Inteligencia).offset(skip).limit(limit).all()
+def get_inteligencias(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=1000),
+                      cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    """Obtener todas las inteligencias con paginación por cursor (cabecera X-Siguiente-Cursor)"""
+    try:
+        inteligencias, siguiente = paginacion.paginar(
+            db.query(models.Inteligencia), models.Inteligencia.Inteligencia_ID, limit, cursor, saltar=skip
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers[paginacion.CABECERA_CURSOR] = siguiente
     return inteligencias
 
+# Operaciones en lote (ver routers/alumnos.py). Se declaran antes de las rutas
+# /{inteligencia_id} para que "batch" no se tome como un ID.
+@router.post("/batch", response_model=lotes.ResultadoLote)
+def save_inteligencias_batch(datos: schemas.InteligenciasLoteGuardar, db: Session = Depends(get_db)):
+    """Crear varias inteligencias; si el alumno ya tiene una del mismo tipo se actualiza su puntaje"""
+    try:
+        return escritura_lotes.guardar_inteligencias(db, datos.inteligencias)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al guardar inteligencias en lote: {str(e)}")
+
+@router.patch("/batch", response_model=lotes.ResultadoLote)
+def update_inteligencias_batch(datos: schemas.InteligenciasLoteActualizar, db: Session = Depends(get_db)):
+    """Actualizar varias inteligencias (por `Inteligencia_ID`)"""
+    try:
+        return escritura_lotes.actualizar_inteligencias(db, datos.inteligencias)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al actualizar inteligencias en lote: {str(e)}")
+
+@router.delete("/batch", response_model=lotes.ResultadoLote)
+def delete_inteligencias_batch(datos: lotes.IdsLote, db: Session = Depends(get_db)):
+    """Eliminar varias inteligencias (`ids` en el cuerpo)"""
+    try:
+        return escritura_lotes.eliminar_inteligencias(db, datos.ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al eliminar inteligencias en lote: {str(e)}")
+
 @router.get("/alumno/{alumno_id}", response_model=List[schemas.Inteligencia])
 def get_inteligencias_alumno(alumno_id: int, db: Session = Depends(get_db)):
     """Obtener todas las inteligencias de un alumno específico"""
@@ -40,9 +89,19 @@ def create_inteligencia(inteligencia: schemas.InteligenciaCreate, db: Session =
     if not alumno:
         raise HTTPException(status_code=404, detail="Alumno no encontrado")
     
-    db_inteligencia = models.Inteligencia(**inteligencia.dict())
+    datos = inteligencia.dict()
+    datos["TipoInteligencia_ID"] = tipos_inteligencia.id_tipo(db, datos.pop("Tipo_Inteligencia"))
+    _verificar_tipo_libre(db, datos["Alumno_ID"], datos["TipoInteligencia_ID"])
+    db_inteligencia = models.Inteligencia(**datos)
     db.add(db_inteligencia)
-    db.commit()
+    try:
+        db.flush()
+        perfil_alumnos.materializar_perfiles(db, [db_inteligencia.Alumno_ID])
+        db.commit()
+    except IntegrityError:
+        # Otra petición insertó el mismo tipo entre la verificación y el INSERT
+        db.rollback()
+        raise HTTPException(status_code=409, detail=TIPO_REPETIDO)
     db.refresh(db_inteligencia)
     return db_inteligencia
 
@@ -54,11 +113,21 @@ def update_inteligencia(inteligencia_id: int, inteligencia: schemas.Inteligencia
         raise HTTPException(status_code=404, detail="Inteligencia no encontrada")
     
     # Actualizar solo los campos proporcionados
+    alumno_anterior = db_inteligencia.Alumno_ID
     update_data = inteligencia.dict(exclude_unset=True)
+    tipo = update_data.pop("Tipo_Inteligencia", None)
+    if tipo is not None:
+        update_data["TipoInteligencia_ID"] = tipos_inteligencia.id_tipo(db, tipo)
     for field, value in update_data.items():
         setattr(db_inteligencia, field, value)
+    _verificar_tipo_libre(db, db_inteligencia.Alumno_ID, db_inteligencia.TipoInteligencia_ID, inteligencia_id)
     
-    db.commit()
+    try:
+        perfil_alumnos.materializar_perfiles(db, {alumno_anterior, db_inteligencia.Alumno_ID})
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=TIPO_REPETIDO)
     db.refresh(db_inteligencia)
     return db_inteligencia
 
@@ -70,6 +139,7 @@ def delete_inteligencia(inteligencia_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Inteligencia no encontrada")
     
     db.delete(db_inteligencia)
+    perfil_alumnos.materializar_perfiles(db, [db_inteligencia.Alumno_ID])
     db.commit()
     return {"message": "Inteligencia eliminada exitosamente"}
 
@@ -81,18 +151,17 @@ def delete_inteligencias_alumno(alumno_id: int, db: Session = Depends(get_db)):
     if not alumno:
         raise HTTPException(status_code=404, detail="Alumno no encontrado")
     
-    inteligencias = db.query(models.Inteligencia).filter(models.Inteligencia.Alumno_ID == alumno_id).all()
-    for inteligencia in inteligencias:
-        db.delete(inteligencia)
+    # Un solo DELETE en lugar de cargar y borrar cada fila
+    eliminadas = db.query(models.Inteligencia).filter(models.Inteligencia.Alumno_ID == alumno_id).delete(synchronize_session=False)
     
+    perfil_alumnos.materializar_perfiles(db, [alumno_id])
     db.commit()
-    return {"message": f"Se eliminaron {len(inteligencias)} inteligencias del alumno"}
+    return {"message": f"Se eliminaron {eliminadas} inteligencias del alumno"}
 
 @router.get("/tipos/lista")
 def get_tipos_inteligencia(db: Session = Depends(get_db)):
     """Obtener lista de todos los tipos de inteligencia únicos"""
-    tipos = db.query(models.Inteligencia.Tipo_Inteligencia).distinct().all()
-    return {"tipos_inteligencia": [tipo[0] for tipo in tipos]}
+    return {"tipos_inteligencia": tipos_inteligencia.listar_tipos(db)}
 
 @router.get("/estadisticas/alumno/{alumno_id}")
 def get_estadisticas_inteligencia_alumno(alumno_id: int, db: Session = Depends(get_db)):
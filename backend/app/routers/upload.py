@@ -1,66 +1,195 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
-from app.services import excel_processor
-from app.database.database import get_db
-import tempfile
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional, List
+from app.services import excel_processor, almacen_subidas, cache_subidas, ingesta_lote
+from app.services.ingesta_jobs import gestor_ingestas
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-@router.post("/upload")
+# Límite para el procesamiento normal (todas las hojas se cargan en memoria)
+LIMITE_TAMANO_ARCHIVO = 10 * 1024 * 1024
+# Límite para el modo streaming (memoria acotada, pensado para archivos de distrito)
+LIMITE_TAMANO_STREAMING = 500 * 1024 * 1024
+# Libros Excel, tablas CSV/Parquet sueltas (hoja de notas) o un ZIP con varias tablas
+EXTENSIONES_PERMITIDAS = ('.xlsx', '.xls', '.csv', '.parquet', '.zip')
+
+@router.post("/upload", status_code=202)
 async def upload_excel(
-    file: UploadFile = File(...), 
+    file: UploadFile = File(...),
     actualizar_existentes: bool = Query(True, description="Si es True, actualiza datos existentes. Si es False, solo crea nuevos registros"),
-    db: Session = Depends(get_db)
+    streaming: Optional[bool] = Query(None, description="Procesa el libro por lotes con memoria acotada. Por defecto se activa solo para archivos de más de 10MB"),
+    force: bool = Query(False, description="Procesa el archivo aunque ya se haya procesado uno idéntico en el mismo modo"),
+    validate_only: bool = Query(False, description="Solo valida el archivo y devuelve los errores por celda, sin escribir en la base de datos")
 ):
+    """
+    Recibe el archivo y lo encola para su procesamiento en segundo plano.
+    Devuelve el ID del trabajo; el avance y el resumen final se consultan en
+    GET /upload/jobs/{job_id}. Si al ejecutarse el trabajo el mismo archivo
+    ya fue el último procesado en el mismo modo y los datos no cambiaron
+    desde entonces, el trabajo devuelve su resumen sin tocar la base de datos.
+    Con validate_only=true el archivo se valida al momento y no se encola.
+    """
     logger.info(f"Recibiendo archivo: {file.filename}")
     logger.info(f"Modo actualización: {'Activado' if actualizar_existentes else 'Desactivado'}")
-    
+
     # Validar tipo de archivo
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        raise HTTPException(status_code=400, detail="Formato de archivo no válido. Solo se permiten archivos .xlsx y .xls")
-    
-    # Validar tamaño del archivo (máximo 10MB)
-    if file.size and file.size > 10 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="El archivo es demasiado grande. Máximo 10MB")
-    
+    if not file.filename.endswith(EXTENSIONES_PERMITIDAS):
+        raise HTTPException(status_code=400, detail="Formato de archivo no válido. Solo se permiten archivos .xlsx, .xls, .csv, .parquet y .zip")
+
+    # Validar tamaño del archivo (máximo 10MB, o el límite de streaming si se permite)
+    limite = LIMITE_TAMANO_ARCHIVO if streaming is False else LIMITE_TAMANO_STREAMING
+    if file.size and file.size > limite:
+        raise HTTPException(status_code=400, detail=f"El archivo es demasiado grande. Máximo {limite // (1024 * 1024)}MB")
+
     tmp_path = None
     try:
-        # Guardar archivo temporal
+        # Copiar el archivo a disco por bloques (sin leerlo entero en memoria)
         logger.info("Guardando archivo temporal...")
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-            content = await file.read()
-            tmp.write(content)
-            tmp_path = tmp.name
-            logger.info(f"Archivo temporal guardado en: {tmp_path}")
-        
-        # Verificar que el archivo se guardó correctamente
-        if not os.path.exists(tmp_path):
-            raise HTTPException(status_code=500, detail="Error al guardar el archivo temporal")
-        
-        # Procesar archivo
-        logger.info("Iniciando procesamiento del archivo...")
-        result = excel_processor.procesar_excel(db, tmp_path, modo_actualizacion=actualizar_existentes)
-        logger.info("Procesamiento completado exitosamente")
-        
-        return result
-        
+        try:
+            subida = await almacen_subidas.guardar_subida(file, limite)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        tmp_path = subida["ruta"]
+        parametros = {
+            "actualizar_existentes": actualizar_existentes,
+            "tamano_bytes": subida["tamano"],
+            "sha256": subida["sha256"]
+        }
+
+        # Solo validar: fuera del event loop y sin abrir una transacción de escritura
+        if validate_only:
+            tamano_lote = excel_processor.TAMANO_LOTE_STREAMING if subida["tamano"] > LIMITE_TAMANO_ARCHIVO else None
+            try:
+                validacion = await run_in_threadpool(excel_processor.validar_excel, tmp_path, tamano_lote)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"No se pudo leer el archivo: {str(e)}")
+            validacion["archivo"] = file.filename
+            return JSONResponse(content=validacion)
+
+        # Elegir el modo (en streaming si se pidió o si supera el límite normal)
+        tamano = subida["tamano"]
+        if streaming is None:
+            streaming = tamano > LIMITE_TAMANO_ARCHIVO
+        if not streaming and tamano > LIMITE_TAMANO_ARCHIVO:
+            raise HTTPException(status_code=400, detail="El archivo es demasiado grande. Máximo 10MB sin el modo streaming")
+        if streaming and not file.filename.endswith('.xlsx'):
+            raise HTTPException(status_code=400, detail="El modo streaming solo admite archivos .xlsx")
+
+        procesar = excel_processor.procesar_excel_streaming if streaming else excel_processor.procesar_excel
+        ruta, nombre_archivo = tmp_path, file.filename
+
+        def tarea(db, progreso):
+            # El caché se consulta al ejecutar el trabajo (no al recibir el archivo):
+            # los trabajos anteriores de la cola pueden haber cambiado los datos
+            if not force:
+                resultado = cache_subidas.buscar_resultado(db, subida["sha256"], actualizar_existentes)
+                if resultado is not None:
+                    resultado["desde_cache"] = True
+                    return resultado
+            resultado = procesar(db, ruta, modo_actualizacion=actualizar_existentes, progreso=progreso)
+            cache_subidas.guardar_resultado(db, subida["sha256"], actualizar_existentes, nombre_archivo, resultado)
+            return resultado
+
+        # A partir de aquí el archivo temporal pertenece al trabajo
+        parametros["streaming"] = streaming
+        job_id = gestor_ingestas.encolar(tarea, file.filename, tmp_path=tmp_path, parametros=parametros)
+        tmp_path = None
+        logger.info(f"Archivo encolado ({tamano} bytes, streaming: {streaming}) como trabajo {job_id}")
+
+        return {
+            "mensaje": "Archivo recibido. El procesamiento continúa en segundo plano",
+            "job_id": job_id,
+            "estado": "en_cola"
+        }
+
     except HTTPException:
         # Re-lanzar HTTPExceptions sin modificar
         raise
     except Exception as e:
-        logger.error(f"Error procesando archivo: {str(e)}")
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Error procesando archivo: {str(e)}. Verifica que el archivo tenga las hojas requeridas: 'notas', 'inteligencia', 'ci'"
-        )
+        logger.error(f"Error recibiendo archivo: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error recibiendo archivo: {str(e)}")
     finally:
-        # Limpiar archivo temporal
+        # Limpiar archivo temporal si no llegó a encolarse
         if tmp_path and os.path.exists(tmp_path):
             try:
                 os.unlink(tmp_path)
                 logger.info("Archivo temporal eliminado")
             except Exception as e:
-                logger.warning(f"Error eliminando archivo temporal: {str(e)}")
\ No newline at end of file
+                logger.warning(f"Error eliminando archivo temporal: {str(e)}")
+
+@router.post("/upload/batch", status_code=202)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    actualizar_existentes: bool = Query(True, description="Si es True, actualiza datos existentes. Si es False, solo crea nuevos registros")
+):
+    """
+    Recibe varios libros Excel (por ejemplo uno por grado y sección) o archivos
+    ZIP que los contienen, y los encola como un único trabajo. Los libros se
+    leen en paralelo y se escriben uno a uno, cada uno en su propia
+    transacción; el resultado de cada archivo se consulta en
+    GET /upload/jobs/{job_id}.
+    """
+    logger.info(f"Recibiendo lote de {len(files)} archivos")
+
+    tmp_paths = []
+    try:
+        archivos = []
+        for file in files:
+            if not file.filename.endswith(EXTENSIONES_PERMITIDAS):
+                raise HTTPException(status_code=400, detail=f"Formato de archivo no válido: {file.filename}. Solo se permiten archivos .xlsx, .xls, .csv, .parquet y .zip")
+
+            # Un ZIP puede traer los libros de todo el colegio
+            limite = LIMITE_TAMANO_STREAMING if file.filename.endswith('.zip') else LIMITE_TAMANO_ARCHIVO
+            try:
+                subida = await almacen_subidas.guardar_subida(file, limite)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"{file.filename}: {e}")
+            tmp_paths.append(subida["ruta"])
+            archivos.append((file.filename, subida["ruta"]))
+
+        def tarea(db, progreso):
+            return ingesta_lote.procesar_lote(db, archivos, modo_actualizacion=actualizar_existentes,
+                                              limite_bytes=LIMITE_TAMANO_ARCHIVO, progreso=progreso)
+
+        # A partir de aquí los archivos temporales pertenecen al trabajo
+        parametros = {"actualizar_existentes": actualizar_existentes, "archivos": [nombre for nombre, _ in archivos]}
+        job_id = gestor_ingestas.encolar(tarea, f"Lote de {len(archivos)} archivos", tmp_path=tmp_paths, parametros=parametros)
+        tmp_paths = []
+        logger.info(f"Lote de {len(archivos)} archivos encolado como trabajo {job_id}")
+
+        return {
+            "mensaje": f"Lote de {len(archivos)} archivos recibido. El procesamiento continúa en segundo plano",
+            "job_id": job_id,
+            "estado": "en_cola"
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error recibiendo lote: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error recibiendo lote: {str(e)}")
+    finally:
+        # Limpiar los archivos temporales si el lote no llegó a encolarse
+        for ruta in tmp_paths:
+            if os.path.exists(ruta):
+                try:
+                    os.unlink(ruta)
+                except Exception as e:
+                    logger.warning(f"Error eliminando archivo temporal: {str(e)}")
+
+@router.get("/upload/jobs")
+def list_upload_jobs():
+    """Listar los trabajos de ingesta recientes"""
+    return gestor_ingestas.listar()
+
+@router.get("/upload/jobs/{job_id}")
+def get_upload_job(job_id: str):
+    """Obtener etapa, filas procesadas y resumen final de un trabajo de ingesta"""
+    trabajo = gestor_ingestas.obtener(job_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo de ingesta no encontrado")
+    return trabajo
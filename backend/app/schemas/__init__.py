@@ -2,3 +2,4 @@ from . import alumno
 from . import competencia
 from . import inteligencias
 from . import ci
+from . import lotes
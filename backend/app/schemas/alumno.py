@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.schemas.lotes import MAX_LOTE
 
 class AlumnoBase(BaseModel):
     nombre: str
@@ -19,3 +20,12 @@ class Alumno(AlumnoBase):
 
     class Config:
         from_attributes = True
+
+class AlumnoActualizacionLote(AlumnoUpdate):
+    id: int
+
+class AlumnosLoteCrear(BaseModel):
+    alumnos: List[AlumnoCreate] = Field(min_length=1, max_length=MAX_LOTE)
+
+class AlumnosLoteActualizar(BaseModel):
+    alumnos: List[AlumnoActualizacionLote] = Field(min_length=1, max_length=MAX_LOTE)
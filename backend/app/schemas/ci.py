@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.schemas.lotes import MAX_LOTE
 
 class CIBase(BaseModel):
     Alumno_ID: int
@@ -18,6 +19,9 @@ class CIUpdate(BaseModel):
     Tipo_Test: Optional[str] = None
     Observaciones: Optional[str] = None
 
+class CILoteActualizar(BaseModel):
+    cis: List[CICreate] = Field(min_length=1, max_length=MAX_LOTE)
+
 class CI(CIBase):
     CI_ID: int
 
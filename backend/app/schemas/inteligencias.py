@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.schemas.lotes import MAX_LOTE
 
 class InteligenciaBase(BaseModel):
     Alumno_ID: int
@@ -14,6 +15,15 @@ class InteligenciaUpdate(BaseModel):
     Tipo_Inteligencia: Optional[str] = None
     Puntaje: Optional[float] = None
 
+class InteligenciaActualizacionLote(InteligenciaUpdate):
+    Inteligencia_ID: int
+
+class InteligenciasLoteGuardar(BaseModel):
+    inteligencias: List[InteligenciaCreate] = Field(min_length=1, max_length=MAX_LOTE)
+
+class InteligenciasLoteActualizar(BaseModel):
+    inteligencias: List[InteligenciaActualizacionLote] = Field(min_length=1, max_length=MAX_LOTE)
+
 class Inteligencia(InteligenciaBase):
     Inteligencia_ID: int
 
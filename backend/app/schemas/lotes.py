@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# Máximo de elementos por petición en las operaciones en lote
+MAX_LOTE = 5000
+
+class IdsLote(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=MAX_LOTE)
+
+class ResultadoItem(BaseModel):
+    indice: int  # Posición del elemento en la petición
+    ok: bool
+    id: Optional[int] = None
+    estado: Optional[str] = None  # creado, actualizado, sin_cambios, eliminado
+    error: Optional[str] = None
+
+class ResultadoLote(BaseModel):
+    total: int
+    aplicados: int
+    errores: int
+    resultados: List[ResultadoItem]
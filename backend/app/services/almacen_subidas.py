@@ -0,0 +1,43 @@
+import os
+import hashlib
+import tempfile
+import logging
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de cada bloque copiado a disco
+TAMANO_BLOQUE = 1024 * 1024
+
+async def guardar_subida(file: UploadFile, limite_bytes: int) -> dict:
+    """
+    Copia el archivo subido a un temporal en bloques de TAMANO_BLOQUE bytes,
+    calculando su SHA-256 por el camino, sin cargarlo entero en memoria.
+    Lanza ValueError (y elimina el temporal) si supera `limite_bytes`.
+
+    Devuelve {"ruta", "sha256", "tamano"}; el temporal queda a cargo de quien llama.
+    """
+    sufijo = os.path.splitext(file.filename or "")[1] or ".xlsx"
+    hash_sha256 = hashlib.sha256()
+    tamano = 0
+
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=sufijo)
+    try:
+        while True:
+            bloque = await file.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            tamano += len(bloque)
+            if tamano > limite_bytes:
+                raise ValueError(f"El archivo es demasiado grande. Máximo {limite_bytes // (1024 * 1024)}MB")
+            hash_sha256.update(bloque)
+            await run_in_threadpool(tmp.write, bloque)
+        tmp.close()
+    except Exception:
+        tmp.close()
+        os.unlink(tmp.name)
+        raise
+
+    logger.info(f"Archivo temporal guardado en: {tmp.name} ({tamano} bytes, sha256 {hash_sha256.hexdigest()[:12]}...)")
+    return {"ruta": tmp.name, "sha256": hash_sha256.hexdigest(), "tamano": tamano}
@@ -0,0 +1,50 @@
+import json
+import logging
+from datetime import datetime
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from app.database import models
+
+logger = logging.getLogger(__name__)
+
+def buscar_resultado(db: Session, sha256: str, modo_actualizacion: bool):
+    """
+    Devuelve el resumen guardado de un archivo idéntico ya procesado en el
+    mismo modo, o None si no hay uno válido.
+    """
+    registro = db.query(models.ArchivoProcesado).filter(
+        models.ArchivoProcesado.Hash_SHA256 == sha256,
+        models.ArchivoProcesado.Modo_Actualizacion == modo_actualizacion
+    ).first()
+    if registro is None:
+        return None
+    logger.info(f"Archivo {sha256[:12]}... ya procesado el {registro.Fecha_Procesado}; se reutiliza su resultado")
+    return json.loads(registro.Resultado)
+
+def guardar_resultado(db: Session, sha256: str, modo_actualizacion: bool, nombre_archivo: str, resultado: dict):
+    """
+    Guarda el resumen de un archivo recién procesado. Las entradas de otros
+    archivos se descartan: tras esta ingesta la base de datos ya no refleja su
+    contenido, así que solo el último archivo procesado puede reutilizarse.
+    """
+    db.query(models.ArchivoProcesado).filter(
+        (models.ArchivoProcesado.Hash_SHA256 != sha256) |
+        (models.ArchivoProcesado.Modo_Actualizacion == modo_actualizacion)
+    ).delete(synchronize_session=False)
+    db.add(models.ArchivoProcesado(
+        Hash_SHA256=sha256,
+        Modo_Actualizacion=modo_actualizacion,
+        Nombre_Archivo=nombre_archivo,
+        Resultado=json.dumps(resultado, default=str),
+        Fecha_Procesado=datetime.now()
+    ))
+    db.commit()
+
+def invalidar(db):
+    """
+    Descarta los resúmenes guardados. Se llama en la misma transacción que
+    cualquier escritura sobre los datos (acepta una sesión o una conexión y no
+    hace commit): después de ella la base de datos ya no refleja necesariamente
+    el último archivo procesado, así que ese archivo debe volver a procesarse.
+    """
+    db.execute(delete(models.ArchivoProcesado))
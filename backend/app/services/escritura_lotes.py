@@ -0,0 +1,276 @@
+import logging
+from sqlalchemy import select, insert, update, delete, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.database import models
+from app.services import lotes_sql, perfil_alumnos, tipos_inteligencia
+
+logger = logging.getLogger(__name__)
+
+def _filas_por_id(db: Session, pk, columnas, ids) -> dict:
+    """{id: fila} de las filas que existen entre `ids`, con una consulta por cada lotes_sql.TAMANO_LOTE_SQL IDs."""
+    filas = {}
+    for lote in lotes_sql.en_lotes(set(ids)):
+        filas.update({fila[0]: fila for fila in db.execute(select(pk, *columnas).where(pk.in_(lote)))})
+    return filas
+
+def _ok(indice: int, id_, estado: str) -> dict:
+    return {"indice": indice, "ok": True, "id": id_, "estado": estado, "error": None}
+
+def _error(indice: int, id_, mensaje: str) -> dict:
+    return {"indice": indice, "ok": False, "id": id_, "estado": None, "error": mensaje}
+
+def _resumen(resultados: list) -> dict:
+    aplicados = sum(1 for resultado in resultados if resultado["ok"])
+    return {"total": len(resultados), "aplicados": aplicados, "errores": len(resultados) - aplicados, "resultados": resultados}
+
+def _validar_ids(ids, existentes, no_encontrado: str) -> list:
+    """Resultado de cada ID: error si no existe o se repite en la petición, None si es válido."""
+    vistos = set()
+    resultados = []
+    for indice, id_ in enumerate(ids):
+        if id_ in vistos:
+            resultados.append(_error(indice, id_, "Repetido en el lote"))
+        elif id_ not in existentes:
+            resultados.append(_error(indice, id_, no_encontrado))
+        else:
+            resultados.append(None)
+        vistos.add(id_)
+    return resultados
+
+def _aplicar(db: Session, operacion, *args) -> dict:
+    """
+    Ejecuta `operacion(db, *args)` (que devuelve los resultados por elemento)
+    en una sola transacción: commit si termina, rollback si falla cualquier
+    sentencia. Los elementos con error de validación no se escriben, pero no
+    impiden aplicar los demás.
+    """
+    try:
+        resultados = operacion(db, *args)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error en la operación en lote {operacion.__name__}: {e}", exc_info=True)
+        raise
+    resumen = _resumen(resultados)
+    logger.info(f"Lote {operacion.__name__}: {resumen['aplicados']} aplicados, {resumen['errores']} con error")
+    return resumen
+
+# --- Alumnos ---
+
+def _crear_alumnos(db: Session, alumnos) -> list:
+    # Mismos valores iniciales que crud.create_alumno, en un único INSERT con RETURNING
+    filas = [{
+        "Nombre": f"{alumno.nombre} {alumno.apellido}",
+        "Promedio_Calificaciones": None,
+        "Cantidad_Competencias": 0,
+        "CI": 0,
+        "Cluster_KMeans": 0,
+        "Cluster_DBSCAN": 0,
+        "Recomendaciones_Basicas": ""
+    } for alumno in alumnos]
+    # RETURNING no garantiza el orden, pero SQLite asigna a cada fila nueva el
+    # mayor Alumno_ID existente + 1, así que ordenados corresponden a la petición.
+    # (sort_by_parameter_order haría un INSERT por fila en SQLite.)
+    ids = sorted(db.execute(insert(models.Alumno).returning(models.Alumno.Alumno_ID), filas).scalars().all())
+    perfil_alumnos.materializar_perfiles(db, ids)
+    return [_ok(indice, alumno_id, "creado") for indice, alumno_id in enumerate(ids)]
+
+def _actualizar_alumnos(db: Session, alumnos) -> list:
+    existentes = _filas_por_id(db, models.Alumno.Alumno_ID, [], [alumno.id for alumno in alumnos])
+    resultados = _validar_ids([alumno.id for alumno in alumnos], existentes, "Alumno no encontrado")
+    cambios = []
+    for indice, alumno in enumerate(alumnos):
+        if resultados[indice] is not None:
+            continue
+        # Como en crud.update_alumno, el nombre solo cambia si vienen nombre y apellido
+        if alumno.nombre and alumno.apellido:
+            cambios.append({"Alumno_ID": alumno.id, "Nombre": f"{alumno.nombre} {alumno.apellido}"})
+            resultados[indice] = _ok(indice, alumno.id, "actualizado")
+        else:
+            resultados[indice] = _ok(indice, alumno.id, "sin_cambios")
+    if cambios:
+        db.execute(update(models.Alumno), cambios)
+        perfil_alumnos.materializar_perfiles(db, [cambio["Alumno_ID"] for cambio in cambios])
+    return resultados
+
+def _eliminar_alumnos(db: Session, ids) -> list:
+    existentes = _filas_por_id(db, models.Alumno.Alumno_ID, [], ids)
+    resultados = _validar_ids(ids, existentes, "Alumno no encontrado")
+    validos = [id_ for id_, resultado in zip(ids, resultados) if resultado is None]
+    for lote in lotes_sql.en_lotes(validos):
+        # Alumno_ID es NOT NULL en calificaciones e inteligencias: se borran con el alumno
+        for modelo in (models.AlumnoCompetencia, models.Inteligencia, models.Alumno):
+            db.execute(delete(modelo).where(modelo.Alumno_ID.in_(lote)),
+                       execution_options={"synchronize_session": False})
+    perfil_alumnos.materializar_perfiles(db, validos)  # Borra sus documentos
+    return [resultado or _ok(indice, id_, "eliminado") for indice, (id_, resultado) in enumerate(zip(ids, resultados))]
+
+def crear_alumnos(db: Session, alumnos) -> dict:
+    """Crea los alumnos (schemas.alumno.AlumnoCreate) con un solo INSERT. Devuelve el resultado por elemento."""
+    return _aplicar(db, _crear_alumnos, alumnos)
+
+def actualizar_alumnos(db: Session, alumnos) -> dict:
+    """Cambia el nombre de los alumnos (AlumnoActualizacionLote) con un UPDATE masivo por clave primaria."""
+    return _aplicar(db, _actualizar_alumnos, alumnos)
+
+def eliminar_alumnos(db: Session, ids) -> dict:
+    """Elimina los alumnos indicados, con sus calificaciones e inteligencias, con un DELETE por tabla y cada lotes_sql.TAMANO_LOTE_SQL IDs."""
+    return _aplicar(db, _eliminar_alumnos, ids)
+
+# --- Inteligencias ---
+
+def _ids_inteligencias(db: Session, claves) -> dict:
+    """{(Alumno_ID, TipoInteligencia_ID): Inteligencia_ID} de las claves que ya existen."""
+    ids = {}
+    for lote in lotes_sql.en_lotes(claves):
+        ids.update({(alumno_id, tipo): intel_id for intel_id, alumno_id, tipo in db.execute(
+            select(models.Inteligencia.Inteligencia_ID, models.Inteligencia.Alumno_ID, models.Inteligencia.TipoInteligencia_ID)
+            .where(tuple_(models.Inteligencia.Alumno_ID, models.Inteligencia.TipoInteligencia_ID).in_(lote))
+        )})
+    return ids
+
+def _guardar_inteligencias(db: Session, inteligencias) -> list:
+    alumnos = _filas_por_id(db, models.Alumno.Alumno_ID, [], [intel.Alumno_ID for intel in inteligencias])
+    claves = [(intel.Alumno_ID, intel.Tipo_Inteligencia) for intel in inteligencias]
+    resultados = []
+    vistas = set()
+    for indice, (intel, clave) in enumerate(zip(inteligencias, claves)):
+        if intel.Alumno_ID not in alumnos:
+            resultados.append(_error(indice, None, "Alumno no encontrado"))
+        elif clave in vistas:
+            resultados.append(_error(indice, None, "Inteligencia repetida en el lote (mismo alumno y tipo)"))
+        else:
+            resultados.append(None)
+        vistas.add(clave)
+    if all(resultado is not None for resultado in resultados):
+        return resultados
+    # Las claves válidas pasan de nombre de tipo a TipoInteligencia_ID (creando los tipos nuevos)
+    tipos = tipos_inteligencia.ids_tipos(db, {intel.Tipo_Inteligencia for intel, resultado in zip(inteligencias, resultados)
+                                              if resultado is None})
+    validas = [(indice, (intel.Alumno_ID, tipos[intel.Tipo_Inteligencia]), intel)
+               for indice, intel in enumerate(inteligencias) if resultados[indice] is None]
+
+    anteriores = _ids_inteligencias(db, [clave for _, clave, _ in validas])
+    # Alta o actualización del puntaje por la clave natural (alumno, tipo), como en la ingesta
+    upsert = sqlite_insert(models.Inteligencia)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=["Alumno_ID", "TipoInteligencia_ID"],
+        set_={"Puntaje": upsert.excluded.Puntaje}
+    )
+    db.execute(upsert, [{"Alumno_ID": alumno_id, "TipoInteligencia_ID": tipo_id, "Puntaje": intel.Puntaje}
+                        for _, (alumno_id, tipo_id), intel in validas])
+    guardadas = _ids_inteligencias(db, [clave for _, clave, _ in validas])
+    for indice, clave, _ in validas:
+        resultados[indice] = _ok(indice, guardadas[clave], "actualizado" if clave in anteriores else "creado")
+    perfil_alumnos.materializar_perfiles(db, {clave[0] for _, clave, _ in validas})
+    return resultados
+
+def _actualizar_inteligencias(db: Session, inteligencias) -> list:
+    ids = [intel.Inteligencia_ID for intel in inteligencias]
+    existentes = _filas_por_id(db, models.Inteligencia.Inteligencia_ID,
+                               [models.Inteligencia.Alumno_ID, models.Inteligencia.TipoInteligencia_ID], ids)
+    resultados = _validar_ids(ids, existentes, "Inteligencia no encontrada")
+
+    # Valores finales de cada elemento (los campos que no vienen se conservan)
+    finales = {}
+    for indice, intel in enumerate(inteligencias):
+        if resultados[indice] is None:
+            _, alumno_id, tipo = existentes[intel.Inteligencia_ID]
+            # Un campo enviado como null no se modifica (las columnas no admiten NULL)
+            cambios = {campo: valor for campo, valor in intel.model_dump(exclude_unset=True, exclude={"Inteligencia_ID"}).items()
+                       if valor is not None}
+            finales[indice] = (alumno_id, tipo, cambios)
+    tipos = tipos_inteligencia.ids_tipos(db, {cambios["Tipo_Inteligencia"] for _, _, cambios in finales.values()
+                                              if "Tipo_Inteligencia" in cambios})
+    for _, _, cambios in finales.values():
+        if "Tipo_Inteligencia" in cambios:
+            cambios["TipoInteligencia_ID"] = tipos[cambios.pop("Tipo_Inteligencia")]
+    alumnos = _filas_por_id(db, models.Alumno.Alumno_ID, [],
+                            [cambios["Alumno_ID"] for _, _, cambios in finales.values() if "Alumno_ID" in cambios])
+
+    # Cada (alumno, tipo) resultante debe quedar libre: no puede pertenecer a
+    # otra inteligencia ni repetirse dentro del lote
+    claves = {indice: (cambios.get("Alumno_ID", alumno_id), cambios.get("TipoInteligencia_ID", tipo))
+              for indice, (alumno_id, tipo, cambios) in finales.items()}
+    ocupadas = _ids_inteligencias(db, set(claves.values()))
+    usadas = set()
+    filas, afectados = [], set()
+    for indice, (alumno_id, _, cambios) in finales.items():
+        intel_id = inteligencias[indice].Inteligencia_ID
+        clave = claves[indice]
+        if "Alumno_ID" in cambios and cambios["Alumno_ID"] not in alumnos:
+            resultados[indice] = _error(indice, intel_id, "Alumno no encontrado")
+        elif ocupadas.get(clave, intel_id) != intel_id or clave in usadas:
+            resultados[indice] = _error(indice, intel_id, "Ya existe una inteligencia de ese tipo para el alumno")
+        elif not cambios:
+            resultados[indice] = _ok(indice, intel_id, "sin_cambios")
+        else:
+            filas.append({"Inteligencia_ID": intel_id, **cambios})
+            afectados.update({alumno_id, clave[0]})
+            resultados[indice] = _ok(indice, intel_id, "actualizado")
+        usadas.add(clave)
+
+    # Cada grupo de filas con los mismos campos es un UPDATE masivo por clave primaria
+    grupos = {}
+    for fila in filas:
+        grupos.setdefault(tuple(sorted(fila)), []).append(fila)
+    for grupo in grupos.values():
+        db.execute(update(models.Inteligencia), grupo)
+    perfil_alumnos.materializar_perfiles(db, afectados)
+    return resultados
+
+def _eliminar_inteligencias(db: Session, ids) -> list:
+    existentes = _filas_por_id(db, models.Inteligencia.Inteligencia_ID, [models.Inteligencia.Alumno_ID], ids)
+    resultados = _validar_ids(ids, existentes, "Inteligencia no encontrada")
+    validos = [id_ for id_, resultado in zip(ids, resultados) if resultado is None]
+    for lote in lotes_sql.en_lotes(validos):
+        db.execute(delete(models.Inteligencia).where(models.Inteligencia.Inteligencia_ID.in_(lote)),
+                   execution_options={"synchronize_session": False})
+    perfil_alumnos.materializar_perfiles(db, {existentes[id_][1] for id_ in validos})
+    return [resultado or _ok(indice, id_, "eliminado") for indice, (id_, resultado) in enumerate(zip(ids, resultados))]
+
+def guardar_inteligencias(db: Session, inteligencias) -> dict:
+    """
+    Crea las inteligencias (InteligenciaCreate) o, si el alumno ya tiene una
+    del mismo tipo, actualiza su puntaje, con un único INSERT ... ON CONFLICT.
+    """
+    return _aplicar(db, _guardar_inteligencias, inteligencias)
+
+def actualizar_inteligencias(db: Session, inteligencias) -> dict:
+    """Actualiza por Inteligencia_ID los campos indicados (InteligenciaActualizacionLote), como PUT /inteligencias/{id}."""
+    return _aplicar(db, _actualizar_inteligencias, inteligencias)
+
+def eliminar_inteligencias(db: Session, ids) -> dict:
+    """Elimina las inteligencias indicadas con un DELETE por cada lotes_sql.TAMANO_LOTE_SQL IDs."""
+    return _aplicar(db, _eliminar_inteligencias, ids)
+
+# --- CI ---
+
+def _actualizar_ci(db: Session, cis) -> list:
+    ids = [ci.Alumno_ID for ci in cis]
+    existentes = _filas_por_id(db, models.Alumno.Alumno_ID, [], ids)
+    resultados = _validar_ids(ids, existentes, "Alumno no encontrado")
+    filas = [{"Alumno_ID": ci.Alumno_ID, "CI": ci.Valor_CI} for ci, resultado in zip(cis, resultados) if resultado is None]
+    if filas:
+        db.execute(update(models.Alumno), filas)
+        perfil_alumnos.materializar_perfiles(db, [fila["Alumno_ID"] for fila in filas])
+    return [resultado or _ok(indice, id_, "actualizado") for indice, (id_, resultado) in enumerate(zip(ids, resultados))]
+
+def _eliminar_ci(db: Session, ids) -> list:
+    existentes = _filas_por_id(db, models.Alumno.Alumno_ID, [], ids)
+    resultados = _validar_ids(ids, existentes, "Alumno no encontrado")
+    validos = [id_ for id_, resultado in zip(ids, resultados) if resultado is None]
+    for lote in lotes_sql.en_lotes(validos):
+        db.execute(update(models.Alumno).where(models.Alumno.Alumno_ID.in_(lote)).values(CI=None),
+                   execution_options={"synchronize_session": False})
+    perfil_alumnos.materializar_perfiles(db, validos)
+    return [resultado or _ok(indice, id_, "eliminado") for indice, (id_, resultado) in enumerate(zip(ids, resultados))]
+
+def actualizar_ci(db: Session, cis) -> dict:
+    """Asigna el CI de cada alumno (CICreate) con un UPDATE masivo por clave primaria."""
+    return _aplicar(db, _actualizar_ci, cis)
+
+def eliminar_ci(db: Session, ids) -> dict:
+    """Borra el CI (lo deja en NULL) de los alumnos indicados."""
+    return _aplicar(db, _eliminar_ci, ids)
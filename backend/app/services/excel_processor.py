@@ -1,6 +1,9 @@
 import pandas as pd
+from sqlalchemy import insert, update, delete, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from app.database import models
+from app.services import lector_excel, lotes_sql, perfilado, resumenes, perfil_alumnos, tipos_inteligencia
 from collections import defaultdict
 import logging
 
@@ -27,7 +30,7 @@ COMPETENCIAS_DESC = {
     "1_ingles_c3": "Escribe diversos tipos de textos en inglés como lengua extranjera",
     
     # Arte
-    "1_arte_c1": "Aprecia de manera crítica manifestaciones artísticas",
+    "1_arte_c1": "Aprecia de manera crítica manifestaciones artístico-culturales",
     "1_arte_c2": "Crea proyectos desde los lenguajes artísticos",
     
     # Ciencias Sociales
@@ -72,92 +75,335 @@ COMPETENCIAS_DESC = {
     "1_tj_c2": "Competencia de trabajo y juventud",
 }
 
-def procesar_excel(db: Session, file_path: str, modo_actualizacion: bool = True):
+# Conversión de calificaciones numéricas (1-4) a letras
+MAPEO_CALIFICACIONES = {'1': 'D', '2': 'C', '3': 'B', '4': 'A'}
+CALIFICACIONES_VALIDAS = ['A', 'B', 'C', 'D']
+
+# Filas por lote al leer libros grandes en modo streaming
+TAMANO_LOTE_STREAMING = 2000
+
+# Columnas obligatorias de cada hoja (validate_only revisa las tres; la
+# ingesta exige las de la hoja de notas) y rangos admitidos en la validación
+COLUMNAS_REQUERIDAS = {"notas": ["nom", "grado_seccion"], "inteligencia": ["nom", "grado_seccion"], "ci": ["nom", "ci"]}
+RANGO_CI = (40, 200)
+RANGO_PUNTAJE = (0, 100)
+# Máximo de errores de celda devueltos (el total se informa siempre)
+MAX_ERRORES_VALIDACION = 1000
+
+def _cargar_mapa_alumnos(db: Session, nombres=None):
     """
-    Procesa un archivo Excel que contiene notas, inteligencias y CI de alumnos,
-    y actualiza la base de datos.
+    Devuelve {Nombre: Alumno_ID} de todos los alumnos con una sola consulta,
+    o solo de los `nombres` indicados (consultados por lotes).
+    """
+    # Orden descendente para que, ante nombres repetidos, gane el ID más antiguo
+    consulta = db.query(models.Alumno.Nombre, models.Alumno.Alumno_ID).order_by(models.Alumno.Alumno_ID.desc())
+    if nombres is None:
+        return {nombre: alumno_id for nombre, alumno_id in consulta.all()}
+
+    mapa = {}
+    for lote in lotes_sql.en_lotes(set(nombres)):
+        mapa.update({nombre: alumno_id for nombre, alumno_id in consulta.filter(models.Alumno.Nombre.in_(lote)).all()})
+    return mapa
+
+def _insertar_masivo(db: Session, modelo, df: pd.DataFrame):
+    """Inserta todas las filas del DataFrame con un único executemany."""
+    if df.empty:
+        return 0
+    db.execute(insert(modelo), df.to_dict("records"))
+    return len(df)
+
+def _sincronizar(db: Session, modelo, clave: str, valor: str, nuevas_df: pd.DataFrame, alumno_ids, alumnos_modificados: set = None,
+                 eliminar: bool = True):
+    """
+    Motor de diferencias: compara el mapa (Alumno_ID, clave) -> valor entrante
+    con lo guardado para `alumno_ids` y escribe solo lo que cambió. Las altas y
+    modificaciones van en un único UPSERT nativo (INSERT ... ON CONFLICT DO
+    UPDATE sobre la restricción única de ambas columnas) y las bajas se
+    eliminan por clave primaria. Devuelve el conteo de cada tipo de cambio y,
+    si se pasa `alumnos_modificados`, agrega ahí los alumnos con algún cambio.
+    Con `eliminar=False` no hay bajas: las filas guardadas que no vienen en
+    `nuevas_df` se conservan (alumnos repetidos entre lotes del streaming).
+    """
+    tabla = modelo.__table__
+    pk = tabla.primary_key.columns.values()[0]
+    nuevas_df = nuevas_df[["Alumno_ID", clave, valor]].drop_duplicates(subset=["Alumno_ID", clave], keep="last")
+
+    guardadas = []
+    for lote in lotes_sql.en_lotes(alumno_ids):
+        guardadas.extend(db.execute(
+            select(pk, tabla.c.Alumno_ID, tabla.c[clave], tabla.c[valor]).where(tabla.c.Alumno_ID.in_(lote))
+        ).all())
+    guardadas_df = pd.DataFrame(guardadas, columns=[pk.name, "Alumno_ID", clave, valor])
+
+    cruce = nuevas_df.merge(guardadas_df, on=["Alumno_ID", clave], how="outer", suffixes=("", "_guardado"), indicator=True)
+    altas = cruce["_merge"] == "left_only"
+    bajas = (cruce["_merge"] == "right_only") & eliminar
+    ambas = cruce["_merge"] == "both"
+    modificadas = ambas & (cruce[valor] != cruce[f"{valor}_guardado"])
+
+    escribir = cruce.loc[altas | modificadas, ["Alumno_ID", clave, valor]]
+    if not escribir.empty:
+        upsert = sqlite_insert(tabla)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[tabla.c.Alumno_ID, tabla.c[clave]],
+            set_={valor: upsert.excluded[valor]}
+        )
+        db.execute(upsert, escribir.astype({"Alumno_ID": int}).astype(object).to_dict("records"))
+
+    ids_bajas = cruce.loc[bajas, pk.name].astype(int).tolist()
+    for lote in lotes_sql.en_lotes(ids_bajas):
+        db.execute(delete(tabla).where(pk.in_(lote)))
+
+    if alumnos_modificados is not None:
+        alumnos_modificados.update(cruce.loc[altas | modificadas | bajas, "Alumno_ID"].astype(int).tolist())
+
+    cambios = {
+        "insertadas": int(altas.sum()),
+        "actualizadas": int(modificadas.sum()),
+        "eliminadas": len(ids_bajas),
+        "sin_cambios": int((ambas & ~modificadas).sum())
+    }
+    logger.info(f"{tabla.name}: {cambios}")
+    return cambios
+
+def _sumar_cambios(total: dict, cambios: dict):
+    """Acumula los conteos de _sincronizar (usado al procesar por lotes)."""
+    for clave, cantidad in cambios.items():
+        total[clave] = total.get(clave, 0) + cantidad
+    return total
+
+def _normalizar_calificaciones(serie: pd.Series) -> pd.Series:
+    """Convierte calificaciones a letras A-D; los valores no válidos quedan como NaN."""
+    texto = serie.astype(str).str.strip().str.upper()
+    texto = texto.str.replace('.0', '', regex=False).map(MAPEO_CALIFICACIONES).fillna(texto)
+    return texto.where(texto.isin(CALIFICACIONES_VALIDAS))
+
+def _mapa_ci(ci_df: pd.DataFrame) -> pd.Series:
+    """Serie nombre -> CI (entero) con el primer valor válido de cada alumno."""
+    if ci_df.empty or "nom" not in ci_df.columns or "ci" not in ci_df.columns:
+        return pd.Series(dtype="int64")
+    primeros = ci_df.drop_duplicates(subset="nom", keep="first")
+    valores = pd.to_numeric(primeros["ci"], errors="coerce")
+    valores.index = primeros["nom"]
+    return valores.dropna().astype(int)
+
+def _columnas_faltantes(clave: str, columnas) -> list:
+    """Columnas obligatorias de la hoja `clave` que no están en `columnas`."""
+    return [columna for columna in COLUMNAS_REQUERIDAS[clave] if columna not in columnas]
+
+def _error_columna_faltante(columna: str) -> str:
+    return f"Falta la columna obligatoria '{columna}'"
+
+def _exigir_columnas_notas(columnas):
+    """ValueError, con el mismo mensaje que validate_only, si a la hoja de notas le falta una columna obligatoria."""
+    faltantes = _columnas_faltantes("notas", columnas)
+    if faltantes:
+        raise ValueError("; ".join(_error_columna_faltante(columna) for columna in faltantes))
+
+def _columnas_competencia(columnas):
+    """Columnas de la hoja de notas que corresponden a códigos de competencia."""
+    return [col for col in columnas if col not in ["grado_seccion", "nom", "1_apreciacion_tutor"] and "_conclusion" not in col and not col.startswith("Unnamed")]
+
+def _columnas_inteligencia(columnas):
+    """Columnas de la hoja de inteligencias que corresponden a tipos de inteligencia."""
+    return [col for col in columnas if col not in ['grado_seccion', 'nom'] and not col.startswith("Unnamed")]
+
+def _preparar_catalogo(db: Session, competencia_cols):
+    """
+    Crea los cursos y competencias que aún no existen para las columnas
+    de la hoja de notas. Devuelve los mapas nombre -> ID de ambos catálogos.
+    """
+    cursos_db = {c.Nombre: c.Curso_ID for c in db.query(models.Curso).all()}
+    competencias_db = {c.Codigo_Competencia: c.CompetenciaPlantilla_ID for c in db.query(models.CompetenciaPlantilla).all()}
+
+    for codigo_competencia in competencia_cols:
+        partes = codigo_competencia.split("_")
+        if len(partes) < 2: continue
+
+        nombre_curso = partes[1]
+        if nombre_curso not in cursos_db:
+            curso_obj = models.Curso(Nombre=nombre_curso)
+            db.add(curso_obj)
+            db.flush()
+            cursos_db[nombre_curso] = curso_obj.Curso_ID
+            logger.info(f"Curso creado: {nombre_curso}")
+
+        if codigo_competencia not in competencias_db:
+            comp_obj = models.CompetenciaPlantilla(
+                Curso_ID=cursos_db[nombre_curso],
+                Codigo_Competencia=codigo_competencia,
+                Descripcion=COMPETENCIAS_DESC.get(codigo_competencia, "")
+            )
+            db.add(comp_obj)
+            db.flush()
+            competencias_db[codigo_competencia] = comp_obj.CompetenciaPlantilla_ID
+            logger.info(f"Competencia creada: {codigo_competencia}")
+
+    return cursos_db, competencias_db
+
+def _fundir_inteligencias(intel_df: pd.DataFrame, value_vars) -> pd.DataFrame:
+    """Pasa la hoja de inteligencias a filas (nom, Tipo_Inteligencia, Puntaje) con puntaje numérico."""
+    intel_melted_df = intel_df.melt(
+        id_vars=['grado_seccion', 'nom'],
+        value_vars=value_vars,
+        var_name='Tipo_Inteligencia',
+        value_name='Puntaje'
+    )
+    intel_melted_df = intel_melted_df.dropna(subset=['Puntaje'])
+    intel_melted_df = intel_melted_df[pd.to_numeric(intel_melted_df['Puntaje'], errors='coerce').notnull()]
+    return intel_melted_df.astype({'Puntaje': float})
+
+def _con_tipos(db: Session, intel_df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega a las filas de inteligencias el TipoInteligencia_ID de cada tipo (creando los nuevos)."""
+    nombres = intel_df['Tipo_Inteligencia'].astype(str)
+    return intel_df.assign(TipoInteligencia_ID=nombres.map(tipos_inteligencia.ids_tipos(db, nombres.unique())))
+
+def _construir_perfil_alumnos(notas_df: pd.DataFrame, ci_df: pd.DataFrame, intel_melted_df: pd.DataFrame, modo_actualizacion: bool) -> pd.DataFrame:
+    """
+    Une las hojas de notas, CI e inteligencias en un solo DataFrame con una
+    fila por alumno de la hoja de notas, mediante joins por nombre (sin
+    recorrer las otras hojas por cada alumno). Columnas: nom,
+    Recomendaciones_Basicas, CI, en_ci y en_inteligencias.
+    """
+    nombres = notas_df["nom"] if "nom" in notas_df.columns else pd.Series(index=notas_df.index, dtype=object)
+    validos = nombres.notna() & (nombres.astype(str).str.strip() != "")
+
+    perfil_df = pd.DataFrame({"nom": nombres[validos].astype(str).str.strip()})
+    if "1_apreciacion_tutor" in notas_df.columns:
+        perfil_df["Recomendaciones_Basicas"] = notas_df.loc[validos, "1_apreciacion_tutor"].fillna("").astype(str).str.strip()
+    else:
+        perfil_df["Recomendaciones_Basicas"] = ""
+    perfil_df = perfil_df.drop_duplicates(subset="nom", keep="last" if modo_actualizacion else "first")
+
+    ci_por_nombre = _mapa_ci(ci_df).rename("CI").rename_axis("nom").reset_index()
+    intel_por_nombre = pd.DataFrame({"nom": intel_melted_df["nom"].unique() if not intel_melted_df.empty else []})
+    perfil_df = perfil_df.merge(ci_por_nombre.assign(en_ci=True), on="nom", how="left")
+    perfil_df = perfil_df.merge(intel_por_nombre.assign(en_inteligencias=True), on="nom", how="left")
+    return perfil_df.assign(en_ci=perfil_df["en_ci"].notna(), en_inteligencias=perfil_df["en_inteligencias"].notna())
+
+def _nombres_sin_notas(perfil_df: pd.DataFrame, nombres: pd.Series) -> list:
+    """Nombres de otra hoja que no tienen fila en la hoja de notas."""
+    nombres = pd.Series(nombres, dtype=object).drop_duplicates()
+    return nombres[~nombres.isin(perfil_df["nom"])].tolist()
+
+def _upsert_alumnos(db: Session, perfil_df: pd.DataFrame, nombre_a_id: dict, modo_actualizacion: bool):
+    """
+    Crea los alumnos nuevos y actualiza los existentes (en modo actualización)
+    con inserciones y actualizaciones masivas en lugar de una consulta por fila.
+    `perfil_df` es el resultado de _construir_perfil_alumnos.
+    """
+    alumnos_df = perfil_df[["nom", "Recomendaciones_Basicas", "CI"]]
+
+    existentes = alumnos_df["nom"].isin(nombre_a_id.keys())
+    nuevos_df = alumnos_df[~existentes]
+    existentes_df = alumnos_df[existentes].assign(Alumno_ID=lambda df: df["nom"].map(nombre_a_id))
+
+    # Alumnos nuevos: un solo INSERT masivo y recarga del mapa de IDs
+    ids_con_cambios = []
+    if not nuevos_df.empty:
+        filas = nuevos_df.rename(columns={"nom": "Nombre"})[["Nombre", "CI", "Recomendaciones_Basicas"]]
+        filas = filas.astype(object).where(filas.notna(), None)
+        _insertar_masivo(db, models.Alumno, filas)
+        nombre_a_id = {**nombre_a_id, **_cargar_mapa_alumnos(db, nuevos_df["nom"])}
+        ids_con_cambios.extend(int(nombre_a_id[nombre]) for nombre in nuevos_df["nom"])
+        logger.info(f"Alumnos creados: {len(nuevos_df)}")
+
+    # Alumnos existentes: UPDATE masivo por clave primaria solo de los que cambian
+    # (el CI solo si viene en la hoja)
+    ids_actualizados = []
+    if modo_actualizacion and not existentes_df.empty:
+        ids_actualizados = existentes_df["Alumno_ID"].astype(int).tolist()
+        guardados = []
+        for lote in lotes_sql.en_lotes(ids_actualizados):
+            guardados.extend(db.query(models.Alumno.Alumno_ID, models.Alumno.CI, models.Alumno.Recomendaciones_Basicas)
+                             .filter(models.Alumno.Alumno_ID.in_(lote)).all())
+        guardados_df = pd.DataFrame(guardados, columns=["Alumno_ID", "CI_guardado", "Recomendaciones_guardadas"])
+        comparados = existentes_df.astype({"Alumno_ID": int}).merge(guardados_df, on="Alumno_ID", how="left")
+
+        cambia_ci = comparados["CI"].notna() & (comparados["CI"] != comparados["CI_guardado"])
+        cambia_rec = comparados["Recomendaciones_Basicas"] != comparados["Recomendaciones_guardadas"]
+        for parte, columnas in ((comparados[cambia_ci], ["Alumno_ID", "CI", "Recomendaciones_Basicas"]),
+                                (comparados[~cambia_ci & cambia_rec], ["Alumno_ID", "Recomendaciones_Basicas"])):
+            if not parte.empty:
+                db.execute(update(models.Alumno), parte[columnas].astype(object).to_dict("records"))
+        ids_con_cambios.extend(comparados.loc[cambia_ci | cambia_rec, "Alumno_ID"].astype(int).tolist())
+        logger.info(f"Alumnos actualizados: {len(ids_actualizados)} ({int((cambia_ci | cambia_rec).sum())} con cambios)")
+
+    nombres_a_escribir = set(nuevos_df["nom"])
+    if modo_actualizacion:
+        nombres_a_escribir.update(existentes_df["nom"])
+
+    return {
+        "nombre_a_id": {nombre: nombre_a_id[nombre] for nombre in alumnos_df["nom"]},
+        "nombres_a_escribir": nombres_a_escribir,
+        "ids_actualizados": ids_actualizados,
+        "ids_con_cambios": ids_con_cambios,
+        "creados": len(nuevos_df),
+        "actualizados": len(ids_actualizados),
+        "procesados": len(nombres_a_escribir),
+    }
+
+def _calificaciones_largas(notas_df: pd.DataFrame, competencia_cols, competencias_db: dict, nombres_a_escribir, nombre_a_id: dict) -> pd.DataFrame:
+    """
+    Convierte la matriz alumno x competencia en filas (Alumno_ID,
+    CompetenciaPlantilla_ID, Valor_Calificacion) listas para la inserción
+    masiva. Las letras A-D se guardan con su valor (models.VALOR_CALIFICACION).
     """
+    columnas = [col for col in competencia_cols if col in competencias_db]
+    if not columnas or "nom" not in notas_df.columns:
+        return pd.DataFrame(columns=["Alumno_ID", "CompetenciaPlantilla_ID", "Valor_Calificacion"])
+
+    matriz = notas_df[["nom"] + columnas].dropna(subset=["nom"])
+    matriz = matriz.assign(nom=matriz["nom"].astype(str).str.strip())
+    matriz = matriz[matriz["nom"].isin(nombres_a_escribir)].drop_duplicates(subset="nom", keep="last")
+
+    largas = matriz.melt(id_vars="nom", var_name="Codigo_Competencia", value_name="Calificacion").dropna(subset=["Calificacion"])
+    largas["Calificacion"] = _normalizar_calificaciones(largas["Calificacion"])
+    largas = largas.dropna(subset=["Calificacion"])
+
+    return pd.DataFrame({
+        "Alumno_ID": largas["nom"].map(nombre_a_id).astype(int),
+        "CompetenciaPlantilla_ID": largas["Codigo_Competencia"].map(competencias_db).astype(int),
+        "Valor_Calificacion": largas["Calificacion"].map(models.VALOR_CALIFICACION).astype(int),
+    })
+
+def _sin_progreso(etapa: str, filas: int = None):
+    """Callback de progreso por defecto: no hace nada."""
+
+def preparar_ingesta(file_path: str, modo_actualizacion: bool = True, paralelo: bool = None, progreso=None) -> dict:
+    """
+    Primera mitad de procesar_excel: lee el libro, transforma las hojas y
+    construye el perfil de alumnos sin tocar la base de datos. El resultado
+    solo contiene DataFrames y diccionarios, de modo que puede calcularse en
+    otro proceso y pasarse después a escribir_ingesta.
+    """
+    perfil = perfilado.PerfiladorEtapas(progreso)
+    logger.info(f"Preparando ingesta del archivo: {file_path}. Modo actualización: {modo_actualizacion}")
     try:
-        logger.info(f"Iniciando procesamiento del archivo: {file_path}. Modo actualización: {modo_actualizacion}")
-
-        # --- 1. LECTURA DE HOJAS EXCEL ---
-        try:
-            notas_df = pd.read_excel(file_path, sheet_name="notas")
-            logger.info(f"Hoja 'notas' cargada con {len(notas_df)} filas.")
-        except Exception as e:
-            raise ValueError(f"Error al leer la hoja 'notas': {e}")
-
-        # Detectar automáticamente la hoja de inteligencias
-        try:
-            excel_file = pd.ExcelFile(file_path)
-            hojas_disponibles = excel_file.sheet_names
-            logger.info(f"Hojas disponibles en el archivo: {hojas_disponibles}")
-            
-            # Buscar hoja de inteligencias por nombre similar
-            hoja_inteligencia = None
-            palabras_clave = ['inteligencia', 'inteligencias', 'intel', 'multiple', 'múltiple', 'brain', 'cerebro']
-            
-            for hoja in hojas_disponibles:
-                hoja_lower = hoja.lower()
-                for palabra in palabras_clave:
-                    if palabra in hoja_lower:
-                        hoja_inteligencia = hoja
-                        logger.info(f"Hoja de inteligencias detectada: '{hoja}'")
-                        break
-                if hoja_inteligencia:
-                    break
-            
-            if hoja_inteligencia:
-                intel_df = pd.read_excel(file_path, sheet_name=hoja_inteligencia)
-                logger.info(f"Hoja '{hoja_inteligencia}' cargada con {len(intel_df)} filas.")
-            else:
-                logger.warning(f"No se encontró hoja de inteligencias. Hojas disponibles: {hojas_disponibles}")
-                intel_df = pd.DataFrame()
-                
-        except Exception as e:
-            logger.warning(f"No se pudo leer la hoja de inteligencias. Se continuará sin procesar inteligencias. Error: {e}")
-            intel_df = pd.DataFrame()
-
-        # Detectar automáticamente la hoja de CI
-        try:
-            # Buscar hoja de CI por nombre similar
-            hoja_ci = None
-            palabras_clave_ci = ['ci', 'coeficiente', 'intelectual', 'iq', 'intelligence', 'quotient']
-            
-            for hoja in hojas_disponibles:
-                hoja_lower = hoja.lower()
-                for palabra in palabras_clave_ci:
-                    if palabra in hoja_lower:
-                        hoja_ci = hoja
-                        logger.info(f"Hoja de CI detectada: '{hoja}'")
-                        break
-                if hoja_ci:
-                    break
-            
-            if hoja_ci:
-                ci_df = pd.read_excel(file_path, sheet_name=hoja_ci)
-                logger.info(f"Hoja '{hoja_ci}' cargada con {len(ci_df)} filas.")
-            else:
-                logger.warning(f"No se encontró hoja de CI. Hojas disponibles: {hojas_disponibles}")
-                ci_df = pd.DataFrame()
-                
-        except Exception as e:
-            logger.warning(f"No se pudo leer la hoja de CI. Se continuará sin procesar CI. Error: {e}")
-            ci_df = pd.DataFrame()
+        # --- 1. LECTURA DE HOJAS EXCEL (ver lector_excel.leer_libro) ---
+        perfil.etapa("lectura", 0)
+        libro = lector_excel.leer_libro(file_path, paralelo=paralelo)
+        notas_df = libro["notas"]
+        _exigir_columnas_notas(notas_df.columns)
+        intel_df = libro["inteligencia"]
+        ci_df = libro["ci"]
+        hoja_ci = libro["hoja_ci"]
+        perfil.filas(len(notas_df) + len(intel_df) + len(ci_df))
 
         # --- 2. TRANSFORMACIÓN DE DATOS DE INTELIGENCIA ---
+        perfil.etapa("transformacion")
         intel_melted_df = pd.DataFrame()
         inteligencias_info = {
             "hoja_encontrada": False,
             "hoja_detectada": None,
-            "hojas_disponibles": [],
+            "hojas_disponibles": libro["hojas_disponibles"],
             "columnas_requeridas": False,
             "tipos_encontrados": [],
             "registros_validos": 0,
             "alumnos_con_inteligencias": 0,
             "error_mensaje": None
         }
-        
+
         # Información de CI
         ci_info = {
             "hoja_encontrada": False,
@@ -167,66 +413,35 @@ def procesar_excel(db: Session, file_path: str, modo_actualizacion: bool = True)
             "alumnos_con_ci": 0,
             "error_mensaje": None
         }
-        
-        # Guardar información de hojas disponibles
-        try:
-            excel_file = pd.ExcelFile(file_path)
-            inteligencias_info["hojas_disponibles"] = excel_file.sheet_names
-        except:
-            pass
-        
+
         if not intel_df.empty:
             inteligencias_info["hoja_encontrada"] = True
-            # Obtener el nombre de la hoja detectada
-            try:
-                excel_file = pd.ExcelFile(file_path)
-                palabras_clave = ['inteligencia', 'inteligencias', 'intel', 'multiple', 'múltiple', 'brain', 'cerebro']
-                for hoja in excel_file.sheet_names:
-                    hoja_lower = hoja.lower()
-                    for palabra in palabras_clave:
-                        if palabra in hoja_lower:
-                            inteligencias_info["hoja_detectada"] = hoja
-                            break
-                    if inteligencias_info["hoja_detectada"]:
-                        break
-            except:
-                pass
-            
+            inteligencias_info["hoja_detectada"] = libro["hoja_inteligencia"]
+
             logger.info(f"Hoja de inteligencia encontrada: '{inteligencias_info['hoja_detectada']}' con {len(intel_df)} filas y columnas: {list(intel_df.columns)}")
-            
+
             # Verificar columnas requeridas
             if "nom" in intel_df.columns and "grado_seccion" in intel_df.columns:
                 inteligencias_info["columnas_requeridas"] = True
                 intel_df['nom'] = intel_df['nom'].astype(str).str.strip()
-                
+
                 # Identificar columnas de tipos de inteligencia
-                id_vars = ['grado_seccion', 'nom']
-                value_vars = [col for col in intel_df.columns if col not in id_vars and not col.startswith("Unnamed")]
+                value_vars = _columnas_inteligencia(intel_df.columns)
                 inteligencias_info["tipos_encontrados"] = value_vars
-                
+
                 logger.info(f"Tipos de inteligencia encontrados: {value_vars}")
-                
+
                 if value_vars:
                     try:
-                        intel_melted_df = intel_df.melt(
-                            id_vars=id_vars,
-                            value_vars=value_vars,
-                            var_name='Tipo_Inteligencia',
-                            value_name='Puntaje'
-                        )
-                        
-                        # Limpiar y validar datos
-                        registros_originales = len(intel_melted_df)
-                        intel_melted_df.dropna(subset=['Puntaje'], inplace=True)
-                        intel_melted_df = intel_melted_df[pd.to_numeric(intel_melted_df['Puntaje'], errors='coerce').notnull()]
-                        intel_melted_df['Puntaje'] = intel_melted_df['Puntaje'].astype(float)
-                        
+                        registros_originales = len(intel_df) * len(value_vars)
+                        intel_melted_df = _fundir_inteligencias(intel_df, value_vars)
+
                         inteligencias_info["registros_validos"] = len(intel_melted_df)
                         inteligencias_info["alumnos_con_inteligencias"] = len(intel_melted_df['nom'].unique())
-                        
+
                         logger.info(f"Transformación exitosa: {registros_originales} registros originales, {len(intel_melted_df)} registros válidos")
                         logger.info(f"Alumnos con datos de inteligencia: {inteligencias_info['alumnos_con_inteligencias']}")
-                        
+
                     except Exception as e:
                         inteligencias_info["error_mensaje"] = f"Error en transformación: {str(e)}"
                         logger.error(f"Error al transformar datos de inteligencia: {e}")
@@ -244,30 +459,30 @@ def procesar_excel(db: Session, file_path: str, modo_actualizacion: bool = True)
         if not ci_df.empty:
             ci_info["hoja_encontrada"] = True
             ci_info["hoja_detectada"] = hoja_ci
-            
+
             logger.info(f"Hoja de CI encontrada: '{ci_info['hoja_detectada']}' con {len(ci_df)} filas y columnas: {list(ci_df.columns)}")
-            
+
             # Verificar columnas requeridas para CI
             if "nom" in ci_df.columns and "ci" in ci_df.columns:
                 ci_info["columnas_requeridas"] = True
                 ci_df['nom'] = ci_df['nom'].astype(str).str.strip()
-                
+
                 try:
                     # Limpiar y validar datos de CI
                     ci_df_clean = ci_df[['nom', 'ci']].copy()
                     ci_df_clean = ci_df_clean.dropna(subset=['ci'])
                     ci_df_clean['ci'] = pd.to_numeric(ci_df_clean['ci'], errors='coerce')
                     ci_df_clean = ci_df_clean.dropna(subset=['ci'])
-                    
+
                     # Convertir CI a entero
                     ci_df_clean['ci'] = ci_df_clean['ci'].astype(int)
-                    
+
                     ci_info["registros_validos"] = len(ci_df_clean)
                     ci_info["alumnos_con_ci"] = len(ci_df_clean['nom'].unique())
-                    
+
                     logger.info(f"CI procesados: {len(ci_df_clean)} registros válidos")
                     logger.info(f"Alumnos con CI: {ci_info['alumnos_con_ci']}")
-                    
+
                 except Exception as e:
                     ci_info["error_mensaje"] = f"Error en procesamiento de CI: {str(e)}"
                     logger.error(f"Error al procesar datos de CI: {e}")
@@ -278,137 +493,105 @@ def procesar_excel(db: Session, file_path: str, modo_actualizacion: bool = True)
             ci_info["error_mensaje"] = f"No se pudo leer la hoja de CI. Hojas disponibles: {inteligencias_info['hojas_disponibles']}"
             logger.warning(f"No se pudo leer la hoja de CI. Hojas disponibles: {inteligencias_info['hojas_disponibles']}")
 
-        # --- 4. PROCESAR CURSOS Y COMPETENCIAS ---
-        cursos_db = {c.Nombre: c.Curso_ID for c in db.query(models.Curso).all()}
-        competencias_db = {c.Codigo_Competencia: c.CompetenciaPlantilla_ID for c in db.query(models.CompetenciaPlantilla).all()}
-        
-        competencia_cols = [col for col in notas_df.columns if col not in ["grado_seccion", "nom", "1_apreciacion_tutor"] and "_conclusion" not in col and not col.startswith("Unnamed")]
-        
-        for codigo_competencia in competencia_cols:
-            partes = codigo_competencia.split("_")
-            if len(partes) < 2: continue
-            
-            nombre_curso = partes[1]
-            if nombre_curso not in cursos_db:
-                curso_obj = models.Curso(Nombre=nombre_curso)
-                db.add(curso_obj)
-                db.flush()
-                cursos_db[nombre_curso] = curso_obj.Curso_ID
-                logger.info(f"Curso creado: {nombre_curso}")
-
-            if codigo_competencia not in competencias_db:
-                comp_obj = models.CompetenciaPlantilla(
-                    Curso_ID=cursos_db[nombre_curso],
-                    Codigo_Competencia=codigo_competencia,
-                    Descripcion=COMPETENCIAS_DESC.get(codigo_competencia, "")
-                )
-                db.add(comp_obj)
-                db.flush()
-                competencias_db[codigo_competencia] = comp_obj.CompetenciaPlantilla_ID
-                logger.info(f"Competencia creada: {codigo_competencia}")
-
-        # --- 5. PROCESAR ALUMNOS Y CALIFICACIONES ---
-        alumnos_procesados, alumnos_creados, alumnos_actualizados = 0, 0, 0
-        nombre_a_id = {}
-        
-        for _, row in notas_df.iterrows():
-            nombre = row.get("nom")
-            if pd.isna(nombre) or str(nombre).strip() == "": continue
-            
-            nombre_limpio = str(nombre).strip()
-            alumno_existente = db.query(models.Alumno).filter(models.Alumno.Nombre == nombre_limpio).first()
-            
-            alumno_obj = None
-            if alumno_existente:
-                if modo_actualizacion:
-                    alumno_obj = alumno_existente
-                    alumnos_actualizados += 1
-                else:
-                    nombre_a_id[nombre_limpio] = alumno_existente.Alumno_ID
-                    continue 
-            else:
-                alumno_obj = models.Alumno(Nombre=nombre_limpio)
-                db.add(alumno_obj)
-                db.flush()
-                alumnos_creados += 1
-            
-            nombre_a_id[nombre_limpio] = alumno_obj.Alumno_ID
-
-            # Actualizar CI y Recomendaciones
-            if not ci_df.empty and "nom" in ci_df.columns and "ci" in ci_df.columns:
-                ci_row = ci_df[ci_df["nom"] == nombre]
-                if not ci_row.empty:
-                    try:
-                        ci_valor = ci_row["ci"].values[0]
-                        if pd.notna(ci_valor):
-                            alumno_obj.CI = int(ci_valor)
-                    except (ValueError, TypeError): 
-                        pass
-            
-            alumno_obj.Recomendaciones_Basicas = str(row.get("1_apreciacion_tutor", "")).strip()
-
-            # Actualizar Calificaciones
-            if modo_actualizacion and alumno_existente:
-                db.query(models.AlumnoCompetencia).filter(models.AlumnoCompetencia.Alumno_ID == alumno_obj.Alumno_ID).delete()
-
-            for codigo_competencia in competencia_cols:
-                if codigo_competencia in row and pd.notna(row[codigo_competencia]):
-                    calif_str = str(row[codigo_competencia]).strip().upper()
-                    mapeo_num = {'1': 'D', '2': 'C', '3': 'B', '4': 'A'}
-                    calif_str = mapeo_num.get(calif_str.replace('.0', ''), calif_str)
-
-                    if calif_str in ['A', 'B', 'C', 'D']:
-                        db.add(models.AlumnoCompetencia(
-                            Alumno_ID=alumno_obj.Alumno_ID,
-                            CompetenciaPlantilla_ID=competencias_db[codigo_competencia],
-                            Calificacion=calif_str
-                        ))
-            alumnos_procesados += 1
-
-        # --- 6. PROCESAR INTELIGENCIAS MÚLTIPLES ---
+        # --- 4. PERFIL DE ALUMNOS: notas, CI e inteligencias unidos por nombre ---
+        perfil_df = _construir_perfil_alumnos(notas_df, ci_df, intel_melted_df, modo_actualizacion)
+        ci_sin_notas = _nombres_sin_notas(perfil_df, _mapa_ci(ci_df).index)
+        intel_sin_notas = _nombres_sin_notas(perfil_df, intel_melted_df["nom"]) if not intel_melted_df.empty else []
+        for hoja, sin_notas in (("CI", ci_sin_notas), ("inteligencias", intel_sin_notas)):
+            if sin_notas:
+                logger.warning(f"{len(sin_notas)} alumnos de la hoja de {hoja} no están en la hoja de notas y se omitirán: {sin_notas[:10]}")
+        ci_info["alumnos_sin_notas"] = len(ci_sin_notas)
+        inteligencias_info["alumnos_sin_notas"] = len(intel_sin_notas)
+        perfil.filas(len(notas_df) + len(intel_df) + len(ci_df))
+
+        return {
+            "archivo": file_path,
+            "modo_actualizacion": modo_actualizacion,
+            "notas_df": notas_df,
+            "intel_melted_df": intel_melted_df,
+            "perfil_df": perfil_df,
+            "inteligencias_info": inteligencias_info,
+            "ci_info": ci_info,
+            "perfilado": perfil.resumen()
+        }
+    finally:
+        perfil.detener()
+
+def escribir_ingesta(db: Session, preparado: dict, progreso=None) -> dict:
+    """
+    Segunda mitad de procesar_excel: escribe en la base de datos, en una sola
+    transacción, el resultado de preparar_ingesta y devuelve el resumen.
+    """
+    perfil = perfilado.PerfiladorEtapas(progreso, preparado.get("perfilado", {}).get("etapas"))
+    modo_actualizacion = preparado["modo_actualizacion"]
+    notas_df = preparado["notas_df"]
+    intel_melted_df = preparado["intel_melted_df"]
+    perfil_df = preparado["perfil_df"]
+    inteligencias_info = preparado["inteligencias_info"]
+    ci_info = preparado["ci_info"]
+    try:
+        # --- 1. PROCESAR CURSOS Y COMPETENCIAS ---
+        perfil.etapa("catalogo")
+        competencia_cols = _columnas_competencia(notas_df.columns)
+        cursos_db, competencias_db = _preparar_catalogo(db, competencia_cols)
+        perfil.filas(len(competencia_cols))
+
+        # --- 2. PROCESAR ALUMNOS Y CALIFICACIONES ---
+        perfil.etapa("alumnos")
+        nombre_a_id = _cargar_mapa_alumnos(db)
+        alumnos = _upsert_alumnos(db, perfil_df, nombre_a_id, modo_actualizacion)
+        nombre_a_id = alumnos["nombre_a_id"]
+
+        calificaciones_df = _calificaciones_largas(notas_df, competencia_cols, competencias_db, alumnos["nombres_a_escribir"], nombre_a_id)
+        alumnos_modificados = set()
+        cambios_calificaciones = _sincronizar(db, models.AlumnoCompetencia, "CompetenciaPlantilla_ID", "Valor_Calificacion",
+                                              calificaciones_df, alumnos["ids_actualizados"], alumnos_modificados)
+        resumenes.actualizar_resumenes(db, alumnos_modificados)
+        perfiles_modificados = alumnos_modificados | set(alumnos["ids_con_cambios"])
+        perfil.filas(len(notas_df))
+
+        # --- 3. PROCESAR INTELIGENCIAS MÚLTIPLES ---
+        perfil.etapa("inteligencias", len(notas_df))
+        perfil.filas(len(intel_melted_df))
         inteligencias_procesadas = 0
+        cambios_inteligencias = {}
         if not intel_melted_df.empty:
             logger.info("Iniciando procesamiento de inteligencias múltiples.")
-            
-            # Contar inteligencias existentes antes de eliminar
-            inteligencias_existentes = db.query(models.Inteligencia).filter(
-                models.Inteligencia.Alumno_ID.in_(list(nombre_a_id.values()))
-            ).count()
-            
-            ids_a_actualizar = [id for nombre, id in nombre_a_id.items() if nombre in intel_melted_df['nom'].unique()]
-            if ids_a_actualizar:
-                eliminadas = db.query(models.Inteligencia).filter(models.Inteligencia.Alumno_ID.in_(ids_a_actualizar)).delete(synchronize_session=False)
-                logger.info(f"Eliminadas {eliminadas} inteligencias existentes para {len(ids_a_actualizar)} alumnos")
-
-            for _, row in intel_melted_df.iterrows():
-                alumno_id = nombre_a_id.get(row['nom'])
-                if alumno_id:
-                    try:
-                        db.add(models.Inteligencia(
-                            Alumno_ID=alumno_id,
-                            Tipo_Inteligencia=row['Tipo_Inteligencia'],
-                            Puntaje=row['Puntaje']
-                        ))
-                        inteligencias_procesadas += 1
-                    except Exception as e:
-                        logger.error(f"Error al crear inteligencia para alumno {row['nom']}: {e}")
-                else:
-                    logger.warning(f"No se encontró el alumno '{row['nom']}' para asignarle inteligencia.")
-            
-            logger.info(f"Procesamiento de inteligencias completado: {inteligencias_procesadas} inteligencias creadas")
+
+            intel_df_ids = intel_melted_df.assign(Alumno_ID=intel_melted_df['nom'].map(nombre_a_id))
+            sin_alumno = intel_df_ids['Alumno_ID'].isna()
+            if sin_alumno.any():
+                nombres_sin_alumno = intel_df_ids.loc[sin_alumno, 'nom'].unique()
+                logger.warning(f"No se encontraron {len(nombres_sin_alumno)} alumnos para asignarles inteligencia: {list(nombres_sin_alumno[:10])}")
+            intel_df_ids = intel_df_ids[~sin_alumno].astype({'Alumno_ID': int})
+
+            ids_a_actualizar = intel_df_ids['Alumno_ID'].unique().tolist()
+            intel_df_ids = _con_tipos(db, intel_df_ids)
+            cambios_inteligencias = _sincronizar(db, models.Inteligencia, 'TipoInteligencia_ID', 'Puntaje', intel_df_ids, ids_a_actualizar, perfiles_modificados)
+            inteligencias_procesadas = len(intel_df_ids.drop_duplicates(subset=['Alumno_ID', 'Tipo_Inteligencia']))
+            logger.info(f"Procesamiento de inteligencias completado: {inteligencias_procesadas} inteligencias sincronizadas")
         else:
             logger.info("No hay datos de inteligencias válidos para procesar")
-        
+
+        # --- 4. PERFILES: se regeneran solo los de los alumnos con algún cambio ---
+        perfil.etapa("perfiles")
+        perfil.filas(perfil_alumnos.materializar_perfiles(db, perfiles_modificados))
+
+        perfil.etapa("commit")
         db.commit()
         logger.info("Commit final exitoso.")
 
-        return {
+        resultado = {
             "mensaje": "Archivo Excel procesado exitosamente",
-            "alumnos_procesados": alumnos_procesados,
-            "alumnos_creados": alumnos_creados,
-            "alumnos_actualizados": alumnos_actualizados,
+            "alumnos_procesados": alumnos["procesados"],
+            "alumnos_creados": alumnos["creados"],
+            "alumnos_actualizados": alumnos["actualizados"],
             "competencias_procesadas": len(competencia_cols),
             "cursos_procesados": len(cursos_db),
+            "cambios": {
+                "calificaciones": cambios_calificaciones,
+                "inteligencias": cambios_inteligencias
+            },
             "inteligencias": {
                 "procesadas": inteligencias_procesadas,
                 "hoja_encontrada": inteligencias_info["hoja_encontrada"],
@@ -418,6 +601,7 @@ def procesar_excel(db: Session, file_path: str, modo_actualizacion: bool = True)
                 "tipos_encontrados": inteligencias_info["tipos_encontrados"],
                 "registros_validos": inteligencias_info["registros_validos"],
                 "alumnos_con_inteligencias": inteligencias_info["alumnos_con_inteligencias"],
+                "alumnos_sin_notas": inteligencias_info["alumnos_sin_notas"],
                 "error_mensaje": inteligencias_info["error_mensaje"]
             },
             "ci": {
@@ -426,11 +610,406 @@ def procesar_excel(db: Session, file_path: str, modo_actualizacion: bool = True)
                 "columnas_requeridas": ci_info["columnas_requeridas"],
                 "registros_validos": ci_info["registros_validos"],
                 "alumnos_con_ci": ci_info["alumnos_con_ci"],
+                "alumnos_sin_notas": ci_info["alumnos_sin_notas"],
                 "error_mensaje": ci_info["error_mensaje"]
             }
         }
+        resultado["profiling"] = perfil.resumen()
+        perfilado.registrar_perfilado(preparado["archivo"], resultado["profiling"], modo_actualizacion=modo_actualizacion, streaming=False)
+        return resultado
 
     except Exception as e:
         db.rollback()
+        logger.error(f"Error fatal durante la escritura de {preparado['archivo']}: {e}", exc_info=True)
+        raise e
+    finally:
+        perfil.detener()
+
+def procesar_excel(db: Session, file_path: str, modo_actualizacion: bool = True, progreso=None):
+    """
+    Procesa un archivo Excel que contiene notas, inteligencias y CI de alumnos,
+    y actualiza la base de datos. Si se indica `progreso(etapa, filas)`, se
+    invoca al comenzar cada etapa con las filas de notas procesadas hasta ese momento.
+    """
+    logger.info(f"Iniciando procesamiento del archivo: {file_path}. Modo actualización: {modo_actualizacion}")
+    try:
+        preparado = preparar_ingesta(file_path, modo_actualizacion, progreso=progreso)
+    except Exception as e:
         logger.error(f"Error fatal durante el procesamiento del Excel: {e}", exc_info=True)
-        raise e
\ No newline at end of file
+        raise e
+    return escribir_ingesta(db, preparado, progreso)
+
+def _registrar_alumnos_ingesta(db: Session, nombre_a_id: dict, nombres_escritos):
+    """Guarda en la tabla temporal los alumnos vistos en la hoja de notas."""
+    if not nombre_a_id:
+        return
+    db.execute(text(
+        "INSERT INTO ingesta_alumnos (Nombre, Alumno_ID, Escrito) VALUES (:nom, :id, :escrito) "
+        "ON CONFLICT(Nombre) DO UPDATE SET Escrito = MAX(Escrito, excluded.Escrito)"
+    ), [{"nom": nombre, "id": int(alumno_id), "escrito": int(nombre in nombres_escritos)} for nombre, alumno_id in nombre_a_id.items()])
+
+def _consultar_por_nombres(db: Session, consulta: str, nombres) -> list:
+    """Ejecuta `consulta` (con el marcador {marcadores} en su IN) por lotes de nombres."""
+    filas = []
+    for lote in lotes_sql.en_lotes(set(nombres)):
+        parametros = {f"n{i}": nombre for i, nombre in enumerate(lote)}
+        marcadores = ", ".join(f":{clave}" for clave in parametros)
+        filas.extend(db.execute(text(consulta.format(marcadores=marcadores)), parametros).all())
+    return filas
+
+def _ids_ingesta(db: Session, nombres, solo_escritos: bool = False):
+    """
+    Resuelve {Nombre: Alumno_ID} contra los alumnos de la hoja de notas ya
+    procesados (con `solo_escritos`, solo los que se escribieron desde el archivo).
+    """
+    consulta = "SELECT Nombre, Alumno_ID FROM ingesta_alumnos WHERE Nombre IN ({marcadores})"
+    if solo_escritos:
+        consulta += " AND Escrito = 1"
+    return dict(_consultar_por_nombres(db, consulta, nombres))
+
+def _registrar_ci_ingesta(db: Session, ci_df: pd.DataFrame):
+    """Anota los nombres vistos en la hoja de CI y si tienen algún CI válido."""
+    con_ci = pd.to_numeric(ci_df["ci"], errors="coerce").notna().groupby(ci_df["nom"]).any()
+    if not con_ci.empty:
+        db.execute(text(
+            "INSERT INTO ingesta_ci (Nombre, Con_CI) VALUES (:nom, :con_ci) "
+            "ON CONFLICT(Nombre) DO UPDATE SET Con_CI = MAX(Con_CI, excluded.Con_CI)"
+        ), [{"nom": nombre, "con_ci": int(valido)} for nombre, valido in con_ci.items()])
+
+def _registrar_inteligencias_ingesta(db: Session, nombre_a_id: dict):
+    """Anota los nombres vistos en la hoja de inteligencias con su alumno (o NULL si no está en notas)."""
+    if nombre_a_id:
+        db.execute(text("INSERT OR IGNORE INTO ingesta_inteligencias (Nombre, Alumno_ID) VALUES (:nom, :id)"),
+                   [{"nom": nombre, "id": None if pd.isna(alumno_id) else int(alumno_id)} for nombre, alumno_id in nombre_a_id.items()])
+
+def _registrar_perfiles_ingesta(db: Session, alumno_ids):
+    """Anota en la tabla temporal los alumnos cuyo perfil hay que regenerar al final."""
+    if alumno_ids:
+        db.execute(text("INSERT OR IGNORE INTO ingesta_perfiles (Alumno_ID) VALUES (:id)"),
+                   [{"id": int(alumno_id)} for alumno_id in alumno_ids])
+
+def _materializar_perfiles_ingesta(db: Session, tamano_lote: int) -> int:
+    """Regenera, de a `tamano_lote` alumnos, los perfiles anotados en ingesta_perfiles."""
+    escritos, ultimo_id = 0, 0
+    while True:
+        ids = db.execute(text("SELECT Alumno_ID FROM ingesta_perfiles WHERE Alumno_ID > :ultimo ORDER BY Alumno_ID LIMIT :n"),
+                         {"ultimo": ultimo_id, "n": tamano_lote}).scalars().all()
+        if not ids:
+            return escritos
+        escritos += perfil_alumnos.materializar_perfiles(db, ids)
+        ultimo_id = ids[-1]
+
+def procesar_excel_streaming(db: Session, file_path: str, modo_actualizacion: bool = True, tamano_lote: int = TAMANO_LOTE_STREAMING, progreso=None):
+    """
+    Variante de procesar_excel para libros muy grandes: lee cada hoja con un
+    iterador de solo lectura en lotes de `tamano_lote` filas y escribe cada
+    lote en la base de datos antes de leer el siguiente, de modo que la memoria
+    usada no depende del tamaño del archivo. Los alumnos de la hoja de notas se
+    recuerdan en una tabla temporal de SQLite (no en memoria) para enlazar
+    después las hojas de CI e inteligencias. Todo ocurre en una única
+    transacción, igual que en procesar_excel.
+    """
+    progreso = progreso or _sin_progreso
+    perfil = perfilado.PerfiladorEtapas(progreso)
+    try:
+        logger.info(f"Iniciando procesamiento en streaming del archivo: {file_path}. Lotes de {tamano_lote} filas. Modo actualización: {modo_actualizacion}")
+
+        hojas_disponibles = lector_excel.hojas_del_libro(file_path)
+        detectadas = lector_excel.detectar_hojas(hojas_disponibles)
+        if detectadas["notas"] is None:
+            raise ValueError(f"Error al leer la hoja 'notas': el archivo no contiene una hoja 'notas'. Hojas disponibles: {hojas_disponibles}")
+
+        db.execute(text("CREATE TEMP TABLE IF NOT EXISTS ingesta_alumnos (Nombre TEXT PRIMARY KEY, Alumno_ID INTEGER NOT NULL, Escrito INTEGER NOT NULL)"))
+        db.execute(text("DELETE FROM ingesta_alumnos"))
+        db.execute(text("CREATE TEMP TABLE IF NOT EXISTS ingesta_perfiles (Alumno_ID INTEGER PRIMARY KEY)"))
+        db.execute(text("DELETE FROM ingesta_perfiles"))
+        db.execute(text("CREATE TEMP TABLE IF NOT EXISTS ingesta_ci (Nombre TEXT PRIMARY KEY, Con_CI INTEGER NOT NULL)"))
+        db.execute(text("DELETE FROM ingesta_ci"))
+        db.execute(text("CREATE TEMP TABLE IF NOT EXISTS ingesta_inteligencias (Nombre TEXT PRIMARY KEY, Alumno_ID INTEGER)"))
+        db.execute(text("DELETE FROM ingesta_inteligencias"))
+
+        # --- 1. NOTAS: catálogo con el primer lote, alumnos y calificaciones lote a lote ---
+        perfil.etapa("notas", 0)
+        totales = {"procesados": 0, "creados": 0, "actualizados": 0, "calificaciones": 0, "lotes": 0, "filas": 0}
+        cambios = {"calificaciones": {}, "inteligencias": {}}
+        competencia_cols, cursos_db, competencias_db = [], {}, {}
+        for lote_df in lector_excel.iterar_hoja(file_path, detectadas["notas"], tamano_lote):
+            if totales["lotes"] == 0:
+                _exigir_columnas_notas(lote_df.columns)
+                competencia_cols = _columnas_competencia(lote_df.columns)
+                cursos_db, competencias_db = _preparar_catalogo(db, competencia_cols)
+            totales["lotes"] += 1
+
+            nombres_lote = lote_df["nom"].dropna().astype(str).str.strip() if "nom" in lote_df.columns else []
+            perfil_df = _construir_perfil_alumnos(lote_df, pd.DataFrame(), pd.DataFrame(), modo_actualizacion)
+            # Alumnos repetidos de lotes anteriores: ya existen, así que en modo
+            # actualización su última fila reemplaza a la anterior y, si no, se
+            # conserva la primera; las calificaciones de los creados desde el
+            # archivo siguen la última fila, igual que en procesar_excel
+            previos = _ids_ingesta(db, perfil_df["nom"])
+            escritos_previos = _ids_ingesta(db, perfil_df["nom"], solo_escritos=True)
+            alumnos = _upsert_alumnos(db, perfil_df, _cargar_mapa_alumnos(db, nombres_lote), modo_actualizacion)
+            _registrar_alumnos_ingesta(db, alumnos["nombre_a_id"], alumnos["nombres_a_escribir"])
+
+            calificaciones_df = _calificaciones_largas(lote_df, competencia_cols, competencias_db,
+                                                       alumnos["nombres_a_escribir"] | set(escritos_previos), alumnos["nombre_a_id"])
+            alumnos_modificados = set()
+            _sumar_cambios(cambios["calificaciones"], _sincronizar(db, models.AlumnoCompetencia, "CompetenciaPlantilla_ID", "Valor_Calificacion",
+                                                                   calificaciones_df, set(alumnos["ids_actualizados"]) | set(escritos_previos.values()),
+                                                                   alumnos_modificados))
+            resumenes.actualizar_resumenes(db, alumnos_modificados)
+            _registrar_perfiles_ingesta(db, alumnos_modificados | set(alumnos["ids_con_cambios"]))
+            totales["calificaciones"] += len(calificaciones_df)
+            ya_contados = len(alumnos["nombres_a_escribir"] & previos.keys())
+            totales["procesados"] += alumnos["procesados"] - ya_contados
+            totales["creados"] += alumnos["creados"]
+            totales["actualizados"] += alumnos["actualizados"] - ya_contados
+            totales["filas"] += len(lote_df)
+            progreso("notas", totales["filas"])
+            logger.info(f"Lote {totales['lotes']} de notas escrito: {len(lote_df)} filas, {totales['procesados']} alumnos procesados en total")
+
+        # --- 2. CI: se aplica solo a los alumnos escritos desde la hoja de notas (gana la primera fila de cada nombre) ---
+        perfil.filas(totales["filas"])
+        perfil.etapa("ci")
+        ci_info = {"hoja_encontrada": detectadas["ci"] is not None, "hoja_detectada": detectadas["ci"],
+                   "columnas_requeridas": False, "registros_validos": 0, "alumnos_con_ci": 0, "alumnos_sin_notas": 0,
+                   "error_mensaje": None}
+        if detectadas["ci"]:
+            for lote_df in lector_excel.iterar_hoja(file_path, detectadas["ci"], tamano_lote):
+                if "nom" not in lote_df.columns or "ci" not in lote_df.columns:
+                    ci_info["error_mensaje"] = f"La hoja '{detectadas['ci']}' no contiene las columnas requeridas 'nom' y 'ci'"
+                    logger.error("La hoja de CI debe contener 'nom' y 'ci'. No se procesará.")
+                    break
+                ci_info["columnas_requeridas"] = True
+                lote_df = lote_df.assign(nom=lote_df["nom"].astype(str).str.strip())
+                vistos = {nombre for (nombre,) in _consultar_por_nombres(db, "SELECT Nombre FROM ingesta_ci WHERE Nombre IN ({marcadores})", lote_df["nom"])}
+                mapa_ci = _mapa_ci(lote_df[~lote_df["nom"].isin(vistos)])
+                _registrar_ci_ingesta(db, lote_df)
+                ci_info["registros_validos"] += int(pd.to_numeric(lote_df["ci"], errors="coerce").notna().sum())
+                ids_ci = _ids_ingesta(db, mapa_ci.index)
+                ci_info["alumnos_sin_notas"] += len(set(mapa_ci.index) - set(ids_ci))
+                _registrar_perfiles_ingesta(db, ids_ci.values())
+                if not mapa_ci.empty:
+                    db.execute(text(
+                        "UPDATE Alumnos SET CI = :ci WHERE Alumno_ID IN "
+                        "(SELECT Alumno_ID FROM ingesta_alumnos WHERE Nombre = :nom AND Escrito = 1)"
+                    ), [{"nom": nombre, "ci": int(ci)} for nombre, ci in mapa_ci.items()])
+            ci_info["alumnos_con_ci"] = db.execute(text("SELECT COUNT(*) FROM ingesta_ci WHERE Con_CI = 1")).scalar()
+        else:
+            ci_info["error_mensaje"] = f"No se pudo leer la hoja de CI. Hojas disponibles: {hojas_disponibles}"
+
+        # --- 3. INTELIGENCIAS: se reemplazan las de los alumnos presentes en la hoja de notas ---
+        # (un alumno repetido en lotes posteriores solo agrega o corrige tipos, sin borrar los anteriores)
+        perfil.filas(ci_info["registros_validos"])
+        perfil.etapa("inteligencias")
+        inteligencias_info = {"procesadas": 0, "hoja_encontrada": detectadas["inteligencia"] is not None,
+                              "hoja_detectada": detectadas["inteligencia"], "hojas_disponibles": hojas_disponibles,
+                              "columnas_requeridas": False, "tipos_encontrados": [], "registros_validos": 0,
+                              "alumnos_con_inteligencias": 0, "alumnos_sin_notas": 0, "error_mensaje": None}
+        if detectadas["inteligencia"]:
+            for lote_df in lector_excel.iterar_hoja(file_path, detectadas["inteligencia"], tamano_lote):
+                if "nom" not in lote_df.columns or "grado_seccion" not in lote_df.columns:
+                    inteligencias_info["error_mensaje"] = f"La hoja '{detectadas['inteligencia']}' no contiene las columnas requeridas 'nom' y 'grado_seccion'"
+                    logger.error("La hoja de inteligencia debe contener 'nom' y 'grado_seccion'. No se procesará.")
+                    break
+                inteligencias_info["columnas_requeridas"] = True
+                value_vars = _columnas_inteligencia(lote_df.columns)
+                inteligencias_info["tipos_encontrados"] = value_vars
+                if not value_vars:
+                    inteligencias_info["error_mensaje"] = "No se encontraron columnas de tipos de inteligencia válidas"
+                    break
+
+                intel_melted_df = _fundir_inteligencias(lote_df.assign(nom=lote_df["nom"].astype(str).str.strip()), value_vars)
+                inteligencias_info["registros_validos"] += len(intel_melted_df)
+
+                vistos = {nombre for (nombre,) in _consultar_por_nombres(db, "SELECT Nombre FROM ingesta_inteligencias WHERE Nombre IN ({marcadores})", intel_melted_df["nom"])}
+                intel_melted_df = intel_melted_df.assign(Alumno_ID=intel_melted_df["nom"].map(_ids_ingesta(db, intel_melted_df["nom"])))
+                _registrar_inteligencias_ingesta(db, intel_melted_df.drop_duplicates(subset="nom").set_index("nom")["Alumno_ID"].to_dict())
+                intel_melted_df = intel_melted_df.dropna(subset=["Alumno_ID"]).astype({"Alumno_ID": int})
+                intel_melted_df = _con_tipos(db, intel_melted_df)
+                repetidos = intel_melted_df["nom"].isin(vistos)
+                intel_modificados = set()
+                for filas_df, eliminar in ((intel_melted_df[~repetidos], True), (intel_melted_df[repetidos], False)):
+                    if eliminar or not filas_df.empty:
+                        _sumar_cambios(cambios["inteligencias"], _sincronizar(db, models.Inteligencia, "TipoInteligencia_ID", "Puntaje",
+                                                                              filas_df, filas_df["Alumno_ID"].unique().tolist(),
+                                                                              intel_modificados, eliminar=eliminar))
+                _registrar_perfiles_ingesta(db, intel_modificados)
+
+            # Conteos sobre toda la hoja: los nombres repetidos entre lotes cuentan una vez
+            inteligencias_info["alumnos_con_inteligencias"] = db.execute(text("SELECT COUNT(*) FROM ingesta_inteligencias")).scalar()
+            inteligencias_info["alumnos_sin_notas"] = db.execute(text("SELECT COUNT(*) FROM ingesta_inteligencias WHERE Alumno_ID IS NULL")).scalar()
+            inteligencias_info["procesadas"] = db.execute(text(
+                "SELECT COUNT(*) FROM Inteligencias WHERE Alumno_ID IN (SELECT Alumno_ID FROM ingesta_inteligencias)"
+            )).scalar()
+        else:
+            inteligencias_info["error_mensaje"] = f"No se pudo leer la hoja de inteligencias. Hojas disponibles: {hojas_disponibles}"
+
+        perfil.filas(inteligencias_info["registros_validos"])
+
+        # --- 4. PERFILES: se regeneran solo los de los alumnos con algún cambio ---
+        perfil.etapa("perfiles")
+        perfil.filas(_materializar_perfiles_ingesta(db, tamano_lote))
+
+        perfil.etapa("commit")
+        db.execute(text("DROP TABLE IF EXISTS temp.ingesta_alumnos"))
+        db.execute(text("DROP TABLE IF EXISTS temp.ingesta_perfiles"))
+        db.execute(text("DROP TABLE IF EXISTS temp.ingesta_ci"))
+        db.execute(text("DROP TABLE IF EXISTS temp.ingesta_inteligencias"))
+        db.commit()
+        logger.info(f"Commit final exitoso. {totales['lotes']} lotes de notas, {totales['calificaciones']} calificaciones.")
+
+        resultado = {
+            "mensaje": "Archivo Excel procesado exitosamente",
+            "modo_streaming": True,
+            "lotes": totales["lotes"],
+            "alumnos_procesados": totales["procesados"],
+            "alumnos_creados": totales["creados"],
+            "alumnos_actualizados": totales["actualizados"],
+            "competencias_procesadas": len(competencia_cols),
+            "cursos_procesados": len(cursos_db),
+            "cambios": cambios,
+            "inteligencias": inteligencias_info,
+            "ci": ci_info
+        }
+        resultado["profiling"] = perfil.resumen()
+        perfilado.registrar_perfilado(file_path, resultado["profiling"], modo_actualizacion=modo_actualizacion, streaming=True)
+        return resultado
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error fatal durante el procesamiento en streaming del Excel: {e}", exc_info=True)
+        raise e
+    finally:
+        perfil.detener()
+
+def _errores_celda(hoja: str, largas: pd.DataFrame, mascara: pd.Series, error: str) -> pd.DataFrame:
+    """Filas (hoja, fila, columna, valor, error) de las celdas de `largas` marcadas en `mascara`."""
+    seleccion = largas[mascara]
+    return pd.DataFrame({
+        "hoja": hoja,
+        "fila": seleccion["fila"].astype(int),
+        "columna": seleccion["columna"].astype(str),
+        "valor": seleccion["valor"].fillna("").astype(str),
+        "error": error
+    })
+
+def _celdas(df: pd.DataFrame, columnas) -> pd.DataFrame:
+    """Pasa las columnas indicadas a formato largo (fila, columna, valor) sin las celdas vacías."""
+    largas = df[list(columnas)].rename_axis("fila").reset_index().melt(id_vars="fila", var_name="columna", value_name="valor")
+    return largas.dropna(subset=["valor"])
+
+def _errores_nombres(hoja: str, df: pd.DataFrame, primera_fila: dict) -> list:
+    """
+    Nombres vacíos y repetidos. `primera_fila` ({nombre: fila}) se comparte
+    entre lotes para detectar repeticiones en toda la hoja.
+    """
+    nombres = df["nom"].where(df["nom"].isna(), df["nom"].astype(str).str.strip())
+    vacios = nombres.isna() | (nombres == "")
+    largas = pd.DataFrame({"fila": df.index, "columna": "nom", "valor": df["nom"].to_numpy()})
+    errores = [_errores_celda(hoja, largas, vacios.to_numpy(), "Nombre vacío")]
+
+    presentes = nombres[~vacios]
+    nuevos = presentes[~presentes.duplicated() & ~presentes.isin(primera_fila.keys())]
+    primera_fila.update(zip(nuevos, nuevos.index))
+    primeras = presentes.map(primera_fila)
+    repetidos = largas.loc[(~vacios).to_numpy()].assign(primera=primeras.to_numpy())
+    repetidos = repetidos[repetidos["fila"] != repetidos["primera"]]
+    if not repetidos.empty:
+        errores.append(pd.DataFrame({
+            "hoja": hoja,
+            "fila": repetidos["fila"].astype(int),
+            "columna": "nom",
+            "valor": repetidos["valor"].astype(str),
+            "error": "Nombre repetido (aparece antes en la fila " + repetidos["primera"].astype(int).astype(str) + ")"
+        }))
+    return errores
+
+def _errores_rango(hoja: str, df: pd.DataFrame, columnas, rango, nombre: str) -> list:
+    """Celdas no numéricas o fuera de `rango` en las columnas indicadas."""
+    largas = _celdas(df, columnas)
+    numeros = pd.to_numeric(largas["valor"], errors="coerce")
+    minimo, maximo = rango
+    return [
+        _errores_celda(hoja, largas, numeros.isna(), f"{nombre} no numérico"),
+        _errores_celda(hoja, largas, numeros.notna() & ((numeros < minimo) | (numeros > maximo)),
+                       f"{nombre} fuera de rango ({minimo}-{maximo})")
+    ]
+
+def _validar_hoja(clave: str, hoja: str, df: pd.DataFrame, primera_fila: dict) -> list:
+    """Errores de celda de un bloque de filas de una hoja, indexado por número de fila."""
+    errores = _errores_nombres(hoja, df, primera_fila)
+    if clave == "notas":
+        largas = _celdas(df, _columnas_competencia(df.columns))
+        invalidas = _normalizar_calificaciones(largas["valor"]).isna()
+        errores.append(_errores_celda(hoja, largas, invalidas, "Calificación no válida (use A, B, C, D o 1-4)"))
+    elif clave == "inteligencia":
+        errores.extend(_errores_rango(hoja, df, _columnas_inteligencia(df.columns), RANGO_PUNTAJE, "Puntaje"))
+    else:
+        errores.extend(_errores_rango(hoja, df, ["ci"], RANGO_CI, "CI"))
+    return errores
+
+def validar_excel(file_path: str, tamano_lote: int = None) -> dict:
+    """
+    Modo validate_only: revisa el archivo sin escribir en la base de datos.
+    Primero comprueba los encabezados (leyendo solo la primera fila de cada
+    hoja) y, si falta alguna columna obligatoria, termina ahí. Después revisa
+    todas las celdas con operaciones vectorizadas: calificaciones (A-D o 1-4),
+    puntajes y CI numéricos y dentro de rango, y nombres vacíos o repetidos.
+    Con `tamano_lote` los libros .xlsx se recorren por lotes, con memoria acotada.
+
+    Devuelve si el archivo es válido, los errores de estructura y la lista de
+    errores por celda (hoja, fila, columna, valor, error).
+    """
+    encabezados = lector_excel.leer_encabezados(file_path)
+    hojas = encabezados["hojas"]
+
+    errores_encabezado = []
+    if hojas["notas"] is None:
+        errores_encabezado.append({"hoja": "notas", "columna": None,
+                                   "error": f"El archivo no contiene una hoja 'notas'. Hojas disponibles: {encabezados['hojas_disponibles']}"})
+    for clave, columnas in encabezados["columnas"].items():
+        for columna in _columnas_faltantes(clave, columnas):
+            errores_encabezado.append({"hoja": hojas[clave], "columna": columna, "error": _error_columna_faltante(columna)})
+
+    resultado = {
+        "valido": False,
+        "hojas": hojas,
+        "filas": {},
+        "errores_encabezado": errores_encabezado,
+        "total_errores": 0,
+        "errores_por_tipo": {},
+        "errores": [],
+        "errores_truncados": False
+    }
+    if errores_encabezado:
+        logger.info(f"Validación de {file_path}: {len(errores_encabezado)} errores de encabezado")
+        return resultado
+
+    errores = []
+    por_lotes = bool(tamano_lote) and file_path.lower().endswith(".xlsx")
+    libro = None if por_lotes else lector_excel.leer_libro(file_path)
+    for clave, hoja in hojas.items():
+        if hoja is None:
+            continue
+        if por_lotes:
+            bloques = lector_excel.iterar_hoja(file_path, hoja, tamano_lote)
+        else:
+            # Número de fila tal como se ve en la hoja (la fila 1 es el encabezado)
+            bloques = [libro[clave].set_axis(libro[clave].index + 2)]
+
+        errores_hoja, primera_fila = [], {}
+        resultado["filas"][clave] = 0
+        for df in bloques:
+            errores_hoja.extend(_validar_hoja(clave, hoja, df, primera_fila))
+            resultado["filas"][clave] += len(df)
+        errores.append(pd.concat(errores_hoja, ignore_index=True).sort_values("fila", kind="stable"))
+
+    errores_df = pd.concat(errores, ignore_index=True)
+    resultado["valido"] = errores_df.empty
+    resultado["total_errores"] = len(errores_df)
+    resultado["errores_por_tipo"] = {error: int(total) for error, total in errores_df["error"].str.replace(r" \(aparece.*", "", regex=True).value_counts().items()}
+    resultado["errores"] = errores_df.head(MAX_ERRORES_VALIDACION).to_dict("records")
+    resultado["errores_truncados"] = len(errores_df) > MAX_ERRORES_VALIDACION
+    logger.info(f"Validación de {file_path}: {len(errores_df)} errores en {resultado['filas']}")
+    return resultado
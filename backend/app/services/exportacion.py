@@ -0,0 +1,172 @@
+import csv
+import io
+import logging
+import tempfile
+import zipfile
+from itertools import groupby
+from openpyxl import Workbook
+from sqlalchemy import text
+from app.database import database
+
+logger = logging.getLogger(__name__)
+
+# Hojas que se exportan, con los mismos nombres y columnas que lee procesar_excel
+HOJAS_EXPORTACION = ("notas", "inteligencia", "ci")
+
+# Filas que se piden al cursor de SQLite en cada lectura
+FILAS_POR_LECTURA = 1000
+
+# Bytes que se acumulan antes de enviar un bloque de la respuesta
+TAMANO_BLOQUE = 64 * 1024
+
+def _cursor(conn, sql: str):
+    """
+    Recorre el resultado de `sql` directamente desde el cursor, de a
+    FILAS_POR_LECTURA filas, sin cargarlo entero en memoria.
+    """
+    return conn.execution_options(stream_results=True, yield_per=FILAS_POR_LECTURA).execute(text(sql))
+
+def _filas_notas(conn):
+    """
+    Hoja de notas: grado_seccion, nom, una columna por código de competencia y
+    1_apreciacion_tutor. Las calificaciones (con su letra, de la vista
+    VistaCalificaciones) llegan ordenadas por alumno desde el índice de
+    AlumnoCompetencia, así que solo se arma una fila a la vez.
+    """
+    codigos = {}
+    columna_competencia = {}
+    for competencia_id, codigo in conn.execute(text(
+        "SELECT CompetenciaPlantilla_ID, Codigo_Competencia FROM CompetenciaPlantilla ORDER BY CompetenciaPlantilla_ID"
+    )):
+        # Un código repetido en el catálogo comparte columna (la ingesta agrupa por código)
+        columna_competencia[competencia_id] = codigos.setdefault(codigo, len(codigos))
+    yield ["grado_seccion", "nom", *codigos, "1_apreciacion_tutor"]
+
+    filas = _cursor(conn, """
+        SELECT a.Alumno_ID, a.Nombre, a.Recomendaciones_Basicas, ac.CompetenciaPlantilla_ID, ac.Calificacion
+        FROM Alumnos a LEFT JOIN VistaCalificaciones ac ON ac.Alumno_ID = a.Alumno_ID
+        ORDER BY a.Alumno_ID
+    """)
+    for _, grupo in groupby(filas, key=lambda fila: fila[0]):
+        calificaciones = [None] * len(codigos)
+        for _, nombre, recomendaciones, competencia_id, calificacion in grupo:
+            if competencia_id in columna_competencia:
+                calificaciones[columna_competencia[competencia_id]] = calificacion
+        # El grado y sección no se guarda en la base de datos
+        yield [None, nombre, *calificaciones, recomendaciones]
+
+def _filas_inteligencia(conn):
+    """Hoja de inteligencias: grado_seccion, nom y una columna por tipo de inteligencia."""
+    tipos = conn.execute(text("""
+        SELECT TipoInteligencia_ID, Nombre FROM TiposInteligencia t
+        WHERE EXISTS (SELECT 1 FROM Inteligencias i WHERE i.TipoInteligencia_ID = t.TipoInteligencia_ID)
+        ORDER BY Nombre
+    """)).all()
+    columna_tipo = {tipo_id: indice for indice, (tipo_id, _) in enumerate(tipos)}
+    yield ["grado_seccion", "nom", *(nombre for _, nombre in tipos)]
+
+    filas = _cursor(conn, """
+        SELECT a.Alumno_ID, a.Nombre, i.TipoInteligencia_ID, i.Puntaje
+        FROM Alumnos a JOIN Inteligencias i ON i.Alumno_ID = a.Alumno_ID
+        ORDER BY a.Alumno_ID
+    """)
+    for _, grupo in groupby(filas, key=lambda fila: fila[0]):
+        puntajes = [None] * len(tipos)
+        for _, nombre, tipo, puntaje in grupo:
+            puntajes[columna_tipo[tipo]] = puntaje
+        yield [None, nombre, *puntajes]
+
+def _filas_ci(conn):
+    """Hoja de CI: nom y ci de los alumnos que lo tienen."""
+    yield ["nom", "ci"]
+    yield from (list(fila) for fila in _cursor(conn, "SELECT Nombre, CI FROM Alumnos WHERE CI IS NOT NULL ORDER BY Alumno_ID"))
+
+FILAS_HOJA = {"notas": _filas_notas, "inteligencia": _filas_inteligencia, "ci": _filas_ci}
+
+def _bloques_csv(filas):
+    """Texto CSV (UTF-8) de `filas` en bloques de TAMANO_BLOQUE; el encabezado se envía enseguida. None queda vacío."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(next(filas))
+    yield buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+    for fila in filas:
+        escritor.writerow(fila)
+        if buffer.tell() >= TAMANO_BLOQUE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def exportar_csv(hoja: str):
+    """
+    Generador de bytes con la hoja `hoja` (ver HOJAS_EXPORTACION) en CSV, leída
+    con un cursor del servidor: la memoria no depende del número de alumnos.
+    La conexión es propia del generador y se cierra al terminar o si el
+    cliente corta la descarga.
+    """
+    if hoja not in FILAS_HOJA:
+        raise ValueError(f"Hoja no válida: '{hoja}'. Opciones: {', '.join(HOJAS_EXPORTACION)}")
+    with database.engine.connect() as conn:
+        yield from _bloques_csv(FILAS_HOJA[hoja](conn))
+
+class _SalidaZip(io.RawIOBase):
+    """Destino no buscable para zipfile: acumula lo escrito hasta que el generador lo retira."""
+    def __init__(self):
+        self.pendiente = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self.pendiente.extend(datos)
+        return len(datos)
+
+    def retirar(self) -> bytes:
+        datos = bytes(self.pendiente)
+        self.pendiente.clear()
+        return datos
+
+def exportar_zip():
+    """
+    Generador de bytes con un ZIP de notas.csv, inteligencia.csv y ci.csv, el
+    paquete que acepta /api/upload. Se comprime y envía a medida que se leen
+    las filas, sin archivo temporal.
+    """
+    salida = _SalidaZip()
+    with database.engine.connect() as conn:
+        with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED) as paquete:
+            for hoja in HOJAS_EXPORTACION:
+                with paquete.open(f"{hoja}.csv", "w", force_zip64=True) as archivo:
+                    for bloque in _bloques_csv(FILAS_HOJA[hoja](conn)):
+                        archivo.write(bloque)
+                        if salida.pendiente:
+                            yield salida.retirar()
+    # Resto del último archivo y directorio central, escritos al cerrar el ZIP
+    yield salida.retirar()
+
+def exportar_xlsx():
+    """
+    Generador de bytes con un libro de las tres hojas. openpyxl en modo de
+    solo escritura guarda cada fila en disco a medida que llega, así que la
+    memoria no crece con el número de alumnos; pero un .xlsx es un ZIP que
+    solo se puede cerrar al final, de modo que los bytes empiezan a enviarse
+    cuando el libro está completo (para enviar desde el primer momento, ver
+    exportar_zip).
+    """
+    libro = Workbook(write_only=True)
+    with database.engine.connect() as conn:
+        for hoja in HOJAS_EXPORTACION:
+            pagina = libro.create_sheet(hoja)
+            for fila in FILAS_HOJA[hoja](conn):
+                pagina.append(fila)
+    with tempfile.TemporaryFile() as archivo:
+        libro.save(archivo)
+        archivo.seek(0)
+        while True:
+            bloque = archivo.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            yield bloque
@@ -0,0 +1,103 @@
+import os
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app.database.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Cantidad de trabajos terminados que se conservan para consulta
+MAX_TRABAJOS_GUARDADOS = 200
+
+class GestorIngestas:
+    """
+    Cola de trabajos de ingesta. Un único hilo trabajador procesa los archivos
+    fuera del event loop, de uno en uno (SQLite admite un solo escritor), y cada
+    trabajo publica su etapa y filas procesadas para consultarlas por su ID.
+    """
+
+    def __init__(self):
+        self.trabajos = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingesta")
+
+    def encolar(self, procesar, archivo: str, tmp_path=None, parametros: dict = None) -> str:
+        """
+        Encola `procesar(db, progreso)` y devuelve el ID del trabajo. Si se
+        indica `tmp_path` (una ruta o una lista de rutas), los archivos se
+        eliminan al terminar el trabajo.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self.trabajos[job_id] = {
+                "job_id": job_id,
+                "archivo": archivo,
+                "parametros": parametros or {},
+                "estado": "en_cola",
+                "etapa": None,
+                "filas_procesadas": 0,
+                "resultado": None,
+                "error": None,
+                "creado": datetime.now().isoformat(),
+                "iniciado": None,
+                "finalizado": None
+            }
+            self._purgar()
+        self._executor.submit(self._ejecutar, job_id, procesar, tmp_path)
+        logger.info(f"Trabajo de ingesta {job_id} encolado para '{archivo}'")
+        return job_id
+
+    def obtener(self, job_id: str):
+        """Devuelve una copia del estado del trabajo, o None si no existe."""
+        with self._lock:
+            trabajo = self.trabajos.get(job_id)
+            return dict(trabajo) if trabajo else None
+
+    def listar(self):
+        """Devuelve los trabajos conocidos, del más reciente al más antiguo."""
+        with self._lock:
+            return [dict(trabajo) for trabajo in reversed(self.trabajos.values())]
+
+    def _actualizar(self, job_id: str, **campos):
+        with self._lock:
+            self.trabajos[job_id].update(campos)
+
+    def _purgar(self):
+        """Descarta los trabajos terminados más antiguos por encima del máximo."""
+        terminados = [job_id for job_id, t in self.trabajos.items() if t["estado"] in ("completado", "error")]
+        for job_id in terminados[:max(0, len(self.trabajos) - MAX_TRABAJOS_GUARDADOS)]:
+            del self.trabajos[job_id]
+
+    def _ejecutar(self, job_id: str, procesar, tmp_path: str):
+        self._actualizar(job_id, estado="procesando", iniciado=datetime.now().isoformat())
+
+        def progreso(etapa: str, filas: int = None):
+            campos = {"etapa": etapa}
+            if filas is not None:
+                campos["filas_procesadas"] = filas
+            self._actualizar(job_id, **campos)
+
+        db = SessionLocal()
+        try:
+            resultado = procesar(db, progreso)
+            self._actualizar(job_id, estado="completado", etapa="finalizado", resultado=resultado)
+            logger.info(f"Trabajo de ingesta {job_id} completado")
+        except Exception as e:
+            logger.error(f"Trabajo de ingesta {job_id} falló: {e}")
+            self._actualizar(job_id, estado="error", error=str(e))
+        finally:
+            db.close()
+            self._actualizar(job_id, finalizado=datetime.now().isoformat())
+            for ruta in ([tmp_path] if isinstance(tmp_path, str) else tmp_path or []):
+                if os.path.exists(ruta):
+                    try:
+                        os.unlink(ruta)
+                        logger.info("Archivo temporal eliminado")
+                    except Exception as e:
+                        logger.warning(f"Error eliminando archivo temporal: {str(e)}")
+
+# Instancia global del gestor
+gestor_ingestas = GestorIngestas()
@@ -0,0 +1,120 @@
+import os
+import shutil
+import zipfile
+import tempfile
+import logging
+from collections import deque
+from sqlalchemy.orm import Session
+from app.services import excel_processor, lector_excel
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_LIBRO = ('.xlsx', '.xls')
+
+def _es_libro(nombre: str) -> bool:
+    """Descarta carpetas, archivos ocultos y temporales de Excel dentro de un ZIP."""
+    base = os.path.basename(nombre)
+    return (nombre.lower().endswith(EXTENSIONES_LIBRO) and not nombre.startswith("__MACOSX/")
+            and not base.startswith((".", "~$")))
+
+def expandir_archivos(archivos, directorio: str, limite_bytes: int = None):
+    """
+    Recibe [(nombre, ruta)] y devuelve la lista de libros a importar como
+    {"archivo", "ruta", "error"}. Los ZIP de libros se extraen en `directorio`
+    (solo sus .xlsx/.xls, en orden alfabético); los ZIP de tablas CSV/Parquet
+    son un único paquete y, como el resto, se devuelven tal cual. Las entradas
+    que no se pueden importar llevan su mensaje en "error".
+    """
+    libros = []
+    for nombre, ruta in archivos:
+        if not nombre.lower().endswith(".zip"):
+            libros.append({"archivo": nombre, "ruta": ruta, "error": None})
+            continue
+        try:
+            if lector_excel.es_formato_tabular(ruta):
+                libros.append({"archivo": nombre, "ruta": ruta, "error": None})
+                continue
+            with zipfile.ZipFile(ruta) as zip_libros:
+                miembros = sorted((m for m in zip_libros.infolist() if not m.is_dir() and _es_libro(m.filename)),
+                                  key=lambda m: m.filename)
+                if not miembros:
+                    libros.append({"archivo": nombre, "ruta": None, "error": "El ZIP no contiene archivos .xlsx ni .xls"})
+                for i, miembro in enumerate(miembros):
+                    archivo = f"{nombre}/{miembro.filename}"
+                    if limite_bytes and miembro.file_size > limite_bytes:
+                        libros.append({"archivo": archivo, "ruta": None,
+                                       "error": f"El archivo es demasiado grande. Máximo {limite_bytes // (1024 * 1024)}MB"})
+                        continue
+                    # Nombre propio en disco: nunca se usa la ruta interna del ZIP
+                    destino = os.path.join(directorio, f"{len(libros)}_{i}{os.path.splitext(miembro.filename)[1].lower()}")
+                    with zip_libros.open(miembro) as origen, open(destino, "wb") as salida:
+                        shutil.copyfileobj(origen, salida)
+                    libros.append({"archivo": archivo, "ruta": destino, "error": None})
+        except zipfile.BadZipFile:
+            libros.append({"archivo": nombre, "ruta": None, "error": "El archivo ZIP no es válido"})
+    return libros
+
+def procesar_lote(db: Session, archivos, modo_actualizacion: bool = True, max_procesos: int = None,
+                  limite_bytes: int = None, progreso=None) -> dict:
+    """
+    Importa varios libros (o ZIP de libros). La lectura y transformación de
+    cada libro (excel_processor.preparar_ingesta) se reparte entre un pool de
+    procesos, mientras este hilo, único escritor de la base de datos, escribe
+    los libros ya preparados en el orden recibido, cada uno en su propia
+    transacción. Un libro con errores no impide importar los demás.
+
+    Devuelve los totales y el resultado de cada archivo.
+    """
+    directorio = tempfile.mkdtemp(prefix="lote_")
+    try:
+        libros = expandir_archivos(archivos, directorio, limite_bytes)
+        pendientes = [libro for libro in libros if not libro["error"]]
+        max_procesos = max_procesos or max(1, min(len(pendientes), os.cpu_count() or 1))
+        logger.info(f"Importando {len(libros)} libros con {max_procesos} procesos. Modo actualización: {modo_actualizacion}")
+
+        resultados = []
+        filas = 0
+        with lector_excel.crear_pool_procesos(max_procesos) as pool:
+            # Se preparan como mucho dos libros por proceso por delante del escritor
+            en_curso = deque()
+            siguientes = iter(pendientes)
+
+            def encolar_siguientes():
+                while len(en_curso) < 2 * max_procesos:
+                    libro = next(siguientes, None)
+                    if libro is None:
+                        return
+                    en_curso.append(pool.submit(excel_processor.preparar_ingesta, libro["ruta"], modo_actualizacion, False))
+
+            encolar_siguientes()
+            for numero, libro in enumerate(libros, 1):
+                if progreso:
+                    progreso(f"archivo {numero}/{len(libros)}", filas)
+                if libro["error"]:
+                    logger.warning(f"Se omite '{libro['archivo']}': {libro['error']}")
+                    resultados.append({"archivo": libro["archivo"], "estado": "error", "error": libro["error"]})
+                    continue
+
+                futuro = en_curso.popleft()
+                encolar_siguientes()
+                try:
+                    preparado = futuro.result()
+                    resultado = excel_processor.escribir_ingesta(db, preparado)
+                    filas += len(preparado["notas_df"])
+                    resultados.append({"archivo": libro["archivo"], "estado": "completado", "resultado": resultado})
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Error importando '{libro['archivo']}': {e}")
+                    resultados.append({"archivo": libro["archivo"], "estado": "error", "error": str(e)})
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    completados = sum(1 for r in resultados if r["estado"] == "completado")
+    return {
+        "mensaje": f"Lote procesado: {completados} de {len(resultados)} archivos importados",
+        "archivos_totales": len(resultados),
+        "archivos_completados": completados,
+        "archivos_con_error": len(resultados) - completados,
+        "filas_procesadas": filas,
+        "archivos": resultados
+    }
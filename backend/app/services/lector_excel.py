@@ -0,0 +1,323 @@
+import io
+import os
+import logging
+import importlib.util
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from openpyxl import load_workbook
+
+logger = logging.getLogger(__name__)
+
+# Palabras clave para detectar las hojas por nombre
+PALABRAS_CLAVE_INTELIGENCIA = ['inteligencia', 'inteligencias', 'intel', 'multiple', 'múltiple', 'brain', 'cerebro']
+PALABRAS_CLAVE_CI = ['ci', 'coeficiente', 'intelectual', 'iq', 'intelligence', 'quotient']
+
+# A partir de este tamaño las hojas se leen en paralelo (por debajo no compensa crear procesos)
+UMBRAL_LECTURA_PARALELA = 1024 * 1024
+
+# Motores de lectura de libros Excel, del más rápido al más lento. calamine
+# (python-calamine, escrito en Rust) es opcional; openpyxl siempre está
+# instalado y pandas lo abre en modo solo lectura. INGESTA_MOTOR_EXCEL fuerza uno.
+MOTORES_EXCEL = ("calamine", "openpyxl")
+MODULOS_MOTOR = {"calamine": "python_calamine", "openpyxl": "openpyxl"}
+
+# Formatos columnares: un archivo suelto es la hoja de notas; un ZIP trae una tabla por hoja
+EXTENSIONES_TABULARES = ('.csv', '.parquet')
+
+def _buscar_hoja(hojas, palabras_clave, excluir=()):
+    """Devuelve la primera hoja cuyo nombre contiene alguna palabra clave."""
+    for hoja in hojas:
+        if hoja in excluir:
+            continue
+        hoja_lower = hoja.lower()
+        if any(palabra in hoja_lower for palabra in palabras_clave):
+            return hoja
+    return None
+
+def detectar_hojas(hojas_disponibles):
+    """
+    Identifica en una sola pasada las hojas de notas, inteligencias y CI.
+    La hoja de CI se busca primero por nombre exacto y nunca reutiliza la hoja
+    de inteligencias ("inteligencia" también contiene la cadena "ci").
+    """
+    hoja_notas = "notas" if "notas" in hojas_disponibles else None
+    hoja_inteligencia = _buscar_hoja(hojas_disponibles, PALABRAS_CLAVE_INTELIGENCIA, excluir=[hoja_notas])
+
+    hoja_ci = next((hoja for hoja in hojas_disponibles if hoja.strip().lower() == "ci"), None)
+    if hoja_ci is None:
+        hoja_ci = _buscar_hoja(hojas_disponibles, PALABRAS_CLAVE_CI, excluir=[hoja_notas, hoja_inteligencia])
+
+    return {"notas": hoja_notas, "inteligencia": hoja_inteligencia, "ci": hoja_ci}
+
+def motores_disponibles() -> list:
+    """Motores de MOTORES_EXCEL instalados, en orden de preferencia."""
+    return [motor for motor in MOTORES_EXCEL if importlib.util.find_spec(MODULOS_MOTOR[motor]) is not None]
+
+def elegir_motor(file_path: str, motor: str = None) -> str:
+    """
+    Devuelve el motor con el que pandas leerá el libro: `motor` o
+    INGESTA_MOTOR_EXCEL si se indican, si no el más rápido instalado. openpyxl
+    no lee el formato antiguo .xls; sin calamine se devuelve None para que
+    pandas use su motor por defecto (xlrd).
+    """
+    motor = motor or os.getenv("INGESTA_MOTOR_EXCEL") or None
+    disponibles = motores_disponibles()
+    if motor is not None:
+        if motor not in MOTORES_EXCEL:
+            raise ValueError(f"Motor de lectura desconocido: '{motor}'. Motores: {list(MOTORES_EXCEL)}")
+        if motor not in disponibles:
+            raise ValueError(f"El motor de lectura '{motor}' no está instalado (pip install {MODULOS_MOTOR[motor].replace('_', '-')})")
+    else:
+        motor = disponibles[0]
+    if motor == "openpyxl" and file_path.lower().endswith(".xls"):
+        return None
+    return motor
+
+def crear_pool_procesos(max_procesos: int) -> ProcessPoolExecutor:
+    """
+    Pool de procesos para leer o preparar libros. Los procesos se arrancan con
+    "spawn" y no con fork: el servidor tiene hilos (la cola de ingestas, el
+    pool de conexiones) y un fork copiaría sus bloqueos en el estado en que
+    estén. Las funciones que se envíen al pool deben ser de nivel de módulo y
+    los scripts que lo usen deben arrancar dentro de `if __name__ == "__main__"`.
+    """
+    return ProcessPoolExecutor(max_workers=max_procesos, mp_context=multiprocessing.get_context("spawn"))
+
+def _leer_hoja(file_path: str, hoja: str, motor: str = None) -> pd.DataFrame:
+    """Lee una única hoja (se ejecuta en un proceso del pool)."""
+    return pd.read_excel(file_path, sheet_name=hoja, engine=motor)
+
+def _leer_en_paralelo(file_path: str, hojas: dict, motor: str = None) -> dict:
+    """Lee cada hoja en su propio proceso, que vuelve a abrir el libro; devuelve DataFrames o excepciones."""
+    resultados = {}
+    with crear_pool_procesos(len(hojas)) as pool:
+        futuros = {clave: pool.submit(_leer_hoja, file_path, hoja, motor) for clave, hoja in hojas.items()}
+        for clave, futuro in futuros.items():
+            try:
+                resultados[clave] = futuro.result()
+            except Exception as e:
+                resultados[clave] = e
+    return resultados
+
+def _leer_en_serie(libro: pd.ExcelFile, hojas: dict) -> dict:
+    """Lee las hojas una tras otra reutilizando el libro ya abierto."""
+    resultados = {}
+    for clave, hoja in hojas.items():
+        try:
+            resultados[clave] = libro.parse(hoja)
+        except Exception as e:
+            resultados[clave] = e
+    return resultados
+
+def leer_libro(file_path: str, paralelo: bool = None, motor: str = None) -> dict:
+    """
+    Detecta las hojas de notas, inteligencias y CI y las convierte en
+    DataFrames. En serie el libro se abre una sola vez y se reutiliza para
+    todas las hojas; en paralelo cada proceso vuelve a abrirlo para leer su
+    hoja. Con `paralelo=None` las hojas se leen en procesos separados solo si
+    el archivo es grande y hay más de un núcleo. `motor` elige el motor de
+    lectura (ver elegir_motor).
+
+    Devuelve un diccionario con los DataFrames ("notas", "inteligencia", "ci"),
+    el nombre de cada hoja detectada y la lista de hojas disponibles. Las hojas
+    de inteligencias y CI son opcionales: si faltan o fallan se devuelven vacías
+    con su mensaje en "errores". Los CSV, Parquet y ZIP de tablas se delegan
+    en leer_tabular.
+    """
+    if es_formato_tabular(file_path):
+        return leer_tabular(file_path)
+
+    motor = elegir_motor(file_path, motor)
+    with pd.ExcelFile(file_path, engine=motor) as libro:
+        hojas_disponibles = list(libro.sheet_names)
+        logger.info(f"Hojas disponibles en el archivo: {hojas_disponibles}. Motor de lectura: {libro.engine}")
+
+        detectadas = detectar_hojas(hojas_disponibles)
+        if detectadas["notas"] is None:
+            raise ValueError(f"Error al leer la hoja 'notas': el archivo no contiene una hoja 'notas'. Hojas disponibles: {hojas_disponibles}")
+
+        hojas = {clave: hoja for clave, hoja in detectadas.items() if hoja}
+        if paralelo is None:
+            paralelo = (len(hojas) > 1 and (os.cpu_count() or 1) > 1
+                        and os.path.getsize(file_path) >= UMBRAL_LECTURA_PARALELA)
+
+        if paralelo:
+            logger.info(f"Leyendo {len(hojas)} hojas en paralelo")
+            leidas = _leer_en_paralelo(file_path, hojas, motor)
+        else:
+            leidas = _leer_en_serie(libro, hojas)
+
+    return _armar_resultado(hojas_disponibles, detectadas, leidas)
+
+def _armar_resultado(hojas_disponibles, detectadas: dict, leidas: dict) -> dict:
+    """Arma la respuesta de leer_libro a partir de las hojas detectadas y leídas."""
+    if isinstance(leidas["notas"], Exception):
+        raise ValueError(f"Error al leer la hoja 'notas': {leidas['notas']}")
+
+    resultado = {
+        "hojas_disponibles": hojas_disponibles,
+        "hoja_inteligencia": detectadas["inteligencia"],
+        "hoja_ci": detectadas["ci"],
+        "errores": {},
+    }
+    for clave, hoja in detectadas.items():
+        df = leidas.get(clave)
+        if isinstance(df, Exception):
+            logger.warning(f"No se pudo leer la hoja '{hoja}'. Se continuará sin procesarla. Error: {df}")
+            resultado["errores"][clave] = str(df)
+            df = None
+        if df is None:
+            if hoja is None:
+                logger.warning(f"No se encontró hoja de {clave}. Hojas disponibles: {hojas_disponibles}")
+            df = pd.DataFrame()
+        else:
+            logger.info(f"Hoja '{hoja}' cargada con {len(df)} filas.")
+        resultado[clave] = df
+
+    return resultado
+
+def _separador_csv(muestra: bytes) -> str:
+    """Punto y coma si la primera línea tiene más que comas (exportaciones con configuración regional en español)."""
+    primera_linea = muestra.split(b"\n", 1)[0]
+    return ";" if primera_linea.count(b";") > primera_linea.count(b",") else ","
+
+def _leer_tabla(contenido: bytes, extension: str) -> pd.DataFrame:
+    """Convierte el contenido de un CSV o Parquet en DataFrame, con las mismas columnas que una hoja."""
+    if extension == ".parquet":
+        try:
+            return pd.read_parquet(io.BytesIO(contenido))
+        except ImportError:
+            raise ValueError("Para leer archivos Parquet instale pyarrow (pip install pyarrow)")
+
+    separador = _separador_csv(contenido[:64 * 1024])
+    try:
+        return pd.read_csv(io.BytesIO(contenido), sep=separador, encoding="utf-8-sig")
+    except UnicodeDecodeError:
+        # Exportaciones antiguas en Latin-1
+        return pd.read_csv(io.BytesIO(contenido), sep=separador, encoding="latin-1")
+
+def es_formato_tabular(file_path: str) -> bool:
+    """True si el archivo es un CSV/Parquet suelto o un ZIP con tablas CSV/Parquet (y sin libros Excel)."""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in EXTENSIONES_TABULARES:
+        return True
+    if extension != ".zip":
+        return False
+    with zipfile.ZipFile(file_path) as paquete:
+        nombres = [m.filename.lower() for m in paquete.infolist() if not m.is_dir()]
+    return (any(nombre.endswith(EXTENSIONES_TABULARES) for nombre in nombres)
+            and not any(nombre.endswith(('.xlsx', '.xls')) for nombre in nombres))
+
+def leer_tabular(file_path: str) -> dict:
+    """
+    Equivalente de leer_libro para formatos columnares, mucho más rápidos de
+    leer que un libro Excel. Un CSV o Parquet suelto se toma como la hoja de
+    notas; un ZIP puede traer notas, inteligencia y ci (p. ej. notas.csv,
+    inteligencia.csv y ci.csv), que se detectan por el nombre del archivo con
+    las mismas reglas que las hojas de un libro.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in EXTENSIONES_TABULARES:
+        with open(file_path, "rb") as archivo:
+            leidas = {"notas": _leer_tabla(archivo.read(), extension)}
+        return _armar_resultado(["notas"], {"notas": "notas", "inteligencia": None, "ci": None}, leidas)
+
+    with zipfile.ZipFile(file_path) as paquete:
+        tablas = {}
+        for miembro in paquete.infolist():
+            base, ext = os.path.splitext(os.path.basename(miembro.filename))
+            if miembro.is_dir() or ext.lower() not in EXTENSIONES_TABULARES or base.startswith("."):
+                continue
+            tablas.setdefault(base, (miembro, ext.lower()))
+        hojas_disponibles = list(tablas)
+        logger.info(f"Tablas disponibles en el paquete: {hojas_disponibles}")
+
+        detectadas = detectar_hojas(hojas_disponibles)
+        if detectadas["notas"] is None:
+            raise ValueError(f"Error al leer la hoja 'notas': el paquete no contiene un archivo 'notas'. Archivos disponibles: {hojas_disponibles}")
+
+        leidas = {}
+        for clave, hoja in detectadas.items():
+            if hoja is None:
+                continue
+            miembro, ext = tablas[hoja]
+            try:
+                leidas[clave] = _leer_tabla(paquete.read(miembro), ext)
+            except Exception as e:
+                leidas[clave] = e
+
+    return _armar_resultado(hojas_disponibles, detectadas, leidas)
+
+def leer_encabezados(file_path: str) -> dict:
+    """
+    Lee solo la fila de encabezados de las hojas de notas, inteligencias y CI,
+    sin cargar sus filas, para comprobar la estructura antes de leer todo el
+    archivo. Los formatos columnares se leen completos (es casi inmediato).
+
+    Devuelve {"hojas_disponibles", "hojas": {clave: hoja}, "columnas": {clave: [...]}}
+    con las hojas no encontradas a None.
+    """
+    if es_formato_tabular(file_path):
+        libro = leer_tabular(file_path)
+        hojas = {"notas": "notas", "inteligencia": libro["hoja_inteligencia"], "ci": libro["hoja_ci"]}
+        columnas = {clave: [str(col) for col in libro[clave].columns] for clave, hoja in hojas.items() if hoja}
+        return {"hojas_disponibles": libro["hojas_disponibles"], "hojas": hojas, "columnas": columnas}
+
+    if file_path.lower().endswith(".xlsx"):
+        libro = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            hojas_disponibles = list(libro.sheetnames)
+            hojas = detectar_hojas(hojas_disponibles)
+            columnas = {clave: _encabezados(next(libro[hoja].iter_rows(values_only=True), ()))
+                        for clave, hoja in hojas.items() if hoja}
+        finally:
+            libro.close()
+    else:
+        with pd.ExcelFile(file_path, engine=elegir_motor(file_path)) as libro:
+            hojas_disponibles = list(libro.sheet_names)
+            hojas = detectar_hojas(hojas_disponibles)
+            columnas = {clave: [str(col) for col in libro.parse(hoja, nrows=0).columns]
+                        for clave, hoja in hojas.items() if hoja}
+    return {"hojas_disponibles": hojas_disponibles, "hojas": hojas, "columnas": columnas}
+
+def hojas_del_libro(file_path: str):
+    """Devuelve los nombres de las hojas sin leer su contenido."""
+    libro = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        return list(libro.sheetnames)
+    finally:
+        libro.close()
+
+def _encabezados(fila):
+    """Convierte la primera fila en nombres de columna, como hace pandas."""
+    return [f"Unnamed: {i}" if valor is None else str(valor) for i, valor in enumerate(fila)]
+
+def iterar_hoja(file_path: str, hoja: str, tamano_lote: int):
+    """
+    Recorre una hoja en modo solo lectura y devuelve DataFrames de como mucho
+    `tamano_lote` filas, indexados por su número de fila en la hoja. Nunca hay
+    más de un lote en memoria, sin importar el tamaño del libro.
+    """
+    libro = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        filas = libro[hoja].iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+        columnas = _encabezados(encabezado)
+
+        lote, numeros = [], []
+        for numero, fila in enumerate(filas, start=2):
+            if all(valor is None for valor in fila):
+                continue
+            lote.append(tuple(fila[:len(columnas)]) + (None,) * (len(columnas) - len(fila)))
+            numeros.append(numero)
+            if len(lote) >= tamano_lote:
+                yield pd.DataFrame.from_records(lote, columns=columnas, index=numeros)
+                lote, numeros = [], []
+        if lote:
+            yield pd.DataFrame.from_records(lote, columns=columnas, index=numeros)
+    finally:
+        libro.close()
@@ -0,0 +1,8 @@
+# Máximo de valores por cláusula IN (...), por debajo del límite de parámetros de SQLite
+TAMANO_LOTE_SQL = 500
+
+def en_lotes(valores, tamano: int = TAMANO_LOTE_SQL):
+    """Divide una secuencia en listas de como máximo `tamano` elementos."""
+    valores = list(valores)
+    for inicio in range(0, len(valores), tamano):
+        yield valores[inicio:inicio + tamano]
@@ -0,0 +1,261 @@
+import logging
+import time
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+from app.services import resumenes, perfil_alumnos, cache_subidas, lotes_sql
+from app.services.excel_processor import COMPETENCIAS_DESC
+
+logger = logging.getLogger(__name__)
+
+# Filas por transacción en las correcciones por lotes: cada lote bloquea la
+# escritura unos pocos milisegundos y entre lotes pueden escribir la
+# aplicación y la ingesta
+TAMANO_LOTE = 2000
+
+_CALIFICACION_HUERFANA = (
+    "(NOT EXISTS (SELECT 1 FROM Alumnos a WHERE a.Alumno_ID = AlumnoCompetencia.Alumno_ID)"
+    " OR NOT EXISTS (SELECT 1 FROM CompetenciaPlantilla c"
+    " WHERE c.CompetenciaPlantilla_ID = AlumnoCompetencia.CompetenciaPlantilla_ID))"
+)
+_INTELIGENCIA_HUERFANA = "NOT EXISTS (SELECT 1 FROM Alumnos a WHERE a.Alumno_ID = Inteligencias.Alumno_ID)"
+
+# Nombres legibles de las materias para las descripciones genéricas
+MATERIAS = {
+    "matematicas": "Matemáticas",
+    "comunicacion": "Comunicación",
+    "ingles": "Inglés",
+    "arte": "Arte",
+    "sociales": "Ciencias Sociales",
+    "desarrollo": "Desarrollo Personal",
+    "ef": "Educación Física",
+    "religion": "Educación Religiosa",
+    "ciencia": "Ciencia y Tecnología",
+    "trabajo": "Educación para el Trabajo",
+    "quechua": "Quechua",
+    "tj": "Trabajo y Juventud",
+}
+
+_ALUMNOS_DE_COMPETENCIAS = text(
+    "SELECT DISTINCT Alumno_ID FROM AlumnoCompetencia WHERE CompetenciaPlantilla_ID IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+_DOCUMENTOS_GUARDADOS = text(
+    "SELECT Alumno_ID, Documento FROM PerfilesAlumno WHERE Alumno_ID IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+def _sin_progreso(etapa: str, hechos: int, total: int):
+    pass
+
+def descripcion_competencia(codigo: str) -> str:
+    """
+    Descripción de una competencia según su código (sin espacios repetidos):
+    la de COMPETENCIAS_DESC o, si no está, una genérica armada con el código.
+    """
+    codigo = " ".join((codigo or "").split())
+    if codigo in COMPETENCIAS_DESC:
+        return COMPETENCIAS_DESC[codigo]
+    partes = codigo.split("_")
+    if len(partes) >= 3:
+        materia = MATERIAS.get(partes[1].lower(), partes[1].title())
+        return f"Competencia {partes[2]} de {materia}"
+    return f"Descripción para {codigo}"
+
+def _contar(engine, tabla: str, condicion: str) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM {tabla} WHERE {condicion}")).scalar()
+
+def _corregir_por_lotes(engine, etapa: str, tabla: str, pk: str, condicion: str, sentencia: str,
+                        tamano_lote: int, progreso):
+    """
+    Ejecuta `sentencia` (un UPDATE o DELETE sobre `tabla`, sin WHERE) sobre
+    las filas que cumplen `condicion`, por rangos de `pk` de `tamano_lote`,
+    cada uno en su propia transacción junto con el resumen de los alumnos
+    afectados. Devuelve (filas modificadas, IDs de los alumnos afectados,
+    duración de la transacción de escritura más larga en ms).
+    """
+    with engine.connect() as conn:
+        minimo, maximo = conn.execute(text(f"SELECT MIN({pk}), MAX({pk}) FROM {tabla} WHERE {condicion}")).one()
+    if minimo is None:
+        return 0, set(), 0.0
+
+    rango = f" WHERE {pk} BETWEEN :desde AND :hasta AND {condicion}"
+    alumnos_del_rango = text(f"SELECT DISTINCT Alumno_ID FROM {tabla}" + rango)
+    modificar = text(sentencia + rango)
+    inicios = range(minimo, maximo + 1, tamano_lote)
+    filas, afectados, mayor_ms = 0, set(), 0.0
+    for numero, desde in enumerate(inicios, start=1):
+        limites = {"desde": desde, "hasta": desde + tamano_lote - 1}
+        inicio = time.perf_counter()
+        with engine.begin() as conn:
+            alumnos = conn.execute(alumnos_del_rango, limites).scalars().all()
+            filas += conn.execute(modificar, limites).rowcount
+            resumenes.actualizar_resumenes(conn, alumnos)
+            cache_subidas.invalidar(conn)
+        mayor_ms = max(mayor_ms, (time.perf_counter() - inicio) * 1000)
+        afectados.update(alumnos)
+        progreso(etapa, numero, len(inicios))
+    return filas, afectados, mayor_ms
+
+def _regenerar_perfiles(engine, etapa: str, alumno_ids, progreso) -> float:
+    """
+    Regenera (o borra, si el alumno ya no existe) los perfiles de esos
+    alumnos, de a lotes_sql.TAMANO_LOTE_SQL por transacción. Los
+    documentos se arman antes de escribir, así que la transacción solo dura
+    lo que el upsert. Devuelve la duración de la escritura más larga en ms.
+    """
+    lotes = list(lotes_sql.en_lotes(sorted(alumno_ids)))
+    mayor_ms = 0.0
+    for numero, lote in enumerate(lotes, start=1):
+        with Session(bind=engine) as db:
+            nuevos = perfil_alumnos.documentos(db, lote)
+            inicio = time.perf_counter()
+            perfil_alumnos.guardar_documentos(db, nuevos, lote)
+            db.commit()
+        mayor_ms = max(mayor_ms, (time.perf_counter() - inicio) * 1000)
+        progreso(f"{etapa} (perfiles)", numero, len(lotes))
+    return mayor_ms
+
+def _huerfanos(engine, aplicar: bool, tamano_lote: int, progreso) -> dict:
+    """Calificaciones de alumnos o competencias que ya no existen e inteligencias de alumnos que ya no existen."""
+    pendientes = (_contar(engine, "AlumnoCompetencia", _CALIFICACION_HUERFANA)
+                  + _contar(engine, "Inteligencias", _INTELIGENCIA_HUERFANA))
+    if not aplicar or not pendientes:
+        return {"pendientes": pendientes, "corregidos": 0, "escritura_max_ms": 0.0}
+
+    calificaciones, afectados, mayor_ms = _corregir_por_lotes(
+        engine, "huerfanos", "AlumnoCompetencia", "AlumnoCompetencia_ID", _CALIFICACION_HUERFANA,
+        "DELETE FROM AlumnoCompetencia", tamano_lote, progreso
+    )
+    inteligencias, afectados_inteligencias, mayor_ms_inteligencias = _corregir_por_lotes(
+        engine, "huerfanos", "Inteligencias", "Inteligencia_ID", _INTELIGENCIA_HUERFANA,
+        "DELETE FROM Inteligencias", tamano_lote, progreso
+    )
+    afectados |= afectados_inteligencias
+    mayor_ms = max(mayor_ms, mayor_ms_inteligencias, _regenerar_perfiles(engine, "huerfanos", afectados, progreso))
+    return {"pendientes": pendientes, "corregidos": calificaciones + inteligencias, "escritura_max_ms": mayor_ms}
+
+def _descripciones(engine, aplicar: bool, tamano_lote: int, progreso) -> dict:
+    """Descripciones del catálogo de competencias vacías o distintas de descripcion_competencia."""
+    with engine.connect() as conn:
+        cambios = [
+            {"id": competencia_id, "descripcion": nueva}
+            for competencia_id, codigo, actual in conn.execute(text(
+                "SELECT CompetenciaPlantilla_ID, Codigo_Competencia, Descripcion FROM CompetenciaPlantilla"
+            ))
+            if (nueva := descripcion_competencia(codigo)) != actual
+        ]
+    if not aplicar or not cambios:
+        return {"pendientes": len(cambios), "corregidos": 0, "escritura_max_ms": 0.0}
+
+    inicio = time.perf_counter()
+    with engine.begin() as conn:
+        # Tabla temporal con las descripciones nuevas y un único UPDATE ... FROM
+        conn.execute(text(
+            "CREATE TEMP TABLE mantenimiento_descripciones (CompetenciaPlantilla_ID INTEGER PRIMARY KEY, Descripcion TEXT)"
+        ))
+        conn.execute(text("INSERT INTO mantenimiento_descripciones VALUES (:id, :descripcion)"), cambios)
+        corregidos = conn.execute(text("""
+            UPDATE CompetenciaPlantilla SET Descripcion = n.Descripcion
+            FROM mantenimiento_descripciones n
+            WHERE n.CompetenciaPlantilla_ID = CompetenciaPlantilla.CompetenciaPlantilla_ID
+        """)).rowcount
+        conn.execute(text("DROP TABLE mantenimiento_descripciones"))
+        cache_subidas.invalidar(conn)
+    mayor_ms = (time.perf_counter() - inicio) * 1000
+    progreso("descripciones", 1, 1)
+
+    # Los perfiles muestran la descripción de cada competencia calificada
+    with engine.connect() as conn:
+        afectados = conn.execute(_ALUMNOS_DE_COMPETENCIAS, {"ids": [cambio["id"] for cambio in cambios]}).scalars().all()
+    mayor_ms = max(mayor_ms, _regenerar_perfiles(engine, "descripciones", afectados, progreso))
+    return {"pendientes": len(cambios), "corregidos": corregidos, "escritura_max_ms": mayor_ms}
+
+def _resumenes(engine, aplicar: bool, tamano_lote: int, progreso) -> dict:
+    """Resúmenes de calificaciones (promedio, cantidad, Cant_A a Cant_D) que no coinciden con AlumnoCompetencia."""
+    with engine.connect() as conn:
+        desactualizados = resumenes.alumnos_desactualizados(conn)
+    if not aplicar or not desactualizados:
+        return {"pendientes": len(desactualizados), "corregidos": 0, "escritura_max_ms": 0.0}
+
+    lotes = list(lotes_sql.en_lotes(desactualizados, tamano_lote))
+    corregidos, mayor_ms = 0, 0.0
+    for numero, lote in enumerate(lotes, start=1):
+        inicio = time.perf_counter()
+        with engine.begin() as conn:
+            corregidos += resumenes.actualizar_resumenes(conn, lote)
+            cache_subidas.invalidar(conn)
+        mayor_ms = max(mayor_ms, (time.perf_counter() - inicio) * 1000)
+        progreso("resumenes", numero, len(lotes))
+    mayor_ms = max(mayor_ms, _regenerar_perfiles(engine, "resumenes", desactualizados, progreso))
+    return {"pendientes": len(desactualizados), "corregidos": corregidos, "escritura_max_ms": mayor_ms}
+
+def _perfiles(engine, aplicar: bool, tamano_lote: int, progreso) -> dict:
+    """Perfiles precalculados que faltan, no coinciden con los datos o son de alumnos que ya no existen."""
+    pendientes, corregidos, mayor_ms = 0, 0, 0.0
+    with Session(bind=engine) as db:
+        huerfanos = set(db.execute(text(
+            "SELECT Alumno_ID FROM PerfilesAlumno p WHERE NOT EXISTS (SELECT 1 FROM Alumnos a WHERE a.Alumno_ID = p.Alumno_ID)"
+        )).scalars())
+        alumno_ids = db.execute(text("SELECT Alumno_ID FROM Alumnos ORDER BY Alumno_ID")).scalars().all()
+        lotes = [sorted(huerfanos)] + list(lotes_sql.en_lotes(alumno_ids))
+        for numero, lote in enumerate(lotes, start=1):
+            if not lote:
+                continue
+            guardados = dict(db.execute(_DOCUMENTOS_GUARDADOS, {"ids": lote}).all())
+            nuevos = {
+                alumno_id: documento for alumno_id, documento in perfil_alumnos.documentos(db, lote).items()
+                if guardados.get(alumno_id) != documento
+            }
+            # Los huérfanos no tienen documento nuevo: guardar_documentos los borra
+            desactualizados = list(nuevos) + [alumno_id for alumno_id in lote if alumno_id in huerfanos]
+            pendientes += len(desactualizados)
+            if aplicar and desactualizados:
+                inicio = time.perf_counter()
+                corregidos += len(desactualizados)
+                perfil_alumnos.guardar_documentos(db, nuevos, desactualizados)
+                db.commit()
+                mayor_ms = max(mayor_ms, (time.perf_counter() - inicio) * 1000)
+            progreso("perfiles", numero, len(lotes))
+    return {"pendientes": pendientes, "corregidos": corregidos, "escritura_max_ms": mayor_ms}
+
+# Tareas en el orden en que se ejecutan: (nombre, descripción, función). Cada
+# función recibe (engine, aplicar, tamano_lote, progreso) y devuelve
+# pendientes, corregidos y la escritura más larga; con aplicar=False solo
+# cuenta. Para una corrección nueva se agrega una entrada; las que cambian
+# calificaciones van antes de "resumenes" y "perfiles", que revisan el resultado.
+TAREAS = [
+    ("huerfanos", "Calificaciones e inteligencias de alumnos o competencias que ya no existen", _huerfanos),
+    ("descripciones", "Descripciones del catálogo de competencias", _descripciones),
+    ("resumenes", "Resúmenes de calificaciones desactualizados", _resumenes),
+    ("perfiles", "Perfiles precalculados desactualizados o huérfanos", _perfiles),
+]
+
+def ejecutar(engine, nombres=None, aplicar: bool = True, tamano_lote: int = TAMANO_LOTE, progreso=None) -> list:
+    """
+    Ejecuta en orden las tareas indicadas (todas si `nombres` es None). Con
+    aplicar=False (simulación) solo cuenta lo que se corregiría, sin
+    escribir. `progreso(etapa, hechos, total)` se llama después de cada
+    lote. Devuelve un resultado por tarea. ValueError si alguna no existe.
+    """
+    disponibles = [nombre for nombre, _, _ in TAREAS]
+    desconocidas = set(nombres or ()) - set(disponibles)
+    if desconocidas:
+        raise ValueError(f"Tareas no válidas: {', '.join(sorted(desconocidas))}. Opciones: {', '.join(disponibles)}")
+    progreso = progreso or _sin_progreso
+
+    resultados = []
+    for nombre, descripcion, tarea in TAREAS:
+        if nombres is not None and nombre not in nombres:
+            continue
+        inicio = time.perf_counter()
+        resultado = tarea(engine, aplicar, tamano_lote, progreso)
+        resultado.update({
+            "tarea": nombre,
+            "descripcion": descripcion,
+            "aplicada": aplicar,
+            "segundos": round(time.perf_counter() - inicio, 3),
+            "escritura_max_ms": round(resultado["escritura_max_ms"], 1),
+        })
+        logger.info(f"Mantenimiento {nombre}: {resultado['pendientes']} pendientes, {resultado['corregidos']} corregidos")
+        resultados.append(resultado)
+    return resultados
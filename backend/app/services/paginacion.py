@@ -0,0 +1,87 @@
+import json
+import base64
+import binascii
+from sqlalchemy import and_, or_, tuple_
+
+# Cabecera de respuesta con el cursor de la página siguiente (ausente en la última)
+CABECERA_CURSOR = "X-Siguiente-Cursor"
+
+def codificar_cursor(datos: dict) -> str:
+    """Convierte la posición de la última fila en un cursor opaco (base64 de un JSON)."""
+    crudo = json.dumps(datos, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+def decodificar_cursor(cursor: str, orden: str = "id", descendente: bool = False) -> dict:
+    """
+    Inverso de codificar_cursor. Comprueba los tipos de cada campo antes de
+    que lleguen al WHERE y que el cursor se generó con el mismo orden.
+    ValueError si el cursor no es válido.
+    """
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        datos = json.loads(crudo)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Cursor de paginación no válido")
+    if not isinstance(datos, dict):
+        raise ValueError("Cursor de paginación no válido")
+    ultimo_id = datos.get("id")
+    if not isinstance(ultimo_id, int) or isinstance(ultimo_id, bool):
+        raise ValueError("Cursor de paginación no válido")
+    valor = datos.get("valor")
+    if valor is not None and (not isinstance(valor, (str, int, float)) or isinstance(valor, bool)):
+        raise ValueError("Cursor de paginación no válido")
+    if datos.get("orden") != orden or datos.get("desc") is not bool(descendente):
+        raise ValueError("El cursor se generó con otro orden; vuelva a la primera página")
+    return datos
+
+def _despues_de(columna, pk, valor, ultimo_id, descendente: bool):
+    """
+    Condición "fila posterior a (valor, ultimo_id)" en el orden (columna, pk).
+    SQLite ordena los NULL primero en orden ascendente y al final en
+    descendente, así que las filas sin valor también se recorren. La
+    comparación de tuplas permite a SQLite buscar directamente en el índice
+    de la columna (que incluye el Alumno_ID/rowid).
+    """
+    if valor is None:
+        if descendente:
+            return and_(columna.is_(None), pk < ultimo_id)
+        return or_(and_(columna.is_(None), pk > ultimo_id), columna.isnot(None))
+    if descendente:
+        return or_(tuple_(columna, pk) < tuple_(valor, ultimo_id), columna.is_(None))
+    return tuple_(columna, pk) > tuple_(valor, ultimo_id)
+
+def paginar(query, pk, limite: int, cursor: str = None, columna=None, orden: str = "id", descendente: bool = False,
+            saltar: int = 0):
+    """
+    Pagina `query` por conjunto de claves (keyset): ordena por (columna, pk)
+    y, con `cursor`, continúa justo después de la última fila de la página
+    anterior en lugar de usar OFFSET, así que cualquier página cuesta lo mismo.
+    Sin `columna` se ordena solo por la clave primaria. `saltar` (OFFSET) se
+    mantiene por compatibilidad con los clientes que aún paginan con `skip`.
+
+    Devuelve (filas, cursor de la página siguiente o None). ValueError si el
+    cursor no es válido o se generó con otro orden.
+    """
+    columna_orden = columna if columna is not None else pk
+    if cursor:
+        datos = decodificar_cursor(cursor, orden, descendente)
+        if columna is None:
+            query = query.filter(pk < datos["id"] if descendente else pk > datos["id"])
+        else:
+            query = query.filter(_despues_de(columna, pk, datos.get("valor"), datos["id"], descendente))
+
+    if descendente:
+        orden_sql = [columna_orden.desc()] + ([pk.desc()] if columna is not None else [])
+    else:
+        orden_sql = [columna_orden.asc()] + ([pk.asc()] if columna is not None else [])
+    filas = query.order_by(*orden_sql).offset(saltar or None).limit(limite + 1).all()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        datos = {"orden": orden, "desc": descendente, "id": getattr(ultima, pk.key)}
+        if columna is not None:
+            datos["valor"] = getattr(ultima, columna.key)
+        siguiente = codificar_cursor(datos)
+    return filas, siguiente
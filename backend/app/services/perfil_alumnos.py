@@ -0,0 +1,250 @@
+import json
+import logging
+from sqlalchemy import select, delete, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.database import models
+from app.services import cache_subidas, lotes_sql
+
+logger = logging.getLogger(__name__)
+
+def _consultas(alumno_ids):
+    """Las tres consultas del perfil, filtradas por `alumno_ids` (o sin filtrar si es None)."""
+    # populate_existing: el promedio y los conteos se actualizan con SQL directo
+    # (services/resumenes.py), así que no se reutilizan valores de la sesión
+    alumnos = select(models.Alumno).order_by(models.Alumno.Alumno_ID).execution_options(populate_existing=True)
+    calificaciones = (
+        select(models.AlumnoCompetencia.Alumno_ID,
+               models.AlumnoCompetencia.Calificacion,
+               models.CompetenciaPlantilla.Codigo_Competencia,
+               models.CompetenciaPlantilla.Descripcion,
+               models.Curso.Nombre)
+        .outerjoin(models.CompetenciaPlantilla,
+                   models.CompetenciaPlantilla.CompetenciaPlantilla_ID == models.AlumnoCompetencia.CompetenciaPlantilla_ID)
+        .outerjoin(models.Curso, models.Curso.Curso_ID == models.CompetenciaPlantilla.Curso_ID)
+        .order_by(models.AlumnoCompetencia.Alumno_ID, models.AlumnoCompetencia.CompetenciaPlantilla_ID)
+    )
+    inteligencias = (
+        select(models.Inteligencia.Alumno_ID, models.TipoInteligencia.Nombre, models.Inteligencia.Puntaje)
+        .join(models.TipoInteligencia, models.TipoInteligencia.TipoInteligencia_ID == models.Inteligencia.TipoInteligencia_ID)
+        .order_by(models.Inteligencia.Alumno_ID, models.TipoInteligencia.Nombre)
+    )
+    if alumno_ids is not None:
+        alumnos = alumnos.where(models.Alumno.Alumno_ID.in_(alumno_ids))
+        calificaciones = calificaciones.where(models.AlumnoCompetencia.Alumno_ID.in_(alumno_ids))
+        inteligencias = inteligencias.where(models.Inteligencia.Alumno_ID.in_(alumno_ids))
+    return alumnos, calificaciones, inteligencias
+
+def _armar_perfiles(db: Session, alumno_ids, perfiles: dict):
+    consulta_alumnos, consulta_calificaciones, consulta_inteligencias = _consultas(alumno_ids)
+    alumnos = db.execute(consulta_alumnos).scalars().all()
+    if not alumnos:
+        return
+    for alumno in alumnos:
+        perfiles[alumno.Alumno_ID] = {
+            "alumno_id": alumno.Alumno_ID,
+            "nombre": alumno.Nombre,
+            "ci": alumno.CI,
+            "promedio": alumno.Promedio_Calificaciones,
+            "recomendaciones_basicas": alumno.Recomendaciones_Basicas,
+            # Conteo por letra calculado en SQL junto con el promedio (services/resumenes.py)
+            "conteos": {"A": alumno.Cant_A or 0, "B": alumno.Cant_B or 0, "C": alumno.Cant_C or 0, "D": alumno.Cant_D or 0},
+            "inteligencias": [],
+            "calificaciones": [],
+        }
+    for alumno_id, calificacion, codigo, descripcion, curso in db.execute(consulta_calificaciones):
+        if alumno_id in perfiles:
+            perfiles[alumno_id]["calificaciones"].append({
+                "competencia": codigo,
+                "calificacion": calificacion,
+                "descripcion": descripcion,
+                "curso": curso
+            })
+    for alumno_id, tipo, puntaje in db.execute(consulta_inteligencias):
+        if alumno_id in perfiles:
+            perfiles[alumno_id]["inteligencias"].append({"tipo": tipo, "puntaje": puntaje})
+
+def cargar_perfiles(db: Session, alumno_ids=None) -> list:
+    """
+    Arma el perfil (datos del alumno, calificaciones con su competencia y
+    curso, e inteligencias) de varios alumnos con tres consultas: alumnos,
+    calificaciones unidas a CompetenciaPlantilla y Curso, e inteligencias.
+    Sin `alumno_ids` carga todos los alumnos; con ellos, tres consultas por
+    cada lotes_sql.TAMANO_LOTE_SQL IDs.
+
+    Devuelve los perfiles ordenados por Alumno_ID. Las calificaciones cuya
+    competencia ya no existe se incluyen con "competencia" a None.
+    """
+    perfiles = {}
+    if alumno_ids is None:
+        _armar_perfiles(db, None, perfiles)
+    else:
+        for lote in lotes_sql.en_lotes(sorted(set(alumno_ids))):
+            _armar_perfiles(db, lote, perfiles)
+    return [perfiles[alumno_id] for alumno_id in sorted(perfiles)]
+
+def cargar_perfil(db: Session, alumno_id: int):
+    """Perfil de un único alumno, o None si no existe."""
+    perfiles = cargar_perfiles(db, [alumno_id])
+    return perfiles[0] if perfiles else None
+
+def categoria_ci(ci_valor: int) -> str:
+    """Determinar categoría de CI"""
+    if ci_valor >= 130:
+        return "Muy Superior"
+    elif ci_valor >= 120:
+        return "Superior"
+    elif ci_valor >= 110:
+        return "Promedio Alto"
+    elif ci_valor >= 90:
+        return "Promedio"
+    elif ci_valor >= 80:
+        return "Promedio Bajo"
+    elif ci_valor >= 70:
+        return "Bajo"
+    else:
+        return "Muy Bajo"
+
+def info_ci(ci_valor):
+    """CI con su categoría, o None si el alumno no lo tiene"""
+    if not ci_valor:
+        return None
+    return {
+        "valor": ci_valor,
+        "categoria": categoria_ci(ci_valor)
+    }
+
+def documento_perfil(perfil: dict) -> dict:
+    """
+    Perfil completo que devuelve /api/ai-assistant/student/{id}: inteligencias
+    de mayor a menor y las predominantes (al menos el 80% del máximo),
+    calificaciones agrupadas por curso y estadísticas por letra.
+    """
+    inteligencias_list = sorted(perfil["inteligencias"], key=lambda intel: intel["puntaje"], reverse=True)
+    calificaciones = perfil["calificaciones"]
+
+    # Calificaciones agrupadas por curso
+    calificaciones_por_curso = {}
+    for cal in calificaciones:
+        if cal["competencia"] is not None and cal["curso"] is not None:
+            calificaciones_por_curso.setdefault(cal["curso"], []).append({
+                "competencia": cal["competencia"],
+                "calificacion": cal["calificacion"],
+                "descripcion": cal["descripcion"]
+            })
+
+    # Estadísticas: los conteos por letra ya vienen de Alumnos (Cant_A a Cant_D)
+    total_calificaciones = len(calificaciones)
+    calificaciones_a = perfil["conteos"]["A"]
+    calificaciones_b = perfil["conteos"]["B"]
+    calificaciones_c = perfil["conteos"]["C"]
+    calificaciones_d = perfil["conteos"]["D"]
+
+    # Inteligencias predominantes
+    inteligencias_predominantes = []
+    if inteligencias_list:
+        max_puntaje = max(intel['puntaje'] for intel in inteligencias_list)
+        inteligencias_predominantes = [
+            intel for intel in inteligencias_list
+            if intel['puntaje'] >= max_puntaje * 0.8  # 80% del máximo
+        ]
+
+    return {
+        "alumno_id": perfil["alumno_id"],
+        "nombre": perfil["nombre"],
+        "ci": info_ci(perfil["ci"]),
+        "inteligencias": inteligencias_list,
+        "inteligencias_predominantes": inteligencias_predominantes,
+        "calificaciones_por_curso": calificaciones_por_curso,
+        "promedio": perfil["promedio"],
+        "recomendaciones_basicas": perfil["recomendaciones_basicas"],
+        "estadisticas": {
+            "total_calificaciones": total_calificaciones,
+            "calificaciones_a": calificaciones_a,
+            "calificaciones_b": calificaciones_b,
+            "calificaciones_c": calificaciones_c,
+            "calificaciones_d": calificaciones_d,
+            "porcentaje_excelente": (calificaciones_a / total_calificaciones * 100) if total_calificaciones > 0 else 0,
+            "porcentaje_bueno": (calificaciones_b / total_calificaciones * 100) if total_calificaciones > 0 else 0,
+            "porcentaje_regular": (calificaciones_c / total_calificaciones * 100) if total_calificaciones > 0 else 0,
+            "porcentaje_deficiente": (calificaciones_d / total_calificaciones * 100) if total_calificaciones > 0 else 0
+        }
+    }
+
+def documento_json(perfil: dict) -> str:
+    """Texto JSON compacto de documento_perfil(perfil), tal como se guarda en PerfilesAlumno"""
+    return json.dumps(documento_perfil(perfil), ensure_ascii=False, separators=(",", ":"))
+
+def documentos(db: Session, alumno_ids) -> dict:
+    """{Alumno_ID: documento JSON} de un grupo de alumnos (los que no existen no aparecen). Solo lee."""
+    return {perfil["alumno_id"]: documento_json(perfil) for perfil in cargar_perfiles(db, alumno_ids)}
+
+def guardar_documentos(db: Session, documentos_alumnos: dict, alumno_ids):
+    """Guarda `documentos_alumnos` (ver documentos) y borra los de los `alumno_ids` que no están en él."""
+    if documentos_alumnos:
+        upsert = sqlite_insert(models.PerfilAlumno)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[models.PerfilAlumno.Alumno_ID],
+            set_={"Documento": upsert.excluded.Documento}
+        )
+        db.execute(upsert, [
+            {"Alumno_ID": alumno_id, "Documento": documento}
+            for alumno_id, documento in documentos_alumnos.items()
+        ])
+    eliminados = set(alumno_ids) - set(documentos_alumnos)
+    if eliminados:
+        db.execute(delete(models.PerfilAlumno).where(models.PerfilAlumno.Alumno_ID.in_(eliminados)))
+    return len(documentos_alumnos)
+
+def _guardar_documentos(db: Session, alumno_ids):
+    """Regenera los documentos de un grupo de alumnos y borra los de los que ya no existen."""
+    return guardar_documentos(db, documentos(db, alumno_ids), alumno_ids)
+
+def materializar_perfiles(db: Session, alumno_ids=None) -> int:
+    """
+    Guarda en PerfilesAlumno el documento JSON (documento_perfil) de los
+    alumnos indicados, o de todos si `alumno_ids` es None. Se llama en la
+    misma transacción que cualquier escritura que cambie el perfil (datos
+    del alumno, calificaciones, inteligencias o catálogo) y solo para los
+    alumnos afectados; los IDs de alumnos que ya no existen borran su
+    documento. También descarta los resúmenes de subidas guardados
+    (cache_subidas.invalidar), ya que la escritura cambió los datos. Acepta
+    una sesión y no hace commit. Devuelve el número de documentos escritos.
+    """
+    # SessionLocal no hace autoflush: los cambios pendientes deben verse en las consultas del perfil
+    db.flush()
+    cache_subidas.invalidar(db)
+    if alumno_ids is None:
+        ids = db.execute(select(models.Alumno.Alumno_ID).order_by(models.Alumno.Alumno_ID)).scalars().all()
+        db.execute(delete(models.PerfilAlumno).where(
+            models.PerfilAlumno.Alumno_ID.not_in(select(models.Alumno.Alumno_ID))
+        ))
+    else:
+        ids = sorted(set(int(alumno_id) for alumno_id in alumno_ids))
+
+    escritos = 0
+    for lote in lotes_sql.en_lotes(ids):
+        escritos += _guardar_documentos(db, lote)
+    if alumno_ids is None:
+        logger.info(f"Perfiles materializados para todos los alumnos ({escritos})")
+    return escritos
+
+# Lectura de un documento: sentencia ya armada para no construir ni compilar
+# una expresión ORM en cada petición
+_LEER_DOCUMENTO = text("SELECT Documento FROM PerfilesAlumno WHERE Alumno_ID = :alumno_id")
+
+def leer_documento(db: Session, alumno_id: int):
+    """
+    Documento JSON (texto) del perfil de un alumno, con una búsqueda por
+    clave primaria. Si el alumno existe pero aún no tiene documento (p. ej.
+    se modificó la base con un script) se arma en el momento sin guardarlo.
+    None si el alumno no existe.
+    """
+    documento = db.execute(_LEER_DOCUMENTO, {"alumno_id": alumno_id}).scalar()
+    if documento is not None:
+        return documento
+    perfil = cargar_perfil(db, alumno_id)
+    if perfil is None:
+        return None
+    logger.warning(f"Alumno {alumno_id} sin perfil materializado; se arma en el momento")
+    return documento_json(perfil)
@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import logging
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows: sin getrusage, no se registra la memoria residente
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# El pico de memoria por etapa se mide con tracemalloc solo si se activa con
+# INGESTA_PERFILAR_MEMORIA=1: trazar cada asignación hace la lectura del libro
+# varias veces más lenta. El máximo de memoria residente del proceso se
+# registra siempre que el sistema lo permita (no tiene coste).
+MEDIR_MEMORIA = os.getenv("INGESTA_PERFILAR_MEMORIA") == "1"
+
+class PerfiladorEtapas:
+    """
+    Mide cada etapa de una ingesta: tiempo de reloj, filas por segundo, pico
+    de memoria trazada (tracemalloc, si MEDIR_MEMORIA) y máximo de memoria
+    residente del proceso al terminarla. Una etapa empieza con `etapa(nombre)` y
+    termina cuando empieza la siguiente o al llamar a `resumen()`. Reenvía cada
+    etapa al callback `progreso(etapa, filas)` del trabajo de ingesta.
+    """
+
+    def __init__(self, progreso=None, etapas_previas=None):
+        self.progreso = progreso
+        self.etapas = list(etapas_previas or [])
+        self._actual = None
+        self._inicio = None
+        self._inicio_tracemalloc = MEDIR_MEMORIA and not tracemalloc.is_tracing()
+        if self._inicio_tracemalloc:
+            tracemalloc.start()
+
+    def etapa(self, nombre: str, filas: int = None):
+        """Cierra la etapa en curso y abre `nombre`. `filas` se pasa tal cual al callback de progreso."""
+        self._cerrar()
+        self._actual = {"etapa": nombre, "segundos": 0.0, "filas": None, "filas_por_segundo": None,
+                        "memoria_pico_mb": None, "memoria_rss_max_mb": None}
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._inicio = time.perf_counter()
+        if self.progreso:
+            self.progreso(nombre, filas)
+
+    def filas(self, cantidad: int):
+        """Filas tratadas en la etapa en curso (para calcular filas por segundo)."""
+        if self._actual is not None:
+            self._actual["filas"] = int(cantidad)
+
+    def _cerrar(self):
+        if self._actual is None:
+            return
+        segundos = time.perf_counter() - self._inicio
+        self._actual["segundos"] = round(segundos, 4)
+        if self._actual["filas"] is not None and segundos > 0:
+            self._actual["filas_por_segundo"] = round(self._actual["filas"] / segundos, 1)
+        if tracemalloc.is_tracing():
+            self._actual["memoria_pico_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        if resource is not None:
+            # ru_maxrss está en KB en Linux
+            self._actual["memoria_rss_max_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        self.etapas.append(self._actual)
+        self._actual = None
+
+    def detener(self):
+        """Deja de trazar la memoria si la trazó este perfilador (llamar también si la ingesta falla)."""
+        if self._inicio_tracemalloc:
+            tracemalloc.stop()
+            self._inicio_tracemalloc = False
+
+    def resumen(self) -> dict:
+        """Cierra la etapa en curso y devuelve las mediciones (para la clave "profiling")."""
+        self._cerrar()
+        self.detener()
+        picos = [etapa["memoria_pico_mb"] for etapa in self.etapas if etapa["memoria_pico_mb"] is not None]
+        residentes = [etapa["memoria_rss_max_mb"] for etapa in self.etapas if etapa["memoria_rss_max_mb"] is not None]
+        return {
+            "etapas": self.etapas,
+            "total_segundos": round(sum(etapa["segundos"] for etapa in self.etapas), 4),
+            "memoria_pico_mb": max(picos) if picos else None,
+            "memoria_rss_max_mb": max(residentes) if residentes else None
+        }
+
+def registrar_perfilado(archivo: str, perfilado: dict, **contexto):
+    """Escribe el perfilado en el log como una línea JSON, fácil de filtrar y comparar entre importaciones."""
+    registro = {"evento": "perfilado_ingesta", "archivo": archivo, **contexto, **perfilado}
+    logger.info(json.dumps(registro, ensure_ascii=False))
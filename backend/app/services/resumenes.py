@@ -0,0 +1,53 @@
+import logging
+from sqlalchemy import text, bindparam
+from app.database.models import VALOR_CALIFICACION
+from app.services import lotes_sql
+
+logger = logging.getLogger(__name__)
+
+_CONTEOS_SQL = ",\n           ".join(
+    f"COUNT(CASE WHEN Valor_Calificacion = {VALOR_CALIFICACION[letra]} THEN 1 END)" for letra in "ABCD"
+)
+
+# Una sola subconsulta por alumno calcula a la vez todas las columnas de
+# resumen, leyendo solo el índice (Alumno_ID, CompetenciaPlantilla_ID,
+# Valor_Calificacion). Un alumno sin calificaciones queda con conteos en 0 y
+# promedio NULL.
+_COLUMNAS = "(Cantidad_Competencias, Promedio_Calificaciones, Cant_A, Cant_B, Cant_C, Cant_D)"
+_RESUMEN = f"""(
+    SELECT COUNT(*),
+           ROUND(AVG(Valor_Calificacion), 2),
+           {_CONTEOS_SQL}
+    FROM AlumnoCompetencia WHERE AlumnoCompetencia.Alumno_ID = Alumnos.Alumno_ID
+)"""
+_ACTUALIZAR = f"UPDATE Alumnos SET {_COLUMNAS} = {_RESUMEN}"
+_ACTUALIZAR_TODOS = text(_ACTUALIZAR)
+_ACTUALIZAR_ALUMNOS = text(_ACTUALIZAR + " WHERE Alumno_ID IN :ids").bindparams(bindparam("ids", expanding=True))
+_DESACTUALIZADOS = text(f"SELECT Alumno_ID FROM Alumnos WHERE {_COLUMNAS} IS NOT {_RESUMEN} ORDER BY Alumno_ID")
+
+def actualizar_resumenes(db, alumno_ids=None) -> int:
+    """
+    Recalcula Cantidad_Competencias, Promedio_Calificaciones (A=4 ... D=1) y
+    los conteos Cant_A a Cant_D a partir de AlumnoCompetencia. Con
+    `alumno_ids` solo para esos alumnos (lo que se llama después de escribir
+    sus calificaciones); sin ellos, para todos. Acepta una sesión o una
+    conexión y no hace commit: el resumen se guarda en la misma transacción
+    que las calificaciones. Devuelve el número de alumnos actualizados.
+    """
+    if alumno_ids is None:
+        actualizados = db.execute(_ACTUALIZAR_TODOS).rowcount
+        logger.info(f"Resúmenes recalculados para todos los alumnos ({actualizados})")
+        return actualizados
+
+    ids = sorted(set(int(alumno_id) for alumno_id in alumno_ids))
+    actualizados = 0
+    for lote in lotes_sql.en_lotes(ids):
+        actualizados += db.execute(_ACTUALIZAR_ALUMNOS, {"ids": lote}).rowcount
+    return actualizados
+
+def alumnos_desactualizados(db) -> list:
+    """
+    IDs de los alumnos cuyo resumen guardado no coincide con sus
+    calificaciones (p. ej. tras editar AlumnoCompetencia a mano). Solo lee.
+    """
+    return db.execute(_DESACTUALIZADOS).scalars().all()
@@ -0,0 +1,41 @@
+import logging
+from sqlalchemy import select, insert, exists
+from sqlalchemy.orm import Session
+from app.database import models
+from app.services import lotes_sql
+
+logger = logging.getLogger(__name__)
+
+def ids_tipos(db: Session, nombres) -> dict:
+    """
+    {nombre: TipoInteligencia_ID} de los tipos indicados, creando en
+    TiposInteligencia los que aún no existen. Los nombres se guardan tal cual
+    (igual que las columnas de la hoja de inteligencias). Acepta una sesión o
+    una conexión y no hace commit.
+    """
+    nombres = {str(nombre) for nombre in nombres}
+    ids = {}
+    for lote in lotes_sql.en_lotes(nombres):
+        ids.update(db.execute(
+            select(models.TipoInteligencia.Nombre, models.TipoInteligencia.TipoInteligencia_ID)
+            .where(models.TipoInteligencia.Nombre.in_(lote))
+        ).all())
+    nuevos = sorted(nombres - set(ids))
+    if nuevos:
+        ids.update(db.execute(
+            insert(models.TipoInteligencia).returning(models.TipoInteligencia.Nombre, models.TipoInteligencia.TipoInteligencia_ID),
+            [{"Nombre": nombre} for nombre in nuevos]
+        ).all())
+        logger.info(f"Tipos de inteligencia creados: {nuevos}")
+    return ids
+
+def id_tipo(db: Session, nombre: str) -> int:
+    """TipoInteligencia_ID de un tipo (creándolo si no existe)."""
+    return ids_tipos(db, [nombre])[str(nombre)]
+
+def listar_tipos(db: Session) -> list:
+    """Nombres de los tipos con al menos una inteligencia registrada, en orden alfabético."""
+    en_uso = exists().where(models.Inteligencia.TipoInteligencia_ID == models.TipoInteligencia.TipoInteligencia_ID)
+    return db.execute(
+        select(models.TipoInteligencia.Nombre).where(en_uso).order_by(models.TipoInteligencia.Nombre)
+    ).scalars().all()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Script para comparar los motores de lectura de libros Excel disponibles
+(calamine, openpyxl) sobre libros generados con la misma forma que los reales:
+una hoja de notas ancha, una de inteligencias y una de CI.
+"""
+
+import sys
+import os
+import time
+import random
+import logging
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from app.services import lector_excel
+
+# Configurar logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+MATERIAS = ["matematicas", "comunicacion", "ingles", "arte", "ciencias", "personal_social", "educacion_fisica", "religion"]
+INTELIGENCIAS = ["Lingüística", "Lógico-matemática", "Espacial", "Musical", "Corporal", "Interpersonal", "Intrapersonal", "Naturalista"]
+
+def generar_libro(ruta, filas, competencias_por_materia=4, semilla=0):
+    """Crea un libro de prueba con `filas` alumnos y una columna por competencia"""
+    azar = random.Random(semilla)
+    nombres = [f"Alumno Prueba {i:06d}" for i in range(filas)]
+    grados = [f"{1 + i % 6}{'ABC'[i % 3]}" for i in range(filas)]
+
+    notas = {"grado_seccion": grados, "nom": nombres}
+    for materia in MATERIAS:
+        for c in range(1, competencias_por_materia + 1):
+            notas[f"1_{materia}_c{c}"] = [azar.choice(["A", "B", "C", "D", 1, 2, 3, 4]) for _ in range(filas)]
+    inteligencia = {"grado_seccion": grados, "nom": nombres}
+    for tipo in INTELIGENCIAS:
+        inteligencia[tipo] = [round(azar.uniform(0, 100), 1) for _ in range(filas)]
+    ci = {"nom": nombres, "ci": [azar.randint(70, 140) for _ in range(filas)]}
+
+    with pd.ExcelWriter(ruta, engine="openpyxl") as writer:
+        pd.DataFrame(notas).to_excel(writer, sheet_name="notas", index=False)
+        pd.DataFrame(inteligencia).to_excel(writer, sheet_name="inteligencia", index=False)
+        pd.DataFrame(ci).to_excel(writer, sheet_name="ci", index=False)
+
+def medir(ruta, motor, repeticiones):
+    """Mejor tiempo de leer_libro con el motor indicado (en serie, como un libro pequeño)"""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        libro = lector_excel.leer_libro(ruta, paralelo=False, motor=motor)
+        segundos = time.perf_counter() - inicio
+        mejor = segundos if mejor is None else min(mejor, segundos)
+    return mejor, len(libro["notas"])
+
+def benchmark(tamanos, repeticiones=3, competencias_por_materia=4):
+    """Genera un libro por tamaño y compara los motores instalados"""
+    motores = lector_excel.motores_disponibles()
+    no_instalados = [m for m in lector_excel.MOTORES_EXCEL if m not in motores]
+    print(f"Motores instalados: {', '.join(motores)}")
+    if no_instalados:
+        print(f"No instalados: {', '.join(no_instalados)}")
+    print(f"Motor elegido automáticamente: {lector_excel.elegir_motor('libro.xlsx')}")
+
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="benchmark_excel_") as directorio:
+        for filas in tamanos:
+            ruta = os.path.join(directorio, f"libro_{filas}.xlsx")
+            generar_libro(ruta, filas, competencias_por_materia)
+            tamano_mb = os.path.getsize(ruta) / (1024 * 1024)
+            print("=" * 60)
+            print(f"{filas} alumnos ({tamano_mb:.1f} MB)")
+            tiempos = {motor: medir(ruta, motor, repeticiones) for motor in motores}
+            mas_lento = max(segundos for segundos, _ in tiempos.values())
+            for motor, (segundos, leidas) in tiempos.items():
+                print(f"  {motor:<10} {segundos:8.3f} s  {leidas / segundos:10.0f} filas/s  x{mas_lento / segundos:.1f}")
+                resultados.append({"filas": filas, "motor": motor, "segundos": round(segundos, 4)})
+    print("=" * 60)
+    return resultados
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Comparar los motores de lectura de libros Excel")
+    parser.add_argument("--filas", "-f", type=int, nargs="+", default=[1000, 5000, 20000], help="Alumnos de cada libro generado")
+    parser.add_argument("--repeticiones", "-r", type=int, default=3, help="Lecturas por motor (se toma la más rápida)")
+    parser.add_argument("--competencias", "-c", type=int, default=4, help="Competencias por materia (columnas de la hoja de notas)")
+
+    args = parser.parse_args()
+    benchmark(args.filas, repeticiones=args.repeticiones, competencias_por_materia=args.competencias)
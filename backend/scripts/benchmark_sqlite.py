@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Script para medir la latencia de las lecturas mientras una importación
+escribe en la base de datos, con la configuración de SQLite por defecto
+(journal en modo DELETE) y con los ajustes de database.PRAGMAS_SQLITE (WAL,
+mmap, caché, busy_timeout). Trabaja sobre bases de prueba temporales.
+"""
+
+import sys
+import os
+import time
+import random
+import logging
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from app.database import database, models, migraciones
+
+# Configurar logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 500
+# Trabajo de la ingesta entre lote y lote (transformar DataFrames) con la transacción abierta
+PAUSA_ENTRE_LOTES = 0.01
+
+CONSULTA_LECTURA = text("""
+    SELECT a.Alumno_ID, a.Nombre, COUNT(ac.AlumnoCompetencia_ID)
+    FROM Alumnos a LEFT JOIN AlumnoCompetencia ac ON ac.Alumno_ID = a.Alumno_ID
+    WHERE a.Alumno_ID BETWEEN :desde AND :desde + 50
+    GROUP BY a.Alumno_ID
+""")
+
+def crear_base(ruta, alumnos, competencias):
+    """Crea una base de prueba con `alumnos` alumnos y `competencias` calificaciones por alumno"""
+    engine = create_engine(f"sqlite:///{ruta}")
+    models.Base.metadata.create_all(bind=engine)
+    migraciones.aplicar_migraciones(engine)
+    with engine.begin() as conn:
+        conn.execute(models.Curso.__table__.insert(), [{"Curso_ID": 1, "Nombre": "benchmark"}])
+        conn.execute(models.CompetenciaPlantilla.__table__.insert(),
+                     [{"CompetenciaPlantilla_ID": c, "Curso_ID": 1, "Codigo_Competencia": f"1_benchmark_c{c}"}
+                      for c in range(1, competencias + 1)])
+        conn.execute(models.Alumno.__table__.insert(),
+                     [{"Alumno_ID": a, "Nombre": f"Alumno Prueba {a:06d}", "CI": 100} for a in range(1, alumnos + 1)])
+        conn.execute(models.AlumnoCompetencia.__table__.insert(),
+                     [{"Alumno_ID": a, "CompetenciaPlantilla_ID": c, "Valor_Calificacion": models.VALOR_CALIFICACION["B"]}
+                      for a in range(1, alumnos + 1) for c in range(1, competencias + 1)])
+    engine.dispose()
+
+def escribir(engine, alumnos, detener, pasadas):
+    """Simula importaciones: cada pasada reescribe todas las calificaciones en una sola transacción"""
+    valores = list(models.VALOR_CALIFICACION.values())
+    while not detener.is_set():
+        valor = valores[pasadas[0] % len(valores)]
+        with engine.begin() as conn:
+            for desde in range(1, alumnos + 1, TAMANO_LOTE):
+                conn.execute(text("UPDATE AlumnoCompetencia SET Valor_Calificacion = :valor "
+                                  "WHERE Alumno_ID BETWEEN :desde AND :hasta"),
+                             {"valor": valor, "desde": desde, "hasta": desde + TAMANO_LOTE - 1})
+                time.sleep(PAUSA_ENTRE_LOTES)
+        pasadas[0] += 1
+
+def leer(engine, alumnos, detener, latencias, errores):
+    """Repite una consulta de lectura típica y registra su latencia en milisegundos"""
+    azar = random.Random()
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(CONSULTA_LECTURA, {"desde": azar.randint(1, alumnos)}).fetchall()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        except OperationalError as e:
+            errores.append(str(e.orig))
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) de las latencias"""
+    if not valores:
+        return float("nan")
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+def escenario(ruta, ajustada, alumnos, segundos, lectores):
+    """Mide las lecturas concurrentes con una importación en curso"""
+    engine = create_engine(f"sqlite:///{ruta}", connect_args={"check_same_thread": False})
+    if ajustada:
+        event.listen(engine, "connect", database.configurar_conexion_sqlite)
+
+    detener = threading.Event()
+    latencias, errores, pasadas = [], [], [0]
+    hilos = [threading.Thread(target=escribir, args=(engine, alumnos, detener, pasadas))]
+    hilos += [threading.Thread(target=leer, args=(engine, alumnos, detener, latencias, errores)) for _ in range(lectores)]
+    for hilo in hilos:
+        hilo.start()
+    time.sleep(segundos)
+    detener.set()
+    for hilo in hilos:
+        hilo.join()
+    engine.dispose()
+
+    return {
+        "configuracion": "ajustada (WAL)" if ajustada else "por defecto",
+        "lecturas": len(latencias),
+        "errores": len(errores),
+        "p50_ms": percentil(latencias, 50),
+        "p95_ms": percentil(latencias, 95),
+        "max_ms": max(latencias, default=float("nan")),
+        "importaciones": pasadas[0],
+        "mensajes_error": sorted(set(errores)),
+    }
+
+def benchmark(alumnos=20000, competencias=32, segundos=10, lectores=4):
+    """Compara la configuración por defecto con PRAGMAS_SQLITE, cada una sobre su propia base"""
+    print(f"Base de prueba: {alumnos} alumnos x {competencias} competencias. "
+          f"{lectores} lectores durante {segundos}s con una importación en curso")
+    print(f"Ajustes: {database.PRAGMAS_SQLITE}")
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="benchmark_sqlite_") as directorio:
+        for ajustada in (False, True):
+            ruta = os.path.join(directorio, f"{'ajustada' if ajustada else 'defecto'}.db")
+            crear_base(ruta, alumnos, competencias)
+            resultados.append(escenario(ruta, ajustada, alumnos, segundos, lectores))
+
+    print("=" * 78)
+    print(f"{'configuración':<16} {'lecturas':>9} {'errores':>8} {'p50 ms':>9} {'p95 ms':>9} {'máx ms':>9} {'importaciones':>14}")
+    for r in resultados:
+        print(f"{r['configuracion']:<16} {r['lecturas']:>9} {r['errores']:>8} {r['p50_ms']:>9.1f} "
+              f"{r['p95_ms']:>9.1f} {r['max_ms']:>9.1f} {r['importaciones']:>14}")
+    print("=" * 78)
+    for r in resultados:
+        for mensaje in r["mensajes_error"]:
+            print(f"{r['configuracion']}: {mensaje}")
+    return resultados
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Latencia de lectura durante una importación, antes y después de los ajustes de SQLite")
+    parser.add_argument("--alumnos", "-a", type=int, default=20000, help="Alumnos de la base de prueba")
+    parser.add_argument("--competencias", "-c", type=int, default=32, help="Calificaciones por alumno")
+    parser.add_argument("--segundos", "-s", type=float, default=10, help="Duración de cada escenario")
+    parser.add_argument("--lectores", "-l", type=int, default=4, help="Hilos de lectura concurrentes")
+
+    args = parser.parse_args()
+    benchmark(args.alumnos, args.competencias, args.segundos, args.lectores)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Script para importar de una vez varios libros Excel (uno por grado y sección)
+o archivos ZIP que los contienen. Los libros se leen en paralelo y se escriben
+en la base de datos uno a uno, cada uno en su propia transacción.
+"""
+
+import sys
+import os
+import logging
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXTENSIONES = ('.xlsx', '.xls', '.csv', '.parquet', '.zip')
+
+def recopilar_archivos(rutas):
+    """Devuelve [(nombre, ruta absoluta)] de los archivos indicados y de los que hay en las carpetas indicadas."""
+    archivos = []
+    for ruta in rutas:
+        ruta = os.path.abspath(ruta)
+        if os.path.isdir(ruta):
+            for nombre in sorted(os.listdir(ruta)):
+                if nombre.lower().endswith(EXTENSIONES) and not nombre.startswith(("~$", ".")):
+                    archivos.append((nombre, os.path.join(ruta, nombre)))
+        elif os.path.isfile(ruta):
+            archivos.append((os.path.basename(ruta), ruta))
+        else:
+            logger.warning(f"No existe: {ruta}")
+    return archivos
+
+def importar_lote(rutas, solo_nuevos=False, procesos=None):
+    """Importa los libros y muestra el resultado de cada uno"""
+    archivos = recopilar_archivos(rutas)
+    if not archivos:
+        print("No se encontraron archivos .xlsx, .xls ni .zip para importar")
+        return None
+
+    # La base de datos se resuelve relativa a backend/, como en la aplicación
+    os.chdir(BACKEND_DIR)
+    from app.database import database, models, migraciones
+    from app.services import ingesta_lote
+
+    models.Base.metadata.create_all(bind=database.engine)
+    migraciones.aplicar_migraciones(database.engine)
+
+    db = database.SessionLocal()
+    try:
+        resultado = ingesta_lote.procesar_lote(db, archivos, modo_actualizacion=not solo_nuevos, max_procesos=procesos)
+    finally:
+        db.close()
+
+    print("=" * 60)
+    for archivo in resultado["archivos"]:
+        if archivo["estado"] == "completado":
+            r = archivo["resultado"]
+            print(f"✅ {archivo['archivo']}: {r['alumnos_procesados']} alumnos "
+                  f"({r['alumnos_creados']} nuevos, {r['alumnos_actualizados']} actualizados)")
+        else:
+            print(f"❌ {archivo['archivo']}: {archivo['error']}")
+    print("=" * 60)
+    print(resultado["mensaje"])
+    return resultado
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Importar varios libros Excel (o ZIP de libros) en paralelo")
+    parser.add_argument("rutas", nargs="+", help="Archivos .xlsx/.xls/.csv/.parquet/.zip o carpetas que los contienen")
+    parser.add_argument("--solo-nuevos", action="store_true", help="Solo crear alumnos nuevos, sin actualizar los existentes")
+    parser.add_argument("--procesos", "-p", type=int, help="Procesos para leer los libros (por defecto, uno por núcleo)")
+
+    args = parser.parse_args()
+    resultado = importar_lote(args.rutas, solo_nuevos=args.solo_nuevos, procesos=args.procesos)
+    sys.exit(0 if resultado and resultado["archivos_con_error"] == 0 else 1)
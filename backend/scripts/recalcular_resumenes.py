@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Script para recalcular desde cero los resúmenes de calificaciones de todos los
+alumnos (Cantidad_Competencias, Promedio_Calificaciones y Cant_A a Cant_D)
+y los perfiles precalculados de PerfilesAlumno. La ingesta los mantiene al día; este script sirve tras editar
+AlumnoCompetencia a mano. Para revisar y corregir solo los desactualizados: python -m app.mantenimiento.
+"""
+
+import sys
+import os
+import time
+import logging
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def recalcular_resumenes():
+    """Recalcula los resúmenes de todos los alumnos en una sola sentencia y regenera sus perfiles"""
+    # La base de datos se resuelve relativa a backend/, como en la aplicación
+    os.chdir(BACKEND_DIR)
+    from sqlalchemy import text
+    from sqlalchemy.orm import Session
+    from app.database import database, models, migraciones
+
+    models.Base.metadata.create_all(bind=database.engine)
+    migraciones.aplicar_migraciones(database.engine)
+    from app.services import resumenes, perfil_alumnos
+
+    inicio = time.perf_counter()
+    with database.engine.begin() as conn:
+        actualizados = resumenes.actualizar_resumenes(conn)
+        with Session(bind=conn) as db:
+            perfiles = perfil_alumnos.materializar_perfiles(db)
+        distribucion = conn.execute(text(
+            "SELECT COUNT(*), SUM(Cant_A), SUM(Cant_B), SUM(Cant_C), SUM(Cant_D), ROUND(AVG(Promedio_Calificaciones), 2) FROM Alumnos"
+        )).one()
+    segundos = time.perf_counter() - inicio
+
+    print("=" * 60)
+    print(f"Alumnos actualizados: {actualizados} en {segundos:.2f}s")
+    print(f"Perfiles regenerados: {perfiles}")
+    print(f"Calificaciones A: {distribucion[1] or 0}, B: {distribucion[2] or 0}, C: {distribucion[3] or 0}, D: {distribucion[4] or 0}")
+    print(f"Promedio general: {distribucion[5] if distribucion[5] is not None else 'N/A'}")
+    print("=" * 60)
+    return actualizados
+
+if __name__ == "__main__":
+    recalcular_resumenes()
@@ -9,6 +9,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database.database import SessionLocal
 from app.database import models
+from app.services import tipos_inteligencia
 from sqlalchemy import func
 
 def verificar_inteligencias():
@@ -33,8 +34,7 @@ def verificar_inteligencias():
         print(f"\n2. Alumnos con inteligencias registradas: {alumnos_con_inteligencias}")
         
         # 3. Tipos de inteligencia únicos
-        tipos_inteligencia = db.query(models.Inteligencia.Tipo_Inteligencia).distinct().all()
-        tipos_list = [tipo[0] for tipo in tipos_inteligencia]
+        tipos_list = tipos_inteligencia.listar_tipos(db)
         print(f"\n3. Tipos de inteligencia encontrados ({len(tipos_list)}):")
         for i, tipo in enumerate(tipos_list, 1):
             print(f"   {i}. {tipo}")
@@ -42,12 +42,12 @@ def verificar_inteligencias():
         # 4. Estadísticas por tipo de inteligencia
         print(f"\n4. Estadísticas por tipo de inteligencia:")
         stats = db.query(
-            models.Inteligencia.Tipo_Inteligencia,
+            models.TipoInteligencia.Nombre.label('Tipo_Inteligencia'),
             func.count(models.Inteligencia.Inteligencia_ID).label('cantidad'),
             func.avg(models.Inteligencia.Puntaje).label('promedio'),
             func.min(models.Inteligencia.Puntaje).label('minimo'),
             func.max(models.Inteligencia.Puntaje).label('maximo')
-        ).group_by(models.Inteligencia.Tipo_Inteligencia).all()
+        ).join(models.TipoInteligencia).group_by(models.TipoInteligencia.Nombre).all()
         
         for stat in stats:
             print(f"   • {stat.Tipo_Inteligencia}:")
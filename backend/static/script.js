@@ -302,6 +302,7 @@ async function handleUploadSubmit(event) {
     const formData = new FormData(event.target);
     const file = formData.get('file');
     const actualizarExistentes = formData.get('actualizar_existentes') === 'on';
+    const soloValidar = formData.get('validate_only') === 'on';
     
     if (!file) {
         showStatus('Por favor selecciona un archivo', 'error');
@@ -316,7 +317,7 @@ async function handleUploadSubmit(event) {
         uploadFormData.append('file', file);
         uploadFormData.append('actualizar_existentes', actualizarExistentes);
         
-        const response = await fetch(`${API_BASE_URL}/upload/`, {
+        const response = await fetch(`${API_BASE_URL}/upload/${soloValidar ? '?validate_only=true' : ''}`, {
             method: 'POST',
             body: uploadFormData
         });
@@ -326,7 +327,13 @@ async function handleUploadSubmit(event) {
             throw new Error(errorData.detail || 'Error al subir archivo');
         }
         
-        const result = await response.json();
+        if (soloValidar) {
+            statusDiv.innerHTML = renderValidationResult(await response.json());
+            return;
+        }
+        
+        const job = await response.json();
+        const result = await waitForUploadJob(job.job_id, statusDiv);
         
         // Crear mensaje detallado con información de inteligencias
         let statusMessage = `
@@ -336,6 +343,7 @@ async function handleUploadSubmit(event) {
                     <p><strong>Alumnos:</strong> ${result.alumnos_procesados} procesados (${result.alumnos_creados} creados, ${result.alumnos_actualizados} actualizados)</p>
                     <p><strong>Competencias:</strong> ${result.competencias_procesadas} procesadas</p>
                     <p><strong>Cursos:</strong> ${result.cursos_procesados} procesados</p>
+                    ${result.desde_cache ? '<p><em>Este archivo ya había sido procesado; no se realizaron cambios en la base de datos.</em></p>' : ''}
                 </div>
         `;
         
@@ -411,6 +419,66 @@ async function handleUploadSubmit(event) {
     }
 }
 
+// Escapar un valor para insertarlo en HTML (las celdas del archivo llegan tal cual)
+function escapeHtml(valor) {
+    const div = document.createElement('div');
+    div.textContent = valor === null || valor === undefined ? '' : String(valor);
+    return div.innerHTML.replace(/"/g, '&quot;').replace(/'/g, '&#39;');
+}
+
+// Mostrar el resultado de una validación (validate_only) con los errores por celda
+function renderValidationResult(validacion) {
+    if (validacion.valido) {
+        return `<div class="status-message success"><i class="fas fa-check-circle"></i> El archivo es válido (${Object.entries(validacion.filas).map(([hoja, filas]) => `${escapeHtml(hoja)}: ${filas} filas`).join(', ')})</div>`;
+    }
+    if (validacion.errores_encabezado.length > 0) {
+        return `
+            <div class="status-message error">
+                <h4>Errores de estructura</h4>
+                <ul>${validacion.errores_encabezado.map(e => `<li>${e.hoja ? `Hoja '${escapeHtml(e.hoja)}': ` : ''}${escapeHtml(e.error)}</li>`).join('')}</ul>
+            </div>
+        `;
+    }
+    const filas = validacion.errores.slice(0, 200).map(e => `
+        <tr><td>${escapeHtml(e.hoja)}</td><td>${escapeHtml(e.fila)}</td><td>${escapeHtml(e.columna)}</td><td>${escapeHtml(e.valor)}</td><td>${escapeHtml(e.error)}</td></tr>
+    `).join('');
+    return `
+        <div class="upload-result">
+            <h4><i class="fas fa-exclamation-triangle"></i> Se encontraron ${validacion.total_errores} errores</h4>
+            <div class="result-summary">
+                ${Object.entries(validacion.errores_por_tipo).map(([error, total]) => `<p><strong>${escapeHtml(error)}:</strong> ${total}</p>`).join('')}
+            </div>
+            <table class="validation-table">
+                <thead><tr><th>Hoja</th><th>Fila</th><th>Columna</th><th>Valor</th><th>Error</th></tr></thead>
+                <tbody>${filas}</tbody>
+            </table>
+            ${validacion.total_errores > 200 ? `<p><em>Se muestran los primeros 200 errores.</em></p>` : ''}
+        </div>
+    `;
+}
+
+// Consultar el trabajo de ingesta hasta que termine y devolver su resumen
+async function waitForUploadJob(jobId, statusDiv) {
+    while (true) {
+        const response = await fetch(`${API_BASE_URL}/upload/jobs/${jobId}`);
+        if (!response.ok) {
+            throw new Error('No se pudo consultar el estado del procesamiento');
+        }
+        
+        const job = await response.json();
+        if (job.estado === 'completado') {
+            return job.resultado;
+        }
+        if (job.estado === 'error') {
+            throw new Error(`Error procesando archivo: ${job.error}. Verifica que el archivo tenga las hojas requeridas: 'notas', 'inteligencia', 'ci'`);
+        }
+        
+        const etapa = job.etapa ? ` (${job.etapa}, ${job.filas_procesadas} filas)` : '';
+        statusDiv.innerHTML = `<div class="loading"><i class="fas fa-spinner"></i> Procesando archivo...${etapa}</div>`;
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
 // Funciones de edición y eliminación
 async function editItem(type, id) {
     currentEditType = type;